@@ -62,6 +62,8 @@ class AmazonCoverSearch(covers.CoverSearchMethod):
     """
     name = 'amazon'
     title = 'Amazon'
+    # find_covers waits for a second between searches itself
+    concurrency = 1
 
     def __init__(self):
         self.starttime = 0
@@ -1,7 +1,9 @@
 
 import logging
+import threading
 from xl import event, settings
 import exaile_parser
+import spydaap.metadata
 from server import DaapServer
 import daapserverprefs
 
@@ -19,39 +21,116 @@ class CollectionWrapper:
             self.id = id
             self.parser = exaile_parser.ExaileParser()
             self.daap = None
+            self.item = None
+            self.serial = 0
+
+        def invalidate(self):
+            '''Drops the encoded data after the track's tags changed'''
+            self.serial += 1
+            self.daap = None
+            self.item = None
 
         def get_dmap_raw(self):
-            if self.daap is None:
+            daap = self.daap
+            if daap is None:
+                serial = self.serial
                 do = self.parser.parse(self.track)[0]
                 if do is not None:
-                    self.daap = ''.join([d.encode() for d in do])
+                    daap = ''.join([d.encode() for d in do])
                 else:
-                    self.daap = ''
-            return self.daap
+                    daap = ''
+                if serial == self.serial:
+                    self.daap = daap
+            return daap
+
+        def get_listing_item_raw(self):
+            item = self.item
+            if item is None:
+                serial = self.serial
+                item = spydaap.metadata.encode_listing_item(
+                    self.id, self.get_dmap_raw())
+                if serial == self.serial:
+                    self.item = item
+            return item
 
         def get_original_filename(self):
             return self.track.get_local_path()
 
     def __init__(self, collection):
         self.collection = collection
-        self.map = []
+        self.lock = threading.Lock()
+        # location -> TrackWrapper, and id -> TrackWrapper
+        self.by_loc = {}
+        self.by_id = {}
+        self.next_id = 1
+        # tags that end up in the encoded item, see ExaileParser.parse
+        self.tags = exaile_parser.ExaileParser.get_tags()
+
+        with self.lock:
+            self.__add_tracks(self.collection)
+        event.add_callback(self.on_tracks_added, 'tracks_added', collection)
+        event.add_callback(self.on_tracks_removed, 'tracks_removed',
+                           collection)
+        event.add_callback(self.on_track_tags_changed, 'track_tags_changed')
+
+    def close(self):
+        event.remove_callback(self.on_tracks_added, 'tracks_added',
+                              self.collection)
+        event.remove_callback(self.on_tracks_removed, 'tracks_removed',
+                              self.collection)
+        event.remove_callback(self.on_track_tags_changed,
+                              'track_tags_changed')
+
+    def __add_tracks(self, tracks):
+        for t in tracks:
+            loc = t.get_loc_for_io()
+            wrapper = self.by_loc.get(loc)
+            if wrapper is not None:
+                if wrapper.track is t:
+                    continue
+                del self.by_id[wrapper.id]
+            wrapper = self.TrackWrapper(self.next_id, t)
+            self.next_id += 1
+            self.by_loc[loc] = wrapper
+            self.by_id[wrapper.id] = wrapper
+
+    def on_tracks_added(self, type, collection, locations):
+        tracks = []
+        for loc in locations:
+            t = collection.get_track_by_loc(loc)
+            if t is not None:
+                tracks.append(t)
+        with self.lock:
+            self.__add_tracks(tracks)
+
+    def on_tracks_removed(self, type, collection, locations):
+        with self.lock:
+            for loc in locations:
+                wrapper = self.by_loc.pop(loc, None)
+                if wrapper is not None:
+                    del self.by_id[wrapper.id]
+
+    def on_track_tags_changed(self, type, track, tags):
+        if self.tags.isdisjoint(tags):
+            return
+        wrapper = self.by_loc.get(track.get_loc_for_io())
+        if wrapper is not None and wrapper.track is track:
+            wrapper.invalidate()
 
     def __iter__(self):
-        i = 0
-        self.map = []
-        for t in self.collection:
-            self.map.append(self.TrackWrapper(i, t))
-            yield self.map[i]
-            i += 1
+        with self.lock:
+            wrappers = self.by_id.values()
+        wrappers.sort(key=lambda w: w.id)
+        return iter(wrappers)
 
     def get_item_by_id(self, id):
-        return self.map[int(id)]
-
-    def __getitem__(self, idx):
-        return self.map[idx]
+        try:
+            return self.by_id[int(id)]
+        except KeyError:
+            raise IndexError(id)
 
     def __len__(self):
-        return len(self.collection)
+        return len(self.by_id)
 
 
 class DaapServerPlugin(object):
@@ -75,6 +154,7 @@ class DaapServerPlugin(object):
 
     def teardown(self, exaile):
         self.__daapserver.stop_server()
+        self.__daapserver.library.close()
 
     def disable(self, exaile):
         self.teardown(exaile)
@@ -40,6 +40,12 @@ class ExaileParser(spydaap.parser.Parser):
         'discnumber': 'daap.songdiscnumber'
     }
 
+    @classmethod
+    def get_tags(cls):
+        """Returns the names of the tags that parse() reads"""
+        return frozenset(cls._string_map) | frozenset(cls._int_map) | \
+            frozenset(('__length', '__loc'))
+
     def understands(self, filename):
         return True
     #   return self.file_re.match(filename)
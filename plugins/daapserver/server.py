@@ -74,6 +74,8 @@ class MyThreadedHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServe
     """Handle requests in a separate thread."""
     timeout = 1
     daemon_threads = True
+    # clients tend to connect in bursts
+    request_queue_size = 32
 
     def __init__(self, *args):
         if ':' in args[0][0]:
@@ -105,7 +107,6 @@ class DaapServer():
             self.handler.daap_server_revision += 1
             logger.info('Libraries Changed, incrementing revision to %d.'
                         % self.handler.daap_server_revision)
-        self.__cache.clean()
 
     def set(self, **kwargs):
         for key in kwargs:
@@ -148,9 +149,11 @@ class DaapServer():
         return False
 
     def stop(self):
-        if self.httpd is not None:
-            self.httpd.shutdown()
-            self.httpd.socket.close()
+        # run() clears self.httpd once serve_forever returns
+        httpd = self.httpd
+        if httpd is not None:
+            httpd.shutdown()
+            httpd.socket.close()
             return True
         return False
 
@@ -33,38 +33,16 @@ parsers = [spydaap.parser.mp3.Mp3Parser(),
            spydaap.parser.ogg.OggParser()]
 
 
-class ContentRangeFile(object):
+class FileRange(object):
+    """A byte range of an open file, to be sent as a response body"""
 
-    def __init__(self, name, parent, start, end=None, chunk=1024):
-        self.name = name
-        self.parent = parent
+    def __init__(self, file, start, length):
+        self.file = file
         self.start = start
-        self.end = end
-        self.chunk = chunk
-        self.parent.seek(self.start)
-        self.read = start
-        self.length = self.end - self.start
+        self.length = length
 
     def __len__(self):
         return self.length
 
-    def next(self):
-        to_read = self.chunk
-        if (self.end is not None):
-            if (self.read >= self.end):
-                self.parent.close()
-                raise StopIteration
-            if (to_read + self.read > self.end):
-                to_read = self.end - self.read
-            retval = self.parent.read(to_read)
-            self.read = self.read + len(retval)
-        else:
-            retval = self.parent.read(to_read)
-        if retval == '':
-            self.parent.close()
-            raise StopIteration
-        else:
-            return retval
-
-    def __iter__(self):
-        return self
+    def close(self):
+        self.file.close()
@@ -125,24 +125,38 @@ class DAAPObject(object):
 
     def encode(self):
         # generate DMAP tagged data format
+        return ''.join(self.encode_buffers())
+
+    def encode_buffers(self):
+        """Encodes the object as a list of strings to be joined or written
+        in order. Preencoded children are put in the list as they are,
+        so large listings are never copied into one string."""
+        out = []
+        self._encode_into(out)
+        return out
+
+    def _encode_into(self, out):
+        # appends our data to out, and returns its length
         # step 1 - find out what type of object we are
         if self.type == 'c':
             # our object is a container,
             # this means we're going to have to
-            # check contains[]
-            value = ''
+            # check contains[]. Our header goes first, but its length
+            # is only known once the children are in.
+            header = len(out)
+            out.append(None)
+            length = 0
             for item in self.contains:
                 # get the data stream from each of the sub elements
                 if isinstance(item, str):
                     # preencoded
-                    value += item
+                    out.append(item)
+                    length += len(item)
                 else:
-                    value += item.encode()
-            # get the length of the data
-            length = len(value)
+                    length += item._encode_into(out)
             # pack: 4 byte code, 4 byte length, length bytes of value
-            data = struct.pack('!4sI%ss' % length, self.code, length, value)
-            return data
+            out[header] = struct.pack('!4sI', self.code, length)
+            return length + 8
         else:
             # we don't have to traverse anything
             # to calculate the length and such
@@ -191,7 +205,8 @@ class DAAPObject(object):
             length = struct.calcsize('!%s' % packing)
             # pack: 4 characters for the code, 4 bytes for the length, and 'length' bytes for the value
             data = struct.pack('!4sI%s' % (packing), self.code, length, value)
-            return data
+            out.append(data)
+            return len(data)
 
     def processData(self, str):
         # read 4 bytes for the code and 4 bytes for the length of the objects data
@@ -22,6 +22,17 @@ import StringIO
 from spydaap.daap import do
 
 
+def encode_listing_item(id, dmap_raw):
+    """Encodes the dmap.listingitem for an item of a daap.databasesongs
+    listing, given its pre-encoded metadata."""
+    return do('dmap.listingitem',
+              [do('dmap.itemkind', 2),
+               do('dmap.containeritemid', id),
+               do('dmap.itemid', id),
+               dmap_raw
+               ]).encode()
+
+
 class MetadataCache(spydaap.cache.OrderedCache):
 
     def __init__(self, cache_dir, parsers):
@@ -112,6 +123,9 @@ class MetadataCacheItem(spydaap.cache.OrderedCacheItem):
             self.read()
         return self.daap_raw
 
+    def get_listing_item_raw(self):
+        return encode_listing_item(self.id, self.get_dmap_raw())
+
     def get_md(self):
         if self.md is None:
             self.md = {}
@@ -21,7 +21,44 @@ import re
 import urlparse
 import socket
 import spydaap
-from spydaap.daap import do
+from spydaap.daap import do, DAAPObject
+
+try:
+    # pysendfile, for Python versions without os.sendfile
+    from sendfile import sendfile
+except ImportError:
+    sendfile = getattr(os, 'sendfile', None)
+
+range_re = re.compile('^bytes=([0-9]*)-([0-9]*)$')
+
+
+def parse_range(value, size):
+    """Returns the first and last byte positions of the single byte range
+    in a Range header, or None if the file has no bytes in that range.
+    Raises ValueError if the header can't be parsed."""
+    m = range_re.match(value.strip())
+    if m is None:
+        raise ValueError(value)
+    (first, last) = m.groups()
+    if first == '':
+        # suffix range, the last bytes of the file
+        if last == '':
+            raise ValueError(value)
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return None
+        return (max(size - suffix, 0), size - 1)
+    first = int(first)
+    if last == '':
+        last = size - 1
+    else:
+        last = int(last)
+        if last < first:
+            raise ValueError(value)
+        last = min(last, size - 1)
+    if first > last:
+        return None
+    return (first, last)
 
 
 def makeDAAPHandlerClass(server_name, cache, md_cache, container_cache):
@@ -32,7 +69,18 @@ def makeDAAPHandlerClass(server_name, cache, md_cache, container_cache):
         daap_server_revision = 1
         protocol_version = "HTTP/1.1"
 
+        isHEAD = False
+
+        # the encoded buffers of a DAAPObject are written in chunks of
+        # about this size
+        write_chunk_size = 64 * 1024
+        # files are read in chunks of this size when sendfile isn't
+        # available
+        file_chunk_size = 256 * 1024
+
         def h(self, data, **kwargs):
+            if isinstance(data, DAAPObject):
+                data = data.encode_buffers()
             self.send_response(kwargs.get('status', 200))
             self.send_header('Content-Type', kwargs.get('type', 'application/x-dmap-tagged'))
             self.send_header('DAAP-Server', 'Simple')
@@ -45,30 +93,78 @@ def makeDAAPHandlerClass(server_name, cache, md_cache, container_cache):
                     self.send_header(k, v)
             try:
                 if isinstance(data, file):
-                    self.send_header("Content-Length", str(os.stat(data.name).st_size))
+                    self.send_header("Content-Length", str(os.fstat(data.fileno()).st_size))
+                elif isinstance(data, list):
+                    self.send_header("Content-Length", sum(len(d) for d in data))
                 else:
                     self.send_header("Content-Length", len(data))
             except Exception:
-                pass
+                # the client can only tell where the body ends when we
+                # close the connection
+                self.close_connection = 1
             self.end_headers()
-            if hasattr(self, 'isHEAD') and self.isHEAD:
+            if self.isHEAD:
                 pass
             else:
                 try:
-                    if (hasattr(data, 'next')):
+                    if isinstance(data, spydaap.FileRange):
+                        self.write_file_range(data)
+                    elif isinstance(data, file):
+                        self.write_file_range(spydaap.FileRange(
+                            data, 0, os.fstat(data.fileno()).st_size))
+                    elif (hasattr(data, 'next')):
                         for d in data:
                             self.wfile.write(d)
+                    elif isinstance(data, list):
+                        self.write_buffers(data)
                     else:
                         self.wfile.write(data)
-                except socket.error, (err_no, err_str):
-                    if err_no in [errno.ECONNRESET]:
-                        # XXX: why do we need to pass this?
-                        pass
+                except (socket.error, OSError), e:
+                    if e.errno in [errno.ECONNRESET, errno.EPIPE]:
+                        # the client went away, e.g. it stopped playback
+                        self.close_connection = 1
                     else:
                         raise
             if (hasattr(data, 'close')):
                 data.close()
 
+        def write_file_range(self, data):
+            remaining = data.length
+            if sendfile is not None:
+                self.wfile.flush()
+                out = self.connection.fileno()
+                offset = data.start
+                while remaining > 0:
+                    sent = sendfile(out, data.file.fileno(), offset, remaining)
+                    if sent == 0:
+                        break
+                    offset += sent
+                    remaining -= sent
+            else:
+                data.file.seek(data.start)
+                while remaining > 0:
+                    chunk = data.file.read(min(self.file_chunk_size, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            if remaining > 0:
+                # the file shrank, we can't send the promised length
+                self.close_connection = 1
+
+        def write_buffers(self, buffers):
+            chunk = []
+            size = 0
+            for d in buffers:
+                chunk.append(d)
+                size += len(d)
+                if size >= self.write_chunk_size:
+                    self.wfile.write(''.join(chunk))
+                    chunk = []
+                    size = 0
+            if chunk:
+                self.wfile.write(''.join(chunk))
+
         # itunes sends request for:
         # GET daap://192.168.1.4:3689/databases/1/items/626.mp3?seesion-id=1
         # so we must hack the urls; annoying.
@@ -108,8 +204,12 @@ def makeDAAPHandlerClass(server_name, cache, md_cache, container_cache):
             return
 
         def do_HEAD(self):
+            # the handler serves all requests of a kept-alive connection
             self.isHEAD = True
-            self.do_GET()
+            try:
+                self.do_GET()
+            finally:
+                self.isHEAD = False
 
         def do_GET_login(self):
             mlog = do('dmap.loginresponse',
@@ -176,28 +276,18 @@ def makeDAAPHandlerClass(server_name, cache, md_cache, container_cache):
             self.h(d.encode())
 
         def do_GET_item_list(self, database_id):
-            def build_item(md):
-                return do('dmap.listingitem',
-                          [do('dmap.itemkind', 2),
-                           do('dmap.containeritemid', md.id),
-                           do('dmap.itemid', md.id),
-                           md.get_dmap_raw()
-                           ])
-
-            def build(f):
-                children = [build_item(md) for md in md_cache]
-                file_count = len(children)
-                d = do('daap.databasesongs',
-                       [do('dmap.status', 200),
-                        do('dmap.updatetype', 0),
-                        do('dmap.specifiedtotalcount', file_count),
-                        do('dmap.returnedcount', file_count),
-                        do('dmap.listing',
-                            children)])
-                f.write(d.encode())
-
-            data = cache.get('item_list', build)
-            self.h(data)
+            # each item is encoded once by md_cache and kept until it
+            # changes, the listing only writes them out
+            items = [md.get_listing_item_raw() for md in md_cache]
+            file_count = len(items)
+            d = do('daap.databasesongs',
+                   [do('dmap.status', 200),
+                    do('dmap.updatetype', 0),
+                    do('dmap.specifiedtotalcount', file_count),
+                    do('dmap.returnedcount', file_count),
+                    do('dmap.listing',
+                        items)])
+            self.h(d)
 
         def do_GET_update(self):
             mupd = do('dmap.updateresponse',
@@ -213,22 +303,32 @@ def makeDAAPHandlerClass(server_name, cache, md_cache, container_cache):
                 self.send_error(404)    # this can be caused by left overs from previous sessions
                 return
 
+            try:
+                f = open(fn, 'rb')
+            except IOError:
+                self.send_error(404)
+                return
+            size = os.fstat(f.fileno()).st_size
+            (start, length) = (0, size)
+            extra_headers = {}
+            status = 200
             if ('Range' in self.headers):
-                rs = self.headers['Range']
-                m = re.compile('bytes=([0-9]+)-([0-9]+)?').match(rs)
-                (start, end) = m.groups()
-                if end is not None:
-                    end = int(end)
+                try:
+                    byte_range = parse_range(self.headers['Range'], size)
+                except ValueError:
+                    # invalid ranges are ignored
+                    pass
                 else:
-                    end = os.stat(fn).st_size
-                start = int(start)
-                f = spydaap.ContentRangeFile(fn, open(fn), start, end)
-                extra_headers = {"Content-Range": "bytes %s-%s/%s" % (str(start), str(end), str(os.stat(fn).st_size))}
-                status = 206
-            else:
-                f = open(fn)
-                extra_headers = {}
-                status = 200
+                    if byte_range is None:
+                        f.close()
+                        self.h('', status=416,
+                               extra_headers={"Content-Range": "bytes */%d" % size})
+                        return
+                    (start, last) = byte_range
+                    length = last - start + 1
+                    extra_headers = {"Content-Range": "bytes %d-%d/%d" % (start, last, size)}
+                    status = 206
+            f = spydaap.FileRange(f, start, length)
             # this is ugly, very wrong.
             type = "audio/%s" % (os.path.splitext(fn)[1])
             self.h(f, type=type, status=status, extra_headers=extra_headers)
@@ -50,11 +50,17 @@ class DeveloperPlugin(object):
         # subscribe for all events
         event.add_callback(self.on_events)
 
+        # time the callbacks, unless something else already does
+        self.own_stats = event.EVENT_MANAGER.get_stats() is None
+        event.EVENT_MANAGER.set_stats_enabled(True)
+
     def disable(self, exaile):
         self.teardown(exaile)
 
     def teardown(self, exaile):
         event.remove_callback(self.on_events)
+        if self.own_stats:
+            event.EVENT_MANAGER.set_stats_enabled(False)
         if self.window:
             self.window.destroy()
         if self.menu:
@@ -88,6 +94,9 @@ class DeveloperPlugin(object):
         with self.lock:
             self.events.clear()
             self.events['__all'] = 0
+        stats = event.EVENT_MANAGER.get_stats()
+        if stats is not None:
+            stats.clear()
 
     def pause_events(self, pause):
         with self.lock:
@@ -109,6 +118,16 @@ class DeveloperPlugin(object):
             if all_count != last_count:
                 return self.events.copy(), all_count
 
+    def get_callback_data(self):
+        """
+            Returns a list of (seconds, calls, event type, callback name),
+            see xl.event.EventStats.get_callback_times
+        """
+        stats = event.EVENT_MANAGER.get_stats()
+        if stats is None:
+            return []
+        return stats.get_callback_times()
+
 
 plugin_class = DeveloperPlugin
 
@@ -121,7 +140,8 @@ class DeveloperWindow(Gtk.Window):
     event_filter_entry, \
         event_model_filter, \
         event_tree, \
-        event_store = GtkTemplate.Child.widgets(4)
+        event_store, \
+        callback_store = GtkTemplate.Child.widgets(5)
 
     def __init__(self, parent, plugin):
         Gtk.Window.__init__(self)
@@ -136,6 +156,8 @@ class DeveloperWindow(Gtk.Window):
 
         # key: name, value: iter
         self.event_model_idx = {}
+        # key: (callback name, event type), value: iter
+        self.callback_model_idx = {}
 
         self.event_model_filter.set_visible_func(self.on_event_filter_row)
 
@@ -151,6 +173,8 @@ class DeveloperWindow(Gtk.Window):
         self.events_count = None
         self.event_model_idx.clear()
         self.event_store.clear()
+        self.callback_model_idx.clear()
+        self.callback_store.clear()
 
     @GtkTemplate.Callback
     def on_delete(self, widget, event):
@@ -183,4 +207,14 @@ class DeveloperWindow(Gtk.Window):
                     titer = self.event_store.append([name, count])
                     self.event_model_idx[name] = titer
 
+            for seconds, calls, etype, name in self.plugin.get_callback_data():
+                msecs = int(seconds * 1000)
+                titer = self.callback_model_idx.get((name, etype))
+                if titer:
+                    self.callback_store[titer][2] = calls
+                    self.callback_store[titer][3] = msecs
+                else:
+                    titer = self.callback_store.append([name, etype, calls, msecs])
+                    self.callback_model_idx[(name, etype)] = titer
+
         return True
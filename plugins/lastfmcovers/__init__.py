@@ -60,6 +60,9 @@ class LastFMCoverSearch(covers.CoverSearchMethod):
     name = 'lastfm'
     title = 'Last.fm'
     type = 'remote'  # fetches remotely as opposed to locally
+    # stay below the five requests per second the API allows
+    concurrency = 4
+    min_interval = 0.2
 
     url = 'https://ws.audioscrobbler.com/2.0/?method={type}.search&{type}={value}&api_key={api_key}'
 
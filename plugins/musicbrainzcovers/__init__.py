@@ -53,6 +53,9 @@ class MusicBrainzCoverSearch(covers.CoverSearchMethod):
     """
     name = 'musicbrainz'
     title = 'MusicBrainz'
+    # MusicBrainz allows one request per second
+    concurrency = 1
+    min_interval = 1.0
     __caa_url = 'http://coverartarchive.org/release/{mbid}/front-{size}'
 
     def __init__(self, exaile):
@@ -0,0 +1,101 @@
+#!/usr/bin/env python2
+"""
+Micro-benchmark for encoding a synthetic daap.databasesongs listing, with
+the DAAPObject encoder and with the string concatenation it replaced.
+
+Run from the source directory:
+
+    PYTHONPATH=plugins/daapserver python2 tests/plugins/daapserver/bench_encode.py [count]
+"""
+
+import struct
+import sys
+import timeit
+
+from spydaap.daap import do
+
+
+def concat_encode(obj):
+    """The previous encoder, which concatenated the children of each
+    container into one string"""
+    if obj.type != 'c':
+        return obj.encode()
+    value = ''
+    for item in obj.contains:
+        if isinstance(item, str):
+            value += item
+        else:
+            value += concat_encode(item)
+    length = len(value)
+    return struct.pack('!4sI%ss' % length, obj.code, length, value)
+
+
+def make_item(n):
+    return do('dmap.listingitem',
+              [do('dmap.itemkind', 2),
+               do('dmap.containeritemid', n),
+               do('dmap.itemid', n),
+               do('dmap.itemname', 'Title %d' % n),
+               do('daap.songartist', 'Artist %d' % (n % 500)),
+               do('daap.songalbum', 'Album %d' % (n % 5000)),
+               do('daap.songtime', 200000 + n),
+               do('daap.songformat', 'ogg')])
+
+
+def make_listing(items):
+    return do('daap.databasesongs',
+              [do('dmap.status', 200),
+               do('dmap.updatetype', 0),
+               do('dmap.specifiedtotalcount', len(items)),
+               do('dmap.returnedcount', len(items)),
+               do('dmap.listing', items)])
+
+
+class NullFile(object):
+
+    def write(self, data):
+        pass
+
+
+def write_buffers(buffers, chunk_size=64 * 1024):
+    # what DAAPHandler.write_buffers does
+    out = NullFile()
+    chunk = []
+    size = 0
+    for d in buffers:
+        chunk.append(d)
+        size += len(d)
+        if size >= chunk_size:
+            out.write(''.join(chunk))
+            chunk = []
+            size = 0
+    if chunk:
+        out.write(''.join(chunk))
+
+
+def bench(count):
+    items = [make_item(n) for n in xrange(count)]
+    preencoded = [i.encode() for i in items]
+    listing = make_listing(items)
+    assert concat_encode(listing) == listing.encode()
+
+    def best(func):
+        return min(timeit.repeat(func, number=1, repeat=3))
+
+    print("%d items, best of 3 runs" % count)
+    print("%-40s %10s" % ('', 'seconds'))
+    for name, func in [
+            ('concatenation', lambda: concat_encode(listing)),
+            ('encode()', lambda: listing.encode()),
+            ('encode_buffers() + chunked write',
+             lambda: write_buffers(listing.encode_buffers())),
+            ('concatenation, preencoded items',
+             lambda: concat_encode(make_listing(preencoded))),
+            ('encode_buffers(), preencoded items',
+             lambda: write_buffers(make_listing(preencoded).encode_buffers())),
+    ]:
+        print("%-40s %10.3f" % (name, best(func)))
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python2
+"""
+Load test for the DAAP server: serves a temporary library of generated
+files and measures the download throughput of parallel clients, each
+reusing one kept-alive connection.
+
+Run from the source directory:
+
+    EXAILE_DIR=. PYTHONPATH=. python2 tests/plugins/daapserver/bench_load.py [seconds]
+"""
+
+import BaseHTTPServer
+import httplib
+import imp
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', '..', '..', 'plugins', 'daapserver')
+
+FILE_COUNT = 16
+FILE_SIZE = 4 * 1024 * 1024
+CLIENTS = [1, 4, 8, 16]
+
+
+def make_library(dir):
+    from xl.trax import track
+    from xl.trax import trackdb
+    db = trackdb.TrackDB()
+    tracks = []
+    for n in xrange(FILE_COUNT):
+        fn = os.path.join(dir, '%d.ogg' % n)
+        with open(fn, 'wb') as f:
+            f.write(os.urandom(FILE_SIZE))
+        tr = track.Track('file://' + fn, scan=False)
+        tr.set_tags(title=u'Track %d' % n, __length=180)
+        tracks.append(tr)
+    db.add_tracks(tracks)
+    return db
+
+
+def get_free_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def client(port, until, ranged, results):
+    rand = random.Random()
+    conn = httplib.HTTPConnection('127.0.0.1', port)
+    transferred = 0
+    requests = 0
+    while time.time() < until:
+        path = '/databases/1/items/%d.ogg' % rand.randint(1, FILE_COUNT)
+        headers = {}
+        if ranged:
+            # seeking clients ask for the rest of the file
+            headers['Range'] = 'bytes=%d-' % rand.randint(0, FILE_SIZE - 1)
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        while True:
+            data = response.read(256 * 1024)
+            if not data:
+                break
+            transferred += len(data)
+        requests += 1
+    conn.close()
+    results.append((transferred, requests))
+
+
+def run(port, clients, seconds, ranged):
+    results = []
+    until = time.time() + seconds
+    threads = [threading.Thread(target=client,
+                                args=(port, until, ranged, results))
+               for n in xrange(clients)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    transferred = sum(r[0] for r in results)
+    requests = sum(r[1] for r in results)
+    print("%8d %8s %12.1f %12.1f" % (clients, ranged and 'yes' or 'no',
+                                     transferred / elapsed / 1024 / 1024,
+                                     requests / elapsed))
+
+
+def bench(seconds):
+    # load the plugin like xl.plugins does
+    sys.path.insert(0, PLUGIN_DIR)
+    daapserver = imp.load_source('daapserver',
+                                 os.path.join(PLUGIN_DIR, '__init__.py'))
+    import server
+
+    # don't log every request
+    BaseHTTPServer.BaseHTTPRequestHandler.log_message = lambda *args: None
+
+    dir = tempfile.mkdtemp()
+    try:
+        library = daapserver.CollectionWrapper(make_library(dir))
+        port = get_free_port()
+        daap = server.DaapServer(library, name='bench', host='127.0.0.1',
+                                 port=port)
+        daap.start()
+        while daap.httpd is None:
+            time.sleep(0.1)
+
+        print("%d files of %d MiB, %d seconds per run, sendfile: %s" % (
+            FILE_COUNT, FILE_SIZE / 1024 / 1024, seconds,
+            server.spydaap.server.sendfile is not None))
+        print("%8s %8s %12s %12s" % ('clients', 'ranged', 'MiB/s', 'requests/s'))
+        for clients in CLIENTS:
+            for ranged in (False, True):
+                run(port, clients, seconds, ranged)
+
+        daap.stop()
+        library.close()
+    finally:
+        shutil.rmtree(dir)
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,120 @@
+import os
+import struct
+import sys
+
+import pytest
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', '..', '..', 'plugins', 'daapserver')
+sys.path.insert(0, PLUGIN_DIR)
+
+from spydaap import server
+from spydaap.daap import do
+
+
+class TestParseRange(object):
+
+    @pytest.mark.parametrize('value,expected', [
+        ('bytes=0-99', (0, 99)),
+        ('bytes=10-19', (10, 19)),
+        (' bytes=10-19 ', (10, 19)),
+        # open-ended
+        ('bytes=10-', (10, 99)),
+        # suffix
+        ('bytes=-10', (90, 99)),
+        ('bytes=-1000', (0, 99)),
+        # past the end
+        ('bytes=90-1000', (90, 99)),
+    ])
+    def test_range(self, value, expected):
+        assert server.parse_range(value, 100) == expected
+
+    @pytest.mark.parametrize('value,size', [
+        ('bytes=-0', 100),
+        ('bytes=-10', 0),
+        ('bytes=100-', 100),
+        ('bytes=100-200', 100),
+        ('bytes=0-', 0),
+    ])
+    def test_unsatisfiable(self, value, size):
+        assert server.parse_range(value, size) is None
+
+    @pytest.mark.parametrize('value', [
+        'bytes=20-10', 'bytes=-', 'bytes=0-1,5-6', 'items=0-1', 'bytes=a-b',
+    ])
+    def test_invalid(self, value):
+        with pytest.raises(ValueError):
+            server.parse_range(value, 100)
+
+
+class TestGetItem(object):
+
+    def setup(self):
+        self.sent = []
+
+        class MetadataCache(object):
+            def get_item_by_id(cache, id):
+                return self
+
+        sent = self.sent
+
+        class Handler(server.makeDAAPHandlerClass('test', None,
+                                                  MetadataCache(), None)):
+            def __init__(self):
+                # no request to handle
+                pass
+
+            def h(self, data, **kwargs):
+                sent.append((data, kwargs))
+
+        self.handler = Handler()
+
+    def get_original_filename(self):
+        return self.filename
+
+    def get(self, tmpdir, range):
+        self.filename = str(tmpdir.join('item.ogg'))
+        with open(self.filename, 'wb') as f:
+            f.write('x' * 100)
+        self.handler.headers = {'Range': range}
+        self.handler.do_GET_item(1, 1, 'ogg')
+        data, kwargs = self.sent.pop()
+        if isinstance(data, file):
+            data.close()
+        return kwargs.get('status', 200), kwargs.get('extra_headers')
+
+    def test_partial(self, tmpdir):
+        assert self.get(tmpdir, 'bytes=-10') == \
+            (206, {'Content-Range': 'bytes 90-99/100'})
+
+    def test_unsatisfiable(self, tmpdir):
+        assert self.get(tmpdir, 'bytes=100-') == \
+            (416, {'Content-Range': 'bytes */100'})
+
+    def test_invalid_ignored(self, tmpdir):
+        assert self.get(tmpdir, 'bytes=20-10') == (200, {})
+
+
+def concat_encode(obj):
+    # containers hold their children's bytes after an 8 byte header
+    if obj.type != 'c':
+        return obj.encode()
+    value = ''.join(item if isinstance(item, str) else concat_encode(item)
+                    for item in obj.contains)
+    return struct.pack('!4sI', obj.code, len(value)) + value
+
+
+def test_encode_buffers():
+    item = do('dmap.listingitem', [
+        do('dmap.itemkind', 2),
+        do('dmap.itemid', 7),
+        do('dmap.itemname', 'name'),
+        do('daap.songtime', 1000),
+    ])
+    obj = do('daap.databasesongs', [
+        do('dmap.status', 200),
+        do('dmap.listing', [item, item.encode(), do('dmap.listingitem', [])]),
+    ])
+    expected = concat_encode(obj)
+    assert ''.join(obj.encode_buffers()) == expected
+    assert obj.encode() == expected
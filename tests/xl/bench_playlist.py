@@ -0,0 +1,63 @@
+#!/usr/bin/env python2
+"""
+Micro-benchmark for growing a playlist one track at a time, the way the
+queue and dynamic mode do, summing track lengths the way the schedule
+column does, and then removing random slices of it.
+
+Run from the source directory:
+
+    EXAILE_DIR=. PYTHONPATH=. python2 tests/xl/bench_playlist.py [count]
+"""
+
+import random
+import sys
+import time
+
+from xl import playlist
+from xl.trax import track
+
+
+def bench(count):
+    tracks = [track.Track('file:///bench/%d.ogg' % n, scan=False)
+              for n in xrange(count)]
+    rand = random.Random(0)
+    for tr in tracks:
+        tr.set_tag_raw('__length', rand.uniform(60, 600), notify_changed=False)
+    pl = playlist.Playlist('bench')
+
+    start = time.time()
+    for n, tr in enumerate(tracks):
+        pl.append(tr)
+        if n == count // 2:
+            pl.current_position = n
+            pl.spat_position = n
+    elapsed = time.time() - start
+    print("append %d tracks: %.3f s" % (count, elapsed))
+
+    # a screenful of rows near the end, as redrawn by the schedule column
+    rows = xrange(count - 50, count)
+    current = pl.current_position
+    start = time.time()
+    for position in rows:
+        sum([t.get_tag_raw('__length') for t in pl[current:position]])
+    elapsed = time.time() - start
+    print("schedule times of %d rows, summed: %.3f s" % (len(rows), elapsed))
+
+    start = time.time()
+    for position in rows:
+        pl.get_duration(current, position)
+    elapsed = time.time() - start
+    print("schedule times of %d rows, indexed: %.3f s" % (len(rows), elapsed))
+
+    start = time.time()
+    removals = 0
+    while len(pl) > 10:
+        first = rand.randint(0, len(pl) - 10)
+        del pl[first:first + rand.randint(1, 10)]
+        removals += 1
+    elapsed = time.time() - start
+    print("%d random slice removals: %.3f s" % (removals, elapsed))
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,61 @@
+import pytest
+
+from xl.common import MetadataList
+
+
+class TestMetadataList(object):
+
+    def setup(self):
+        self.list = MetadataList(['a', 'b', 'c', 'b'], [1, 2, 3, 4])
+
+    def test_lookups(self):
+        assert 'b' in self.list
+        assert 'd' not in self.list
+        assert self.list.count('b') == 2
+        assert self.list.index('b') == 1
+        assert self.list.index('b', 2) == 3
+        assert self.list.index('b', -1) == 3
+        with pytest.raises(ValueError):
+            self.list.index('b', 2, 3)
+        with pytest.raises(ValueError):
+            self.list.index('d')
+
+    def test_append_and_pop(self):
+        assert self.list.index('c') == 2
+        self.list.append('c')
+        self.list.extend(['d'])
+        assert self.list.index('c', 3) == 4
+        assert self.list.pop() == 'd'
+        assert 'd' not in self.list
+        del self.list[-2:]
+        assert self.list.index('b') == 1
+        assert self.list.count('c') == 1
+
+    def test_changes_in_the_middle(self):
+        assert self.list.index('c') == 2
+        del self.list[0:2]
+        assert self.list.index('c') == 0
+        assert self.list.count('b') == 1
+        self.list[0:0] = ['b', 'a']
+        assert self.list.index('c') == 2
+        assert self.list.index('b') == 0
+        self.list.reverse()
+        assert self.list.index('a') == 2
+        self.list[0] = 'e'
+        assert self.list.count('b') == 1
+        assert self.list.index('b') == 3
+        assert self.list.metadata[0] is None
+
+    def test_insert(self):
+        self.list.insert(1, 'e', 5)
+        self.list.insert(-1, 'f', 6)
+        assert list(self.list) == ['a', 'e', 'b', 'c', 'f', 'b']
+        assert self.list.metadata == [1, 5, 2, 3, 6, 4]
+        assert self.list.index('f') == 4
+
+    def test_unhashable(self):
+        l = MetadataList([[1], [2]])
+        assert [2] in l
+        assert l.index([2]) == 1
+        l.append([3])
+        assert l.count([3]) == 1
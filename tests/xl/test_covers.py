@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+
+from xl import covers
+from xl.trax import track
+
+
+class TestMemoryCache(object):
+
+    def test_lru(self):
+        cache = covers.MemoryCache(10)
+        cache.add('a', 'aaaa')
+        cache.add('b', 'bbbb')
+        assert cache.get('a') == 'aaaa'
+        cache.add('c', 'cccc')
+        assert cache.get('b') is None
+        assert cache.get('a') == 'aaaa'
+        assert cache.get('c') == 'cccc'
+        assert cache.size == 8
+
+    def test_too_large(self):
+        cache = covers.MemoryCache(10)
+        cache.add('a', 'a' * 11)
+        assert cache.get('a') is None
+        assert cache.size == 0
+
+    def test_set_max_size(self):
+        cache = covers.MemoryCache(10)
+        cache.add('a', 'aaaa')
+        cache.add('b', 'bbbb')
+        cache.set_max_size(4)
+        assert cache.get('a') is None
+        assert cache.get('b') == 'bbbb'
+
+
+class TestCoverManager(object):
+
+    def setup(self):
+        self.tr = track.Track('/covers/foo')
+        self.tr.set_tag_raw('album', u'foo')
+
+    def test_cover_data_cached(self, tmpdir):
+        manager = covers.CoverManager(str(tmpdir))
+        manager.methods['src'] = covers.CoverSearchMethod()
+        manager.set_cover(self.tr, 'src:x', 'data')
+        db_string = manager.get_db_string(self.tr)
+        assert db_string.startswith('cache:')
+        assert manager.get_cover_data(db_string) == 'data'
+        os.remove(str(tmpdir.join('cache', db_string[6:])))
+        assert manager.get_cover_data(db_string) == 'data'
+
+    def test_source_not_cached(self, tmpdir):
+        manager = covers.CoverManager(str(tmpdir))
+        reads = []
+        manager.methods['file'] = covers.CoverSearchMethod()
+        manager.methods['file'].get_cover_data = \
+            lambda key: reads.append(key) or 'data'
+        assert manager.get_cover_data('file:x') == 'data'
+        assert manager.get_cover_data('file:x') == 'data'
+        assert reads == ['x', 'x']
+        assert manager.get_thumbnail_path('file:x', (10, 10)) is None
+
+    def test_set_cover_forgets(self, tmpdir):
+        manager = covers.CoverManager(str(tmpdir))
+        manager.methods['src'] = covers.CoverSearchMethod()
+        manager.set_cover(self.tr, 'src:one', 'one')
+        assert manager.get_cover(self.tr) == 'one'
+        path = manager.get_thumbnail_path(manager.get_db_string(self.tr),
+                                          (10, 10))
+        open(path, 'w').close()
+
+        manager.set_cover(self.tr, 'src:two', 'two')
+        assert not os.path.exists(path)
+        assert manager.get_cover(self.tr) == 'two'
+
+    def test_prunes_thumbnails(self, tmpdir):
+        manager = covers.CoverManager(str(tmpdir))
+        manager.methods['src'] = covers.CoverSearchMethod()
+        manager.set_cover(self.tr, 'src:one', 'one')
+        kept = manager.get_thumbnail_path(manager.get_db_string(self.tr),
+                                          (10, 10))
+        stale = manager.get_thumbnail_path('cache:gone', (10, 10))
+        open(kept, 'w').close()
+        open(stale, 'w').close()
+        manager.save()
+
+        covers.CoverManager(str(tmpdir))
+        assert os.path.exists(kept)
+        assert not os.path.exists(stale)
+
+
+class SlowCoverSearch(covers.CoverSearchMethod):
+    name = 'slow'
+    use_cache = False
+    concurrency = 2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.searches = []
+
+    def find_covers(self, track, limit=-1):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.searches.append(track)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return [track.get_tag_raw('album', join=True)]
+
+    def get_cover_data(self, db_string):
+        return 'data:' + db_string
+
+
+class TestFetchCovers(object):
+
+    def test_fetch_covers(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(covers.settings, 'get_option',
+                            lambda option, default=None: 8
+                            if option == 'covers/fetch_workers' else default)
+        manager = covers.CoverManager(str(tmpdir))
+        method = SlowCoverSearch()
+        manager.methods = {'slow': method}
+        tracks = []
+        for n in range(6):
+            tr = track.Track('/covers/fetch%d' % n)
+            # two tracks per album
+            tr.set_tag_raw('album', u'album%d' % (n // 2))
+            tracks.append(tr)
+
+        results = dict(manager.fetch_covers(tracks))
+
+        assert results == {n: 'data:album%d' % (n // 2) for n in range(6)}
+        assert method.max_running == 2
+        assert len(method.searches) == 3
+        assert manager.get_db_string(tracks[5]) == 'slow:album2'
+
+    def test_limiter_interval(self):
+        limiter = covers._MethodLimiter(None, 0.05)
+        start = time.time()
+        for n in range(3):
+            with limiter:
+                pass
+        assert time.time() - start >= 0.1
@@ -99,3 +99,111 @@ def test_thread_events():
     ncb.destroy()
 
     _finish_events()
+
+
+class BatchCallback(object):
+
+    def __init__(self):
+        self.batches = []
+        event.add_ui_batch_callback(self.on_cb, 'test')
+
+    def destroy(self):
+        event.remove_callback(self.on_cb, 'test')
+
+    def on_cb(self, type, obj, batch):
+        self.batches.append(batch)
+
+
+def test_batch_events(monkeypatch):
+    timeouts = []
+    monkeypatch.setattr(GLib, 'timeout_add',
+                        lambda delay, fn: timeouts.append(fn))
+    _init_events()
+    bcb = BatchCallback()
+    foo, bar = event.Nothing(), event.Nothing()
+
+    def _run():
+        on_ui_thread[0] = False
+        event.log_event('test', foo, {'artist'})
+        event.log_event('test', bar, {'title'})
+        event.log_event('test', foo, {'album'})
+
+    t = threading.Thread(target=_run)
+    t.start()
+    t.join()
+
+    # collected on the emitting thread, and delivered once
+    assert event.EVENT_MANAGER.pending_ui == []
+    assert len(timeouts) == 1
+    assert bcb.batches == []
+    timeouts[0]()
+
+    assert len(bcb.batches) == 1
+    batch = bcb.batches[0]
+    assert [e.object for e in batch] == [foo, bar, foo]
+    assert batch.get_objects() == {foo, bar}
+    assert batch.get_data_union() == {'artist', 'title', 'album'}
+
+    # a new batch is started after delivery
+    event.log_event('test', foo, None)
+    assert len(timeouts) == 2
+    bcb.destroy()
+    timeouts[1]()
+    assert len(bcb.batches) == 1
+
+    _finish_events()
+
+
+def test_dispatch_follows_callbacks():
+    _init_events()
+    source = event.Nothing()
+    ncb = NormalCallback()
+    calls = []
+
+    def on_source(type, obj, data):
+        calls.append(obj)
+
+    on_ui_thread[0] = True
+    event.log_event('test', source, None)
+    assert ncb.called is True
+    assert calls == []
+
+    event.add_callback(on_source, 'test', source)
+    event.log_event('test', source, None)
+    event.log_event('test', event.Nothing(), None)
+    assert calls == [source]
+
+    event.remove_callback(on_source, 'test', source)
+    event.log_event('test', source, None)
+    assert calls == [source]
+
+    ncb.destroy()
+    ncb.called = False
+    event.log_event('test', source, None)
+    assert ncb.called is False
+
+    _finish_events()
+
+
+def test_stats():
+    _init_events()
+    ncb = NormalCallback()
+    event.EVENT_MANAGER.set_stats_enabled(True)
+
+    on_ui_thread[0] = True
+    event.log_event('test', ncb, None)
+    event.log_event('test', ncb, None)
+    event.log_event('other', ncb, None)
+
+    stats = event.EVENT_MANAGER.get_stats()
+    assert stats.get_emit_counts() == {'test': 2, 'other': 1}
+    (seconds, calls, evty, name), = stats.get_callback_times()
+    assert calls == 2
+    assert evty == 'test'
+    assert name.endswith('NormalCallback.on_cb')
+
+    event.EVENT_MANAGER.set_stats_enabled(False)
+    assert event.EVENT_MANAGER.get_stats() is None
+    ncb.destroy()
+
+    _finish_events()
@@ -0,0 +1,219 @@
+from xl import playlist
+from xl.trax import track
+
+
+def get_tracks(count):
+    return [track.Track('file:///foo/%d.ogg' % n, scan=False)
+            for n in range(count)]
+
+
+class TestPlaylistPositions(object):
+
+    def setup(self):
+        self.tracks = get_tracks(10)
+        self.pl = playlist.Playlist('test', self.tracks)
+        self.pl.current_position = 5
+        self.pl.spat_position = 7
+
+    def test_append(self):
+        self.pl.append(get_tracks(1)[0])
+        assert self.pl.current_position == 5
+        assert self.pl.spat_position == 7
+
+    def test_insert_before(self):
+        self.pl[2:2] = get_tracks(3)
+        assert self.pl.current_position == 8
+        assert self.pl.spat_position == 10
+        assert self.pl.current is self.tracks[5]
+
+    def test_delete_before(self):
+        del self.pl[0:2]
+        assert self.pl.current_position == 3
+        assert self.pl.spat_position == 5
+        del self.pl[0]
+        assert self.pl.current_position == 2
+        assert self.pl.spat_position == 4
+
+    def test_delete_negative_index(self):
+        del self.pl[-1]
+        assert self.pl.current_position == 5
+        assert self.pl.spat_position == 7
+
+    def test_delete_spat(self):
+        del self.pl[6:9]
+        assert self.pl.current_position == 5
+        assert self.pl.spat_position == -1
+
+    def test_extended_slice(self):
+        del self.pl[0:10:3]
+        assert self.pl.current_position == 3
+        assert self.pl.spat_position == 4
+        del self.pl[::-2]
+        assert self.pl.current_position == 1
+        assert self.pl.spat_position == 2
+
+    def test_move(self):
+        moved = self.pl[6:8]
+        del self.pl[6:8]
+        assert self.pl.spat_position == -1
+        self.pl[0:0] = moved
+        assert self.pl.current_position == 7
+        assert self.pl.spat_position == 1
+        assert self.pl.spat_position == self.pl.index(self.tracks[7])
+
+    def test_delete_current(self):
+        # the previous track becomes the current one
+        del self.pl[5]
+        assert self.pl.current_position == 4
+        assert self.pl.current is self.tracks[4]
+
+    def test_sort_follows_spat(self):
+        self.pl.sort(['__loc'], reverse=True)
+        assert self.pl.spat_position == self.pl.index(self.tracks[7])
+
+    def test_unset_spat(self):
+        self.pl.spat_position = -1
+        self.pl.append(get_tracks(1)[0])
+        assert self.pl.spat_position == -1
+
+
+class TestPlaylistShuffle(object):
+
+    def setup(self):
+        self.tracks = get_tracks(12)
+        for n, tr in enumerate(self.tracks):
+            tr.set_tag_raw('album', u'album%d' % (n // 4))
+            tr.set_tag_raw('tracknumber', u'%d' % (n % 4 + 1))
+        self.pl = playlist.Playlist('test', self.tracks)
+
+    def play_all(self):
+        played = []
+        while self.pl.next() is not None:
+            played.append(self.pl.current)
+        return played
+
+    def test_track_plays_each_once(self):
+        self.pl.shuffle_mode = 'track'
+        assert sorted(self.play_all()) == sorted(self.tracks)
+
+    def test_track_includes_appended(self):
+        self.pl.shuffle_mode = 'track'
+        played = [self.pl.next(), self.pl.next()]
+        extra = get_tracks(13)[12]
+        self.pl.append(extra)
+        played += self.play_all()
+        assert sorted(played) == sorted(self.tracks + [extra])
+
+    def test_album_keeps_albums_together(self):
+        self.pl.shuffle_mode = 'album'
+        played = self.play_all()
+        assert sorted(played) == sorted(self.tracks)
+        for n in range(0, 12, 4):
+            album = played[n:n + 4]
+            assert len(set(tr.get_tag_raw('album')[0] for tr in album)) == 1
+            assert [tr.get_tag_raw('tracknumber')[0] for tr in album] == \
+                [u'1', u'2', u'3', u'4']
+
+    def test_prev(self):
+        self.pl.shuffle_mode = 'track'
+        first = self.pl.next()
+        second = self.pl.next()
+        assert self.pl.prev() is first
+        # first is still played, second is back in the pool
+        played = self.play_all()
+        assert second in played
+        assert sorted([first] + played) == sorted(self.tracks)
+
+
+class TestPlaylistDuration(object):
+
+    def setup(self):
+        self.tracks = get_tracks(10)
+        for n, tr in enumerate(self.tracks):
+            tr.set_tag_raw('__length', float(n + 1))
+        self.pl = playlist.Playlist('test', self.tracks)
+        self.pl.current_position = 5
+
+    def test_durations(self):
+        assert self.pl.get_duration(2, 5) == 3 + 4 + 5
+        assert self.pl.get_duration(5, 2) == 0
+        assert self.pl.get_total_duration() == 55
+        assert self.pl.get_remaining_duration() == 6 + 7 + 8 + 9 + 10
+
+    def test_unknown_length(self):
+        self.tracks[3].set_tag_raw('__length', None)
+        assert self.pl.get_duration(2, 5) is None
+        assert self.pl.get_duration(4, 6) == 5 + 6
+        assert self.pl.get_total_duration() == 51
+
+    def test_follows_changes(self):
+        assert self.pl.get_total_duration() == 55
+        self.pl.append(self.tracks[0])
+        assert self.pl.get_total_duration() == 56
+        del self.pl[2:4]
+        assert self.pl.get_duration(2, 4) == 5 + 6
+        self.tracks[0].set_tag_raw('__length', 11.0)
+        assert self.pl.get_total_duration() == 49 + 2 * 10
+        del self.pl[8:]
+        assert self.pl.get_total_duration() == 11 + 2 + 5 + 6 + 7 + 8 + 9 + 10
+        self.pl[1] = self.tracks[2]
+        assert self.pl.get_duration(0, 2) == 11 + 3
+
+
+class TestPlaylistFile(object):
+
+    def setup(self):
+        self.tracks = get_tracks(3)
+        self.stream = track.Track('http://example.com/stream.ogg', scan=False)
+        self.stream.set_tag_raw('title', u'Str\xe9am')
+        self.pl = playlist.Playlist(u'Pl\xe4ylist', self.tracks + [self.stream])
+        self.pl.current_position = 1
+        self.pl.repeat_mode = 'all'
+
+    def test_round_trip(self, tmpdir):
+        path = str(tmpdir.join('pl'))
+        self.pl.save_to_location(path)
+        lines = open(path).read().split('\n')
+        assert lines[0] == 'file:///foo/0.ogg'
+        assert lines[3].startswith('http://example.com/stream.ogg\t')
+
+        pl = playlist.Playlist('other')
+        pl.load_from_location(path)
+        assert list(pl) == self.tracks + [self.stream]
+        assert pl.name == u'Pl\xe4ylist'
+        assert pl.current_position == 1
+        assert pl.repeat_mode == 'all'
+        assert not pl.dirty
+
+    def test_saves_only_changes(self, tmpdir):
+        path = str(tmpdir.join('pl'))
+        self.pl.save_to_location(path)
+        open(path, 'w').close()
+        self.pl.save_to_location(path)
+        assert open(path).read() == ''
+        self.pl.append(self.tracks[0])
+        self.pl.save_to_location(path)
+        pl = playlist.Playlist('other')
+        pl.load_from_location(path)
+        assert len(pl) == 5
+
+    def test_legacy_format(self, tmpdir):
+        path = tmpdir.join('pl')
+        path.write('file:///foo/1.ogg\tartist=foo\n'
+                   'http://example.com/stream.ogg\ttitle=bar\n'
+                   'EOF\n'
+                   'repeat_mode=S: playlist\n'
+                   'name=U: legacy\n')
+        pl = playlist.Playlist('other')
+        pl.load_from_location(str(path))
+        assert list(pl) == [self.tracks[1], self.stream]
+        assert self.stream.get_tag_raw('title') == [u'bar']
+        assert pl.repeat_mode == 'all'
+        assert pl.name == u'legacy'
+
+    def test_manager_names(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(playlist.xdg, 'get_data_dirs',
+                            lambda: [str(tmpdir)])
+        self.pl.save_to_location(str(tmpdir.mkdir('playlists').join('pl')))
+        manager = playlist.PlaylistManager()
+        assert manager.list_playlists() == [u'Pl\xe4ylist']
@@ -0,0 +1,51 @@
+import pytest
+
+from xl import settings
+
+
+class TestSettingsManager(object):
+
+    def setup(self):
+        self.settings = settings.SettingsManager()
+
+    def test_roundtrip(self):
+        values = {
+            'test/int': 3,
+            'test/float': 1.5,
+            'test/bool': True,
+            'test/unicode': u'f\xf6o',
+            'test/list': [u'a', 1, (2, 3), {'b': [None]}],
+            'test/dict': {'a': [1, 2], u'b': {'c': 1.0}},
+        }
+        for option, value in values.iteritems():
+            self.settings.set_option(option, value, save=False)
+        for option, value in values.iteritems():
+            assert self.settings.get_option(option) == value
+
+    def test_default(self):
+        assert self.settings.get_option('test/missing', 5) == 5
+        assert self.settings.get_option('test/missing') is None
+
+    def test_cache(self):
+        self.settings.set_option('test/list', [1, [2]], save=False)
+        hits, misses = self.settings.get_cache_stats()
+        value = self.settings.get_option('test/list')
+        value[1].append(3)
+        assert self.settings.get_option('test/list') == [1, [2]]
+        assert self.settings.get_cache_stats() == (hits + 1, misses + 1)
+
+    def test_cache_invalidation(self):
+        self.settings.set_option('test/int', 1, save=False)
+        assert self.settings.get_option('test/int') == 1
+        self.settings.set_option('test/int', 2, save=False)
+        assert self.settings.get_option('test/int') == 2
+        self.settings._set_direct('test/int', 'I: 3')
+        assert self.settings.get_option('test/int') == 3
+        self.settings.remove_option('test/int')
+        assert self.settings.get_option('test/int', 4) == 4
+
+    def test_no_eval(self):
+        with pytest.raises(ValueError):
+            self.settings._str_to_val("L: [__import__('os').getpid()]")
+        self.settings._set_direct('test/bad', "L: [open('x')]")
+        assert self.settings.get_option('test/bad', []) == []
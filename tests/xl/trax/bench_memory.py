@@ -0,0 +1,84 @@
+#!/usr/bin/env python2
+"""
+Measures the resident memory of a synthetic collection, with the tags of
+each track kept in a dict and in a CompactTags.
+
+Run from the source directory:
+
+    EXAILE_DIR=. PYTHONPATH=. python2 tests/xl/trax/bench_memory.py [count]
+"""
+
+import gc
+import random
+import subprocess
+import sys
+import time
+
+from xl.trax import track
+from xl.trax import trackdb
+
+
+def get_rss():
+    """Returns the resident set size of this process, in KiB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+
+def make_tags(count):
+    rand = random.Random(0)
+    genres = [u'Rock', u'Jazz', u'Pop', u'Electronic', u'Classical']
+    for n in xrange(count):
+        artist = rand.randint(0, count // 100)
+        album = artist * 10 + rand.randint(0, 9)
+        basedir = '/music/artist%d/album%d' % (artist, album)
+        yield {
+            '__loc': 'file://%s/%d.ogg' % (basedir, n),
+            '__basedir': basedir,
+            '__modified': 1500000000.0 + n,
+            '__date_added': 1500000000.0 + n,
+            '__length': 200.0 + n % 100,
+            '__bitrate': 192000,
+            'artist': [u'Artist %d' % artist],
+            'albumartist': [u'Artist %d' % artist],
+            'album': [u'Album %d' % album],
+            'date': [u'%d' % (1960 + album % 60)],
+            'genre': [rand.choice(genres)],
+            'title': [u'Title %d' % n],
+            'tracknumber': [u'%d' % (n % 12 + 1)],
+            'discnumber': [u'1'],
+        }
+
+
+def measure(count, compact):
+    track.Track._Track__compact_storage = compact
+    gc.collect()
+    before = get_rss()
+    start = time.time()
+    db = trackdb.TrackDB()
+    db.add_tracks([track.Track._restore(tags) for tags in make_tags(count)])
+    elapsed = time.time() - start
+    gc.collect()
+    after = get_rss()
+    print("%-10s %8d %10d %10d %10.1f %8.2f" % (
+        'compact' if compact else 'dict', len(db), before, after,
+        (after - before) * 1024.0 / count, elapsed))
+
+
+def bench(count):
+    print("%d tracks, RSS in KiB" % count)
+    print("%-10s %8s %10s %10s %10s %8s" % (
+        'storage', 'tracks', 'before', 'after', 'B/track', 'load (s)'))
+    sys.stdout.flush()
+    # each mode gets a fresh process, so that freed memory isn't reused
+    for mode in ('dict', 'compact'):
+        subprocess.check_call([sys.executable, __file__, str(count), mode])
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    if len(sys.argv) > 2:
+        measure(count, sys.argv[2] == 'compact')
+    else:
+        bench(count)
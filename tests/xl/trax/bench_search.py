@@ -0,0 +1,71 @@
+#!/usr/bin/env python2
+"""
+Micro-benchmark comparing the compiled TracksMatcher program with the
+matcher tree it is compiled from.
+
+Run from the source directory:
+
+    EXAILE_DIR=. PYTHONPATH=. python2 tests/xl/trax/bench_search.py [count]
+"""
+
+import random
+import sys
+import timeit
+
+from xl.trax import search
+from xl.trax import track
+
+QUERIES = [
+    'foo',
+    'foo bar',
+    'artist==artist7',
+    'artist=17 album=3',
+    '! foo __playcount>5',
+    'foo | bar',
+    'artist~^artist1 __rating>40',
+]
+
+KEYWORD_TAGS = ['artist', 'albumartist', 'album', 'title']
+
+
+def make_tracks(count):
+    words = [u'foo', u'bar', u'baz', u'quux', u'spam', u'eggs']
+    rand = random.Random(0)
+    tracks = []
+    for n in xrange(count):
+        tr = track.Track('file:///bench/%d.ogg' % n, scan=False)
+        tr.set_tags(
+            notify_changed=False,
+            artist=u'artist%d' % rand.randint(0, 200),
+            album=u'album%d %s' % (rand.randint(0, 2000), rand.choice(words)),
+            title=u' '.join(rand.sample(words, 2)),
+            __playcount=rand.randint(0, 10),
+            __rating=rand.randint(0, 5) * 20.0)
+        tracks.append(search.SearchResultTrack(tr))
+    return tracks
+
+
+def bench(count):
+    srtracks = make_tracks(count)
+    print("%d tracks, best of 3 runs" % count)
+    print("%-30s %12s %12s %8s" % ('query', 'tree (t/s)', 'compiled', 'speedup'))
+    for query in QUERIES:
+        matcher = search.TracksMatcher(query, case_sensitive=False,
+                                       keyword_tags=KEYWORD_TAGS)
+
+        def run_tree():
+            for srtr in srtracks:
+                matcher.match_tree(srtr)
+
+        def run_compiled():
+            for srtr in srtracks:
+                matcher.match(srtr)
+
+        tree = min(timeit.repeat(run_tree, number=1, repeat=3))
+        compiled = min(timeit.repeat(run_compiled, number=1, repeat=3))
+        print("%-30s %12d %12d %7.1fx" % (
+            query, count / tree, count / compiled, tree / compiled))
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8
+
+from xl.trax import index
+from xl.trax import search
+from xl.trax import track
+from xl.trax import trackdb
+
+
+def _lower(x):
+    return x.lower()
+
+
+def _same(x):
+    return x
+
+
+def get_tracks():
+    tracks = [track.Track(x) for x in ('foo', 'bar', 'baz', 'quux')]
+    tracks[0].set_tag_raw('artist', u'Foooo')
+    tracks[1].set_tag_raw('artist', [u'bar', u'foo'])
+    tracks[2].set_tag_raw('artist', u'Bär')
+    return tracks
+
+
+class TestTagIndex(object):
+
+    def setup(self):
+        self.tracks = get_tracks()
+        self.index = index.TagIndex()
+        self.index.add_tracks(self.tracks)
+
+    def test_contains(self):
+        found = self.index.contains('artist', u'foo', _same)
+        assert found == {self.tracks[1]}
+
+    def test_contains_case_insensitive(self):
+        found = self.index.contains('artist', u'foo', _lower)
+        assert found == {self.tracks[0], self.tracks[1]}
+
+    def test_contains_shaved(self):
+        found = self.index.contains('artist', u'bar', _lower)
+        assert found == {self.tracks[1], self.tracks[2]}
+
+    def test_exact(self):
+        found = self.index.exact('artist', u'foooo', _lower)
+        assert found == {self.tracks[0]}
+
+    def test_exact_null(self):
+        found = self.index.exact('artist', None, _lower)
+        assert found == {self.tracks[3]}
+
+    def test_alias(self):
+        found = self.index.exact('albumartist', u'foooo', _lower)
+        assert found == {self.tracks[0]}
+
+    def test_unindexable(self):
+        assert self.index.exact('__bitrate', u'0', _lower) is None
+        assert self.index.contains('tracknumber', u'1', _lower) is None
+
+    def test_update_track(self):
+        self.index.contains('artist', u'foo', _same)
+        self.tracks[3].set_tag_raw('artist', u'foo')
+        self.index.update_track(self.tracks[3], {'artist'})
+        found = self.index.contains('artist', u'foo', _same)
+        assert found == {self.tracks[1], self.tracks[3]}
+        assert self.index.exact('artist', None, _same) == set()
+
+    def test_remove_tracks(self):
+        self.index.contains('artist', u'foo', _same)
+        self.index.remove_tracks([self.tracks[1]])
+        assert self.index.contains('artist', u'foo', _same) == set()
+
+
+class TestNumericIndex(object):
+
+    def setup(self):
+        self.tracks = get_tracks()
+        for tr, rating in zip(self.tracks, (20.0, 40.0, 40.0)):
+            tr.set_tag_raw('__rating', rating)
+        self.tracks[0].set_tag_raw('bpm', u'120')
+        self.index = index.TagIndex()
+        self.index.add_tracks(self.tracks)
+
+    def test_greater(self):
+        found = self.index.greater('__rating', 20.0)
+        assert found == {self.tracks[1], self.tracks[2]}
+
+    def test_less_includes_default(self):
+        found = self.index.less('__rating', 40.0)
+        assert found == {self.tracks[0], self.tracks[3]}
+
+    def test_less_includes_nulls(self):
+        assert self.index.less('bpm', 100.0) == set(self.tracks[1:])
+        assert self.index.less('bpm', 0.0) == set()
+
+    def test_exact(self):
+        found = self.index.exact('__rating', u'40', _same)
+        assert found == {self.tracks[1], self.tracks[2]}
+
+    def test_update_track(self):
+        self.index.greater('__rating', 0.0)
+        self.tracks[1].set_tag_raw('__rating', 80.0)
+        self.index.update_track(self.tracks[1], {'__rating'})
+        assert self.index.greater('__rating', 60.0) == {self.tracks[1]}
+        assert self.index.exact('__rating', u'40', _same) == {self.tracks[2]}
+
+    def test_text_tag(self):
+        assert self.index.greater('artist', 0.0) is None
+
+
+class TestTrackDBIndex(object):
+
+    def setup(self):
+        self.tracks = get_tracks()
+        self.db = trackdb.TrackDB()
+        self.db.add_tracks(self.tracks)
+
+    def search(self, query):
+        return {x.track for x in search.search_tracks_from_string(
+            self.db, query, case_sensitive=False, keyword_tags=['artist'])}
+
+    def test_keyword(self):
+        assert self.search('foo') == {self.tracks[0], self.tracks[1]}
+
+    def test_follows_tag_changes(self):
+        assert self.search('artist==foooo') == {self.tracks[0]}
+        self.tracks[3].set_tag_raw('artist', u'FOOOO')
+        assert self.search('artist==foooo') == {self.tracks[0], self.tracks[3]}
+
+    def test_follows_removal(self):
+        assert self.search('foo') == {self.tracks[0], self.tracks[1]}
+        self.db.remove_tracks([self.tracks[0]])
+        assert self.search('foo') == {self.tracks[1]}
+
+    def test_range(self):
+        self.tracks[0].set_tag_raw('__playcount', 5)
+        self.tracks[1].set_tag_raw('__playcount', 10)
+        assert self.search('__playcount>4') == {self.tracks[0], self.tracks[1]}
+        assert self.search('__playcount>4 __playcount<10') == {self.tracks[0]}
+        assert self.search('( __playcount>5 | __playcount==5 )') == \
+            {self.tracks[0], self.tracks[1]}
+
+    def test_falls_back_for_regex(self):
+        assert self.search('artist~^b') == {self.tracks[1], self.tracks[2]}
+
+    def test_list_with_index(self):
+        tracks = list(search.search_tracks_from_string(
+            self.tracks, 'foo', case_sensitive=False, keyword_tags=['artist'],
+            index=self.db.get_index()))
+        assert [x.track for x in tracks] == self.tracks[:2]
+        assert tracks[0].on_tags == ['artist']
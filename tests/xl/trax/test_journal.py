@@ -0,0 +1,77 @@
+
+import gc
+import os
+
+from xl.trax import journal
+from xl.trax import track
+from xl.trax import trackdb
+
+
+def make_db(tmpdir):
+    return trackdb.TrackDB('test', location=str(tmpdir.join('music.db')))
+
+
+def reopen(tmpdir):
+    # every Track must be gone, so that they are restored from disk
+    gc.collect()
+    assert track.Track._get_track_count() == 0
+    return make_db(tmpdir)
+
+
+def get_artists(db):
+    return {tr.get_loc_for_io(): tr.get_tag_raw('artist') for tr in db}
+
+
+class TestTrackDBJournal(object):
+
+    def test_replays_unsaved_changes(self, tmpdir):
+        db = make_db(tmpdir)
+        tracks = [track.Track('/foo/%d.ogg' % i, scan=False) for i in range(3)]
+        db.add_tracks(tracks)
+        db.save_to_location()
+
+        tracks[0].set_tag_raw('artist', u'changed', notify_changed=False)
+        db.remove_tracks([tracks[1]])
+        db.add_tracks([track.Track('/foo/new.ogg', scan=False)])
+        expected = get_artists(db)
+        del tracks, db
+
+        db = reopen(tmpdir)
+        assert get_artists(db) == expected
+        # the recovered changes were saved, and the journal dropped
+        assert not os.path.exists(db._journal.location)
+        del db
+
+        db = reopen(tmpdir)
+        assert get_artists(db) == expected
+
+    def test_saves_only_changed_tracks(self, tmpdir):
+        db = make_db(tmpdir)
+        tracks = [track.Track('/foo/%d.ogg' % i, scan=False) for i in range(3)]
+        db.add_tracks(tracks)
+        db.save_to_location()
+        assert not db._dirty_tracks
+
+        tracks[2].set_tag_raw('artist', u'changed')
+        assert db._dirty_tracks == {db.tracks[tracks[2].get_loc_for_io()]}
+        db.save_to_location()
+        assert not db._dirty_tracks
+        assert not os.path.exists(db._journal.location)
+
+    def test_incomplete_record(self, tmpdir):
+        jnl = journal.TrackDBJournal(str(tmpdir.join('journal')))
+        jnl.set_tags(1, {'artist': [u'foo']})
+        jnl.remove(2)
+        jnl.close()
+        with open(jnl.location, 'r+b') as f:
+            f.truncate(os.path.getsize(jnl.location) - 1)
+        assert list(jnl.read()) == [(journal.TAGS, 1, {'artist': [u'foo']})]
+
+    def test_rotate(self, tmpdir):
+        jnl = journal.TrackDBJournal(str(tmpdir.join('journal')))
+        jnl.remove(1)
+        jnl.rotate()
+        jnl.remove(2)
+        assert list(jnl.read()) == [(journal.REMOVE, 1), (journal.REMOVE, 2)]
+        jnl.commit()
+        assert list(jnl.read()) == [(journal.REMOVE, 2)]
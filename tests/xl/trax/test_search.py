@@ -449,3 +449,58 @@ class TestSearchTracks(object):
         assert gen.next().track == tracks[2]
         with pytest.raises(StopIteration):
             gen.next()
+
+
+class TestCompiledMatcher(object):
+
+    QUERIES = [
+        'foo', 'foo bar', '! foo', 'foo | bar', '( foo | bar )',
+        'artist==foooo', 'artist==__null__', 'album=baz', 'artist~^b',
+        '__playcount>4', '__playcount<10', '! __playcount<10',
+        'foo __playcount>4', 'artist=foo | album=baz',
+    ]
+
+    def setup(self):
+        self.tracks = [track.Track(x) for x in ('foo', 'bar', 'baz', 'quux')]
+        self.tracks[0].set_tags(artist=u'Foooo', __playcount=5)
+        self.tracks[1].set_tags(artist=[u'bar', u'foo'], album=u'Baz')
+        self.tracks[2].set_tags(album=u'foo bar', __playcount=12)
+
+    @pytest.mark.parametrize('query', QUERIES)
+    @pytest.mark.parametrize('case_sensitive', [True, False])
+    def test_same_as_tree(self, query, case_sensitive):
+        matcher = search.TracksMatcher(query, case_sensitive=case_sensitive,
+                                       keyword_tags=['artist', 'album'])
+        for tr in self.tracks:
+            compiled = search.SearchResultTrack(tr)
+            tree = search.SearchResultTrack(tr)
+            result = matcher.match(compiled)
+            assert result == matcher.match_tree(tree)
+            if result:
+                assert sorted(compiled.on_tags) == sorted(tree.on_tags)
+
+    def test_appended_matcher(self):
+        matcher = search.TracksMatcher('foo', keyword_tags=['artist'])
+        srtrack = search.SearchResultTrack(self.tracks[1])
+        assert matcher.match(srtrack)
+        matcher.append_matcher(search.TracksNotInList([self.tracks[1]]))
+        assert not matcher.match(srtrack)
+
+    def test_order(self):
+        compiler = search._QueryCompiler(True)
+        matcher = search.TracksMatcher('album=b artist=foo __rating>4 a~x')
+        tags = [ma.tag for ma in compiler.order(matcher.matchers)]
+        # substrings reject more tracks the longer they are, the regex
+        # and the comparison are estimated the same and keep their order
+        written = [ma.tag for ma in matcher.matchers]
+        assert tags == ['artist', 'album'] + [tag for tag in written
+                                              if tag in ('a', '__rating')]
+
+    def test_order_cost(self):
+        compiler = search._QueryCompiler(True)
+        matcher = search.TracksMatcher(
+            '! foo __playcount>5',
+            keyword_tags=['artist', 'albumartist', 'album', 'title'])
+        ordered = compiler.order(matcher.matchers)
+        # the single comparison is cheaper than the four keyword tests
+        assert ordered[0].tag == '__playcount'
@@ -0,0 +1,70 @@
+# -*- coding: utf-8
+
+import gc
+import os
+
+from xl.trax import snapshot
+from xl.trax import track
+from xl.trax import trackdb
+
+
+RECORDS = [
+    (0, {}, {'__loc': u'file:///foo/0.ogg', 'artist': [u'Bär', u'foo'],
+             'album': [u'foo'], '__rating': 40, '__length': 12.5,
+             '__compilation': (u'/foo', u'foo'), 'title': None}),
+    (3, {'extra': 1}, {'__loc': u'file:///foo/1.ogg', 'artist': [u'foo'],
+                       '__basedir': '/foo', 'genre': []}),
+]
+
+
+def test_roundtrip(tmpdir):
+    location = str(tmpdir.join('snapshot'))
+    assert snapshot.write_snapshot(location, (1, 2), RECORDS)
+    assert snapshot.read_snapshot(location, (1, 2)) == RECORDS
+
+
+def test_values_not_shared(tmpdir):
+    location = str(tmpdir.join('snapshot'))
+    snapshot.write_snapshot(location, 1, RECORDS)
+    records = snapshot.read_snapshot(location, 1)
+    assert records[0][2]['album'] is not records[1][2]['artist']
+
+
+def test_outdated(tmpdir):
+    location = str(tmpdir.join('snapshot'))
+    snapshot.write_snapshot(location, 1, RECORDS)
+    assert snapshot.read_snapshot(location, 2) is None
+    assert snapshot.read_snapshot(location + '-missing', 1) is None
+
+
+def test_unreadable(tmpdir):
+    location = str(tmpdir.join('snapshot'))
+    snapshot.write_snapshot(location, 1, RECORDS)
+    with open(location, 'r+b') as f:
+        f.truncate(os.path.getsize(location) // 2)
+    assert snapshot.read_snapshot(location, 1) is None
+
+
+def test_trackdb_loads_snapshot(tmpdir, monkeypatch):
+    location = str(tmpdir.join('music.db'))
+    db = trackdb.TrackDB('test', location=location)
+    tracks = [track.Track('/foo/%d.ogg' % i, scan=False) for i in range(3)]
+    tracks[0].set_tag_raw('artist', u'foo')
+    db.add_tracks(tracks)
+    db.save_to_location(write_snapshot=True)
+    expected = {tr.get_loc_for_io(): tr._pickles() for tr in db}
+    del db, tracks
+    gc.collect()
+
+    loaded = []
+    read_snapshot = snapshot.read_snapshot
+
+    def spy(*args):
+        records = read_snapshot(*args)
+        loaded.append(records is not None)
+        return records
+    monkeypatch.setattr(snapshot, 'read_snapshot', spy)
+
+    db = trackdb.TrackDB('test', location=location)
+    assert loaded == [True]
+    assert {tr.get_loc_for_io(): tr._pickles() for tr in db} == expected
@@ -0,0 +1,58 @@
+from copy import deepcopy
+
+from xl.trax import tagstore
+
+
+class TestCompactTags(object):
+
+    def setup(self):
+        self.tags = tagstore.CompactTags({'__loc': 'file:///foo',
+                                          'artist': [u'foo'],
+                                          'title': [u'bar']})
+
+    def test_get(self):
+        assert self.tags['title'] == [u'bar']
+        assert self.tags.get('title') == [u'bar']
+        assert self.tags.get('album') is None
+        assert 'artist' in self.tags
+        assert 'album' not in self.tags
+        assert len(self.tags) == 3
+
+    def test_returns_lists(self):
+        value = self.tags['artist']
+        assert type(value) is list
+        value.append(u'baz')
+        assert self.tags['artist'] == [u'foo']
+
+    def test_keeps_tuples(self):
+        self.tags['__compilation'] = (u'foo', u'bar')
+        assert type(self.tags['__compilation']) is tuple
+
+    def test_set(self):
+        self.tags['album'] = [u'baz']
+        self.tags['title'] = None
+        assert dict(self.tags.iteritems()) == {'__loc': 'file:///foo',
+                                               'artist': [u'foo'],
+                                               'title': None,
+                                               'album': [u'baz']}
+
+    def test_pop(self):
+        assert self.tags.pop('artist') == [u'foo']
+        assert self.tags.pop('artist', None) is None
+        assert sorted(self.tags.keys()) == ['__loc', 'title']
+        assert self.tags['title'] == [u'bar']
+
+    def test_shares_names_and_values(self):
+        other = tagstore.CompactTags({'__loc': 'file:///bar',
+                                      'artist': [u'foo'],
+                                      'title': [u'baz']})
+        self.tags['album'] = [u'x']
+        other['album'] = [u'y']
+        assert self.tags._shape is other._shape
+        i = other._shape.index['artist']
+        assert self.tags._values[i] is other._values[i]
+
+    def test_deepcopy_is_dict(self):
+        copied = deepcopy(self.tags)
+        assert type(copied) is dict
+        assert copied == dict(self.tags.iteritems())
@@ -204,6 +204,44 @@ class TestTrack(object):
         # second, ensure that we can no longer read them
         assert not tr.read_tags()
 
+    def test_read_file_tags(self, test_track_fp):
+        tr = track.Track(test_track_fp.name)
+        loc = tr.get_loc_for_io()
+
+        result = track.read_file_tags(loc)
+        assert result
+        ntags, supported = result
+        assert ntags['__modified'] == tr.get_tag_raw('__modified')
+        assert ntags.get('artist') == tr.get_tag_raw('artist')
+
+        # unchanged files aren't read again
+        assert track.read_file_tags(loc, ntags['__modified']) is None
+        # a known mtime is trusted, without looking at the file
+        assert track.read_file_tags('file:///tmp/foo.foo', 2, 1) is None
+        assert track.read_file_tags('file:///tmp/foo.foo') is False
+
+    def test_read_tags_unmodified(self, test_track_fp, monkeypatch):
+        tr = track.Track(test_track_fp.name)
+        assert tr.get_tag_raw('__modified')
+
+        def get_format(loc):
+            raise AssertionError('unchanged file opened')
+
+        monkeypatch.setattr(track.metadata, 'get_format', get_format)
+        assert tr.read_tags(force=False) is True
+
+    def test_set_scanned_tags(self, test_track_fp):
+        tr = track.Track(test_track_fp.name)
+        tr.set_tags(artist=u'artist', __rating=20)
+        tr.set_scanned_tags({'title': [u'title']}, frozenset(['title']))
+        assert tr.get_tag_raw('title') == [u'title']
+        # artist isn't supported, so it was kept
+        assert tr.get_tag_raw('artist') == [u'artist']
+        assert tr.get_tag_raw('__rating') == 20
+
+        tr.set_scanned_tags({'title': [u'title']})
+        assert tr.get_tag_raw('artist') is None
+
     def test_write_tags_no_perms(self, test_track_fp):
 
         os.chmod(test_track_fp.name, 0o444)
@@ -479,6 +517,46 @@ class TestTrack(object):
         tr.set_tag_raw('coverart', val)
         assert tr.get_tag_sort('coverart') == ret
 
+    ## Derived value cache
+    def test_derived_cache_follows_set_tags(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', u'foo')
+        assert tr.get_tag_sort('artist') == u'foo foo foo foo'
+        assert tr.get_tag_search('artist') == u'artist=="foo"'
+        tr.set_tag_raw('artist', u'bar')
+        assert tr.get_tag_sort('artist') == u'bar bar bar bar'
+        assert tr.get_tag_search('artist') == u'artist=="bar"'
+
+    def test_derived_cache_sort_tag(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('album', u'foo')
+        assert tr.get_tag_sort('album') == u'foo foo foo foo'
+        tr.set_tag_raw('albumsort', u'bar')
+        assert tr.get_tag_sort('album') == u'bar bar bar bar'
+
+    def test_derived_cache_albumartist(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', u'foo')
+        assert tr.get_tag_display('albumartist') == u'foo'
+        tr.set_tag_raw('artist', u'bar')
+        assert tr.get_tag_display('albumartist') == u'bar'
+
+    def test_derived_cache_returns_copies(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', [u'foo', u'bar'])
+        tr.get_tag_display('artist', join=False).append(u'baz')
+        assert tr.get_tag_display('artist', join=False) == [u'foo', u'bar']
+
+    def test_derived_cache_strip_list(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', u'the foo')
+        settings.set_option('collection/strip_list', [])
+        track.Track._the_cuts_cb(None, None, 'collection/strip_list')
+        assert tr.get_tag_sort('artist') == u'the foo the foo the foo the foo'
+        settings.set_option('collection/strip_list', ['the'])
+        track.Track._the_cuts_cb(None, None, 'collection/strip_list')
+        assert tr.get_tag_sort('artist') == u'foo the foo the foo the foo'
+
     ## Display Tags
     def test_get_display_tag_loc(self):
         tr = track.Track('/foo')
@@ -623,3 +701,22 @@ class TestTrack(object):
         assert tr.get_tag_disk('tracknumber') in [[u'5'], [u'5/0']]
 
         self.verify_tags_exist(tr, test_track)
+
+
+class TestCompactTrack(TestTrack):
+    """Runs the Track tests with the tags kept in a CompactTags"""
+
+    def setup(self):
+        TestTrack.setup(self)
+        track.Track._Track__compact_storage = True
+
+    def teardown(self):
+        track.Track._Track__compact_storage = False
+        TestTrack.teardown(self)
+
+    def test_uses_compact_storage(self):
+        tr = track.Track(_unpickles={'artist': [u'my_artist'],
+                                     '__loc': u'file:///compact'})
+        assert isinstance(tr._Track__tags, track.CompactTags)
+        tr.get_tag_raw('artist').append(u'other')
+        assert tr.get_tag_raw('artist') == [u'my_artist']
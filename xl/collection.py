@@ -38,7 +38,9 @@ from collections import deque
 from gi.repository import GLib
 from gi.repository import GObject
 from gi.repository import Gio
+import itertools
 import logging
+import multiprocessing
 import threading
 
 from xl import (
@@ -52,6 +54,28 @@ logger = logging.getLogger(__name__)
 
 COLLECTIONS = set()
 
+# Kinds of locations yielded by Library._scan_jobs
+_SCAN_DIRECTORY = 'directory'
+_SCAN_FILE = 'file'
+
+# Number of files handed to a scanning process at once
+_SCAN_CHUNK_SIZE = 16
+
+# Number of new tracks added to the collection at once while scanning
+_SCAN_BATCH_SIZE = 200
+
+
+def _location_prefix(location):
+    """
+        Returns the prefix shared by the URIs of all tracks inside a
+        library location
+    """
+    if "://" not in location:
+        uri = Gio.File.new_for_path(location).get_uri()
+    else:
+        uri = Gio.File.new_for_uri(location).get_uri()
+    return uri.rstrip('/') + '/'
+
 
 def get_collection_by_loc(loc):
     """
@@ -145,6 +169,10 @@ class Collection(trax.TrackDB):
         self._running_total_count = 0
         self._frozen = False
         self._libraries_dirty = False
+        # library location -> locations of the tracks inside it, built
+        # when first needed; see get_library_locations
+        self._library_locations = None
+        self._library_prefixes = []
         pickle_attrs += ['_serial_libraries']
         trax.TrackDB.__init__(self, name, location=location,
                               pickle_attrs=pickle_attrs)
@@ -185,6 +213,7 @@ class Collection(trax.TrackDB):
         if loc not in self.libraries:
             self.libraries[loc] = library
             library.set_collection(self)
+            self._library_locations = None
         self.serialize_libraries()
         self._dirty = True
 
@@ -200,19 +229,15 @@ class Collection(trax.TrackDB):
             :param library: the library to remove
             :type library: :class:`Library`
         """
+        to_rem = [self.tracks[loc]._track
+                  for loc in self.get_library_locations(library)]
+
         for k, v in self.libraries.iteritems():
             if v == library:
                 del self.libraries[k]
                 break
+        self._library_locations = None
 
-        to_rem = []
-        if "://" not in library.location:
-            location = u"file://" + library.location
-        else:
-            location = library.location
-        for tr in self.tracks:
-            if tr.startswith(location):
-                to_rem.append(self.tracks[tr]._track)
         self.remove_tracks(to_rem)
 
         self.serialize_libraries()
@@ -223,6 +248,55 @@ class Collection(trax.TrackDB):
         else:
             event.log_event('libraries_modified', self, None)
 
+    @common.synchronized
+    def add_tracks(self, tracks):
+        tracks = list(tracks)
+        trax.TrackDB.add_tracks(self, tracks)
+        if self._library_locations is not None:
+            for tr in tracks:
+                self.__index_location(tr.get_loc_for_io())
+
+    @common.synchronized
+    def remove_tracks(self, tracks):
+        tracks = list(tracks)
+        trax.TrackDB.remove_tracks(self, tracks)
+        if self._library_locations is not None:
+            for tr in tracks:
+                loc = tr.get_loc_for_io()
+                for locations in self._library_locations.itervalues():
+                    locations.discard(loc)
+
+    def load_from_location(self, location=None):
+        trax.TrackDB.load_from_location(self, location)
+        self._library_locations = None
+
+    @common.synchronized
+    def get_library_locations(self, library):
+        """
+            Returns the locations of the tracks in this collection that
+            are inside a library. This needs no I/O: the locations are
+            indexed by library as tracks are added and removed.
+
+            :param library: the library
+            :type library: :class:`Library`
+            :rtype: set of string
+        """
+        if self._library_locations is None:
+            self._library_locations = {}
+            self._library_prefixes = []
+            for libloc in self.libraries:
+                locations = self._library_locations[libloc] = set()
+                self._library_prefixes.append(
+                    (_location_prefix(libloc), locations))
+            for loc in self.tracks:
+                self.__index_location(loc)
+        return set(self._library_locations.get(library.location, ()))
+
+    def __index_location(self, loc):
+        for prefix, locations in self._library_prefixes:
+            if loc.startswith(prefix):
+                locations.add(loc)
+
     def stop_scan(self):
         """
             Stops the library scan
@@ -493,11 +567,11 @@ class LibraryMonitor(GObject.GObject):
                 removed_tracks += [track]
             else:
                 # Deleted file was most likely a directory
-                for track in self.__library.collection:
-                    track_gfile = Gio.File.new_for_uri(track.get_loc_for_io())
-
-                    if track_gfile.has_prefix(gfile):
-                        removed_tracks += [track]
+                collection = self.__library.collection
+                prefix = gfile.get_uri().rstrip('/') + '/'
+                for loc in collection.get_library_locations(self.__library):
+                    if loc.startswith(prefix):
+                        removed_tracks += [collection.get_track_by_loc(loc)]
 
             self.__library.collection.remove_tracks(removed_tracks)
 
@@ -512,6 +586,69 @@ class LibraryMonitor(GObject.GObject):
                 self.emit('location-removed', directory)
 
 
+def _scan_file(job):
+    """
+        Reads the tags for a job yielded by :meth:`Library._scan_jobs`.
+        When scanning with several processes this runs in a worker
+        process, so it only takes and returns plain values.
+
+        :returns: the location, its kind and the result of
+            :func:`xl.trax.read_file_tags` (None for directories)
+    """
+    uri, kind, modified, mtime = job
+    if kind != _SCAN_FILE:
+        return uri, kind, None
+    return uri, kind, trax.read_file_tags(uri, modified, mtime)
+
+
+def _scan_in_pool(pool, processes, jobs):
+    """
+        Like ``itertools.imap(_scan_file, jobs)``, but the tags of
+        modified files are read by the processes of pool. Files that
+        haven't changed, directories and other locations are answered
+        here, so they don't cost a round trip to a worker. Results come
+        back in the order of the jobs.
+    """
+    # batches handed to the pool: (results with None where a worker
+    # fills them in, the pool's AsyncResult)
+    batches = deque()
+    results = []
+    reads = []
+
+    def submit():
+        batches.append((results, pool.map_async(_scan_file, reads,
+                                                _SCAN_CHUNK_SIZE)))
+
+    def collect():
+        batch, pending = batches.popleft()
+        read = iter(pending.get())
+        for result in batch:
+            yield result if result is not None else next(read)
+
+    for job in jobs:
+        uri, kind, modified, mtime = job
+        if kind == _SCAN_FILE and (mtime is None or modified < mtime):
+            results.append(None)
+            reads.append(job)
+        else:
+            results.append((uri, kind, None))
+        if len(results) >= _SCAN_BATCH_SIZE or \
+                len(reads) >= _SCAN_CHUNK_SIZE * processes:
+            submit()
+            results = []
+            reads = []
+            # keep the workers busy while we go on walking, but don't
+            # get too far ahead of them
+            while batches and (batches[0][1].ready() or
+                               len(batches) > processes + 1):
+                for result in collect():
+                    yield result
+    submit()
+    while batches:
+        for result in collect():
+            yield result
+
+
 class Library(object):
     """
         Scans and watches a folder for tracks, and adds them to
@@ -728,10 +865,65 @@ class Library(object):
                 self.collection.add(tr)
         return tr
 
+    def _scan_jobs(self, libloc, force_update=False):
+        """
+            Walks the library, yielding a job for :func:`_scan_file` for
+            each location found. Stops when the scan is cancelled.
+        """
+        for fil, fileinfo in common.walk_with_info(libloc):
+            if self.collection._scan_stopped:
+                return
+            uri = fil.get_uri()
+            # walk enumerated the type and mtime already, so files that
+            # haven't changed are skipped without any further I/O
+            type = fileinfo.get_file_type() if fileinfo else None
+            if type == Gio.FileType.DIRECTORY:
+                yield (uri, _SCAN_DIRECTORY, 0, None)
+            elif type == Gio.FileType.REGULAR:
+                modified = 0
+                if not force_update:
+                    tr = self.collection.get_track_by_loc(uri)
+                    if tr:
+                        modified = tr.get_tag_raw('__modified') or 0
+                mtime = trax.get_modified_time(fileinfo)
+                yield (uri, _SCAN_FILE, modified, mtime)
+            else:
+                yield (uri, None, 0, None)
+
+    def _scanned_track(self, uri, result, added):
+        """
+            Updates or creates the track at uri from the result of
+            :func:`xl.trax.read_file_tags`. New tracks are appended to
+            added rather than being added to the collection.
+
+            returns: the Track object, None if it could not be read
+        """
+        tr = self.collection.get_track_by_loc(uri)
+        if tr:
+            if result:
+                tr.set_scanned_tags(*result)
+            elif result is False:
+                tr._scan_valid = False
+            return tr
+
+        tr = trax.Track(uri, scan=False)
+        if result:
+            # notify isn't needed if this is a new track
+            tr.set_scanned_tags(*result, notify_changed=not tr._init)
+        elif tr._init:
+            return None
+        # Track already existed. This fixes trax.get_tracks_from_uri
+        # on windows, unknown why fix isnt needed on linux.
+        added.append(tr)
+        return tr
+
     def rescan(self, notify_interval=None, force_update=False):
         """
             Rescan the associated folder and add the contained files
             to the Collection
+
+            Tags are read by a pool of worker processes when the
+            collection/scan_processes option is greater than 1.
         """
         # TODO: use gio's cancellable support
 
@@ -745,14 +937,61 @@ class Library(object):
         self.scanning = True
         libloc = Gio.File.new_for_uri(self.location)
 
+        jobs = self._scan_jobs(libloc, force_update=force_update)
+        processes = settings.get_option('collection/scan_processes', 1)
+        pool = None
+        if processes > 1:
+            # the workers parse modified files while we walk the
+            # library; results come back in walk order
+            pool = multiprocessing.Pool(processes)
+            results = _scan_in_pool(pool, processes, jobs)
+        else:
+            results = itertools.imap(_scan_file, jobs)
+
+        seen = set()
+        try:
+            if not self.__scan_results(results, seen, notify_interval):
+                self.scanning = False
+                logger.info("Scan canceled")
+                return
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        # tracks in the library that the walk didn't come across are
+        # gone. They are still checked for, so that a directory which
+        # couldn't be listed doesn't empty the collection.
+        removals = []
+        for loc in self.collection.get_library_locations(self) - seen:
+            if Gio.File.new_for_uri(loc).query_exists(None):
+                continue
+            tr = self.collection.get_track_by_loc(loc)
+            logger.debug(u"Removing %s", unicode(tr))
+            removals.append(tr)
+
+        if removals:
+            self.collection.remove_tracks(removals)
+
+        logger.info("Scan completed: %s", self.location)
+        self.scanning = False
+
+    def __scan_results(self, results, seen, notify_interval=None):
+        """
+            Adds the tracks read while scanning to the collection, and
+            detects compilations. The locations of all files found are
+            added to seen.
+
+            :returns: False if the scan was cancelled
+        """
         count = 0
+        added = []
         dirtracks = deque()
         compilations = deque()
         ccheck = {}
-        for fil in common.walk(libloc):
+        for uri, kind, result in results:
             count += 1
-            type = fil.query_info("standard::type", Gio.FileQueryInfoFlags.NONE, None).get_file_type()
-            if type == Gio.FileType.DIRECTORY:
+            if kind == _SCAN_DIRECTORY:
                 if dirtracks:
                     for tr in dirtracks:
                         self._check_compilation(ccheck, compilations, tr)
@@ -770,8 +1009,9 @@ class Library(object):
                 dirtracks = deque()
                 compilations = deque()
                 ccheck = {}
-            elif type == Gio.FileType.REGULAR:
-                tr = self.update_track(fil, force_update=force_update)
+            elif kind == _SCAN_FILE and uri:  # we get segfaults if this check is removed
+                seen.add(uri)
+                tr = self._scanned_track(uri, result, added)
                 if not tr:
                     continue
 
@@ -787,45 +1027,27 @@ class Library(object):
                     if len(dirtracks) > 110:
                         logger.debug("Too many files, skipping "
                                      "compilation detection heuristic for %s",
-                                     fil.get_uri())
+                                     uri)
                         dirtracks = None
 
+                if len(added) >= _SCAN_BATCH_SIZE:
+                    self.collection.add_tracks(added)
+                    added = []
+
             if self.collection and self.collection._scan_stopped:
-                self.scanning = False
-                logger.info("Scan canceled")
-                return
+                self.collection.add_tracks(added)
+                return False
 
             # progress update
             if notify_interval is not None and count % notify_interval == 0:
                 event.log_event('tracks_scanned', self, count)
 
+        self.collection.add_tracks(added)
+
         # final progress update
         if notify_interval is not None:
             event.log_event('tracks_scanned', self, count)
-
-        removals = deque()
-        for tr in self.collection.tracks.itervalues():
-            tr = tr._track
-            loc = tr.get_loc_for_io()
-            if not loc:
-                continue
-            gloc = Gio.File.new_for_uri(loc)
-            try:
-                if not gloc.has_prefix(libloc):
-                    continue
-            except UnicodeDecodeError:
-                logger.exception("Error decoding file location")
-                continue
-
-            if not gloc.query_exists(None):
-                removals.append(tr)
-
-        for tr in removals:
-            logger.debug(u"Removing %s", unicode(tr))
-            self.collection.remove(tr)
-
-        logger.info("Scan completed: %s", self.location)
-        self.scanning = False
+        return True
 
     def add(self, loc, move=False):
         """
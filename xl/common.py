@@ -27,6 +27,7 @@
     General functions and classes shared in the codebase
 """
 
+from bisect import bisect_left
 import inspect
 from gi.repository import Gio
 from gi.repository import GLib
@@ -533,6 +534,11 @@ class cached(object):
         return partial(self.__call__, obj)
 
 
+_WALK_ATTRIBUTES = "standard::type," \
+    "standard::is-symlink,standard::name," \
+    "standard::symlink-target,time::modified"
+
+
 def walk(root):
     """
         Walk through a Gio directory, yielding each file
@@ -548,16 +554,38 @@ def walk(root):
         :returns: a generator object
         :rtype: :class:`Gio.File`
     """
+    for fil, fileinfo in walk_with_info(root):
+        yield fil
+
+
+def walk_with_info(root):
+    """
+        Like :func:`walk`, but yields each file along with the
+        :class:`Gio.FileInfo` it was enumerated with, so that
+        callers don't need to query it again. The info has the
+        standard::type and time::modified attributes.
+
+        :param root: a :class:`Gio.File` representing the
+            directory to walk through
+        :returns: a generator object
+        :rtype: tuple of :class:`Gio.File` and :class:`Gio.FileInfo`,
+            the latter being None if root could not be queried
+    """
+    try:
+        rootinfo = root.query_info(_WALK_ATTRIBUTES,
+                                   Gio.FileQueryInfoFlags.NONE, None)
+    except GLib.Error:
+        logger.exception("Unhandled exception while querying %s.", root)
+        rootinfo = None
+
     queue = deque()
-    queue.append(root)
+    queue.append((root, rootinfo))
 
     while len(queue) > 0:
-        dir = queue.pop()
-        yield dir
+        dir, dirinfo = queue.pop()
+        yield dir, dirinfo
         try:
-            for fileinfo in dir.enumerate_children("standard::type,"
-                                                   "standard::is-symlink,standard::name,"
-                                                   "standard::symlink-target,time::modified",
+            for fileinfo in dir.enumerate_children(_WALK_ATTRIBUTES,
                                                    Gio.FileQueryInfoFlags.NONE, None):
                 fil = dir.get_child(fileinfo.get_name())
                 # FIXME: recursive symlinks could cause an infinite loop
@@ -572,9 +600,9 @@ def walk(root):
                         continue
                 type = fileinfo.get_file_type()
                 if type == Gio.FileType.DIRECTORY:
-                    queue.append(fil)
+                    queue.append((fil, fileinfo))
                 elif type == Gio.FileType.REGULAR:
-                    yield fil
+                    yield fil, fileinfo
         except GLib.Error:  # why doesnt gio offer more-specific errors?
             logger.exception("Unhandled exception while walking on %s.", dir)
 
@@ -650,12 +678,18 @@ class MetadataList(object):
         allow the metadata to act much like a dictionary, with a few
         optimizations.
 
+        Membership tests, :meth:`count` and :meth:`index` are answered
+        from maps of the (hashable) items that are built on first use.
+        They are kept current on changes, except that the positions are
+        rebuilt lazily after anything other than adding or removing
+        entries at the end.
+
         List aspects that are not supported:
             * sort
             * comparisons other than equality
             * multiply
     """
-    __slots__ = ['__list', 'metadata']
+    __slots__ = ['__list', 'metadata', '__counts', '__positions']
 
     def __init__(self, iterable=[], metadata=[]):
         self.__list = list(iterable)
@@ -665,6 +699,9 @@ class MetadataList(object):
         if not meta:
             meta = [None] * len(self.__list)
         self.metadata = meta
+        # item -> number of entries, and item -> ascending positions
+        self.__counts = None
+        self.__positions = None
 
     def __repr__(self):
         return "MetadataList(%s)" % self.__list
@@ -675,6 +712,12 @@ class MetadataList(object):
     def __iter__(self):
         return self.__list.__iter__()
 
+    def __contains__(self, item):
+        counts = self.__get_counts()
+        if counts is None:
+            return item in self.__list
+        return item in counts
+
     def __add__(self, other):
         l = MetadataList(self, self.metadata)
         l.extend(other)
@@ -697,16 +740,37 @@ class MetadataList(object):
             return val
 
     def __setitem__(self, i, value):
-        self.__list.__setitem__(i, value)
-        if isinstance(value, MetadataList):
-            metadata = list(value.metadata)
+        length = len(self.__list)
+        if isinstance(i, slice):
+            old = self.__list[i]
+            added = list(value)
+            self.__list.__setitem__(i, added)
+            if isinstance(value, MetadataList):
+                metadata = list(value.metadata)
+            else:
+                metadata = [None] * len(value)
+            self.metadata.__setitem__(i, metadata)
+            (start, end, step) = i.indices(length)
+            # only appending keeps the positions valid
+            self.__changed(old, added, step == 1 and start == length)
         else:
-            metadata = [None] * len(value)
-        self.metadata.__setitem__(i, metadata)
+            old = self.__list[i]
+            self.__list.__setitem__(i, value)
+            self.metadata[i] = None
+            self.__changed([old], [value], False)
 
     def __delitem__(self, i):
+        length = len(self.__list)
+        if isinstance(i, slice):
+            old = self.__list[i]
+            (start, end, step) = i.indices(length)
+            at_end = step == 1 and start + len(old) == length
+        else:
+            old = [self.__list[i]]
+            at_end = i in (-1, length - 1)
         self.__list.__delitem__(i)
         self.metadata.__delitem__(i)
+        self.__changed(old, [], at_end)
 
     def append(self, other, metadata=None):
         self.insert(len(self), other, metadata=metadata)
@@ -715,13 +779,15 @@ class MetadataList(object):
         self[len(self):len(self)] = other
 
     def insert(self, i, item, metadata=None):
+        if i < 0:
+            i = max(i + len(self), 0)
         if i >= len(self):
             i = len(self)
             e = len(self) + 1
         else:
             e = i
         self[i:e] = [item]
-        self.metadata[i:e] = [metadata]
+        self.metadata[i] = metadata
 
     def pop(self, i=-1):
         item = self[i]
@@ -734,15 +800,96 @@ class MetadataList(object):
     def reverse(self):
         self.__list.reverse()
         self.metadata.reverse()
+        self.__positions = None
 
     def index(self, i, start=0, end=None):
+        positions = self.__get_positions()
+        if positions is None:
+            if end is None:
+                return self.__list.index(i, start)
+            else:
+                return self.__list.index(i, start, end)
+        length = len(self.__list)
+        if start < 0:
+            start = max(start + length, 0)
         if end is None:
-            return self.__list.index(i, start)
-        else:
-            return self.__list.index(i, start, end)
+            end = length
+        elif end < 0:
+            end += length
+        found = positions.get(i, ())
+        k = bisect_left(found, start)
+        if k < len(found) and found[k] < end:
+            return found[k]
+        raise ValueError("%r is not in list" % (i,))
 
     def count(self, i):
-        return self.__list.count(i)
+        counts = self.__get_counts()
+        if counts is None:
+            return self.__list.count(i)
+        return counts.get(i, 0)
+
+    def __get_counts(self):
+        """
+            Returns the item -> count map, building it if needed, or
+            None if the items can't be hashed.
+        """
+        if self.__counts is None:
+            counts = {}
+            try:
+                for item in self.__list:
+                    counts[item] = counts.get(item, 0) + 1
+            except TypeError:
+                return None
+            self.__counts = counts
+        return self.__counts
+
+    def __get_positions(self):
+        """
+            Returns the item -> positions map, building it if needed, or
+            None if the items can't be hashed.
+        """
+        if self.__positions is None:
+            positions = {}
+            try:
+                for idx, item in enumerate(self.__list):
+                    positions.setdefault(item, []).append(idx)
+            except TypeError:
+                return None
+            self.__positions = positions
+        return self.__positions
+
+    def __changed(self, removed, added, at_end):
+        """
+            Updates the maps after the removed items were replaced by
+            the added ones. The positions are only kept if the change
+            happened at the end of the list.
+        """
+        counts = self.__counts
+        positions = self.__positions if at_end else None
+        try:
+            if counts is not None:
+                for item in removed:
+                    count = counts[item] - 1
+                    if count:
+                        counts[item] = count
+                    else:
+                        del counts[item]
+                for item in added:
+                    counts[item] = counts.get(item, 0) + 1
+            if positions is not None:
+                # removed entries were the last ones of their items
+                for item in removed:
+                    found = positions[item]
+                    found.pop()
+                    if not found:
+                        del positions[item]
+                start = len(self.__list) - len(added)
+                for idx, item in enumerate(added):
+                    positions.setdefault(item, []).append(start + idx)
+        except TypeError:
+            counts = positions = None
+        self.__counts = counts
+        self.__positions = positions
 
     def get_meta_key(self, index, key, default=None):
         if not self.metadata[index]:
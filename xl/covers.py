@@ -29,11 +29,16 @@ Provides the base for obtaining and storing covers, also known
 as album art.
 """
 
+from collections import OrderedDict
 from gi.repository import GLib
 from gi.repository import Gio
+import glob
 import logging
 import hashlib
+from multiprocessing.pool import ThreadPool
 import os
+import threading
+import time
 try:
     import cPickle as pickle
 except ImportError:
@@ -118,6 +123,115 @@ class Cacher(object):
         return None
 
 
+class MemoryCache(object):
+    """
+        Keeps the most recently used entries in memory, up to a total
+        size in bytes.
+    """
+
+    def __init__(self, max_size):
+        """
+            :param max_size: the maximum total size of the entries, 0
+                disables the cache
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, key, data):
+        """
+            Adds an entry, dropping the least recently used ones if the
+            cache gets too large.
+
+            :param data: The data to store, as a bytestring.
+        """
+        if len(data) > self.max_size:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            self.__shrink()
+
+    def remove(self, key):
+        with self.lock:
+            data = self.entries.pop(key, None)
+            if data is not None:
+                self.size -= len(data)
+
+    def get(self, key):
+        """
+            Returns the data for a key and marks it as recently used,
+            or None if the key isn't cached.
+        """
+        with self.lock:
+            data = self.entries.pop(key, None)
+            if data is not None:
+                self.entries[key] = data
+            return data
+
+    def set_max_size(self, max_size):
+        with self.lock:
+            self.max_size = max_size
+            self.__shrink()
+
+    def __shrink(self):
+        while self.size > self.max_size:
+            key, data = self.entries.popitem(last=False)
+            self.size -= len(data)
+
+
+class _MethodLimiter(object):
+    """
+        Limits how many lookups may be made from a search method at
+        once, and how often they may start
+    """
+
+    def __init__(self, concurrency, min_interval):
+        """
+            :param concurrency: the number of lookups that may run at
+                once, None for no limit
+            :param min_interval: the minimum time in seconds between the
+                start of two lookups
+        """
+        if concurrency:
+            self.semaphore = threading.BoundedSemaphore(concurrency)
+        else:
+            self.semaphore = None
+        self.min_interval = min_interval
+        self.next_start = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        if self.min_interval > 0:
+            with self.lock:
+                now = time.time()
+                wait = self.next_start - now
+                self.next_start = max(now, self.next_start) + self.min_interval
+            if wait > 0:
+                time.sleep(wait)
+
+    def __exit__(self, *exc_info):
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+
+class _PendingFetch(object):
+    """
+        A cover lookup in progress, shared by everyone asking for the
+        same album
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+
+
 class CoverManager(providers.ProviderHandler):
     """
         Handles finding covers from various sources.
@@ -129,8 +243,19 @@ class CoverManager(providers.ProviderHandler):
         """
         providers.ProviderHandler.__init__(self, "covers")
         self.__cache = Cacher(os.path.join(location, 'cache'))
+        self.__memory = MemoryCache(self.__get_memory_cache_size())
+        self.__thumbnail_dir = os.path.join(location, 'thumbnails')
+        try:
+            os.makedirs(self.__thumbnail_dir)
+        except OSError:
+            pass
         self.location = location
         self.methods = {}
+        # method name -> _MethodLimiter, for fetch_covers
+        self.__limiters = {}
+        # track key -> _PendingFetch, for fetch_cover
+        self.__pending = {}
+        self.__pending_lock = threading.Lock()
         self.order = settings.get_option(
             'covers/preferred_order', [])
         self.db = {}
@@ -152,7 +277,9 @@ class CoverManager(providers.ProviderHandler):
         event.add_callback(self._on_option_set, 'covers_option_set')
 
     def _on_option_set(self, name, obj, data):
-        if data == "covers/use_tags":
+        if data == "covers/memory_cache_size":
+            self.__memory.set_max_size(self.__get_memory_cache_size())
+        elif data == "covers/use_tags":
             if settings.get_option("covers/use_tags"):
                 providers.register('covers', self.tag_fetcher)
             else:
@@ -163,6 +290,15 @@ class CoverManager(providers.ProviderHandler):
             else:
                 providers.unregister('covers', self.localfile_fetcher)
 
+    @staticmethod
+    def __get_memory_cache_size():
+        """
+            Returns the size of the memory cache of cover data in bytes,
+            from the covers/memory_cache_size option in MiB
+        """
+        size = settings.get_option('covers/memory_cache_size', 16)
+        return max(int(size * 1024 * 1024), 0)
+
     def _get_methods(self, fixed=False):
         """
             Returns a list of Methods, sorted by preference
@@ -267,6 +403,9 @@ class CoverManager(providers.ProviderHandler):
             db_string = "cache:%s" % self.__cache.add(data)
         key = self._get_track_key(track)
         if key:
+            old = self.db.get(key)
+            if old is not None:
+                self.__forget(old)
             self.db[key] = db_string
             self.timeout_save()
             event.log_event('cover_set', self, track)
@@ -282,6 +421,7 @@ class CoverManager(providers.ProviderHandler):
         if db_string:
             del self.db[key]
             self.__cache.remove(db_string)
+            self.__forget(db_string)
             self.timeout_save()
             event.log_event('cover_removed', self, track)
 
@@ -320,6 +460,97 @@ class CoverManager(providers.ProviderHandler):
 
         return self.get_default_cover() if use_default else None
 
+    def fetch_cover(self, track):
+        """
+            Gets the cover for a track like :meth:`get_cover` with
+            save_cover=True, but can be called from many threads at
+            once: lookups are made within the limits each search method
+            sets, and threads asking for the same album share a lookup.
+
+            :param track: the Track to get the cover for.
+            :returns: the raw cover data, or None
+        """
+        key = self._get_track_key(track)
+        if key is None:
+            return None
+
+        with self.__pending_lock:
+            pending = self.__pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self.__pending[key] = _PendingFetch()
+
+        if not owner:
+            pending.done.wait()
+            return pending.data
+
+        try:
+            pending.data = self.__fetch_cover(track)
+        finally:
+            with self.__pending_lock:
+                del self.__pending[key]
+            pending.done.set()
+        return pending.data
+
+    def __fetch_cover(self, track):
+        db_string = self.get_db_string(track)
+        if db_string:
+            return self.get_cover_data(db_string)
+
+        for method in self._get_methods(fixed=True):
+            limiter = self.__get_limiter(method)
+            try:
+                with limiter:
+                    found = method.find_covers(track, limit=1)
+                for cover in found:
+                    with limiter:
+                        data = method.get_cover_data(cover)
+                    if data:
+                        self.set_cover(track, "%s:%s" % (method.name, cover),
+                                       data)
+                        return data
+            except Exception:
+                logger.exception("Error fetching cover from %s", method.name)
+        return None
+
+    def __get_limiter(self, method):
+        limiter = self.__limiters.get(method.name)
+        if limiter is None:
+            limiter = self.__limiters.setdefault(method.name, _MethodLimiter(
+                getattr(method, 'concurrency', None),
+                getattr(method, 'min_interval', 0)))
+        return limiter
+
+    def fetch_covers(self, tracks, stopper=None):
+        """
+            Gets the covers for many tracks at once using a pool of
+            threads, see :meth:`fetch_cover`. The number of threads is
+            set by the covers/fetch_workers option.
+
+            :param tracks: a list of Tracks, usually one per album
+            :param stopper: a :class:`threading.Event` that stops the
+                    fetching when set
+            :returns: an iterator of (index in tracks, cover data or
+                    None), in the order the lookups finish
+        """
+        workers = max(int(settings.get_option('covers/fetch_workers', 4)), 1)
+        stopper = stopper or threading.Event()
+
+        def fetch(item):
+            index, track = item
+            if stopper.is_set():
+                return index, None
+            return index, self.fetch_cover(track)
+
+        pool = ThreadPool(workers)
+        try:
+            for result in pool.imap_unordered(fetch, enumerate(tracks)):
+                if stopper.is_set():
+                    break
+                yield result
+        finally:
+            pool.terminate()
+
     def get_cover_data(self, db_string, use_default=False):
         """
             Get the raw image data for a cover.
@@ -329,10 +560,16 @@ class CoverManager(providers.ProviderHandler):
                     of None when no covers are found.
         """
         source, data = db_string.split(":", 1)
-        ret = None
         if source == "cache":
-            ret = self.__cache.get(data)
+            # cache entries are named by their content, so they can be
+            # kept in memory; anything else may change behind our back
+            ret = self.__memory.get(db_string)
+            if ret is None:
+                ret = self.__cache.get(data)
+                if ret is not None:
+                    self.__memory.add(db_string, ret)
         else:
+            ret = None
             method = self.methods.get(source)
             if method:
                 ret = method.get_cover_data(data)
@@ -340,6 +577,66 @@ class CoverManager(providers.ProviderHandler):
             ret = self.get_default_cover()
         return ret
 
+    def get_thumbnail_path(self, db_string, size, keep_ratio=True):
+        """
+            Returns the path to store a scaled copy of a cover in. The
+            file is removed when the cover is replaced or removed, but
+            it's up to the caller to create it.
+
+            Only covers in the cache get a path, as the data behind
+            other db_strings, such as embedded art or a file next to
+            the track, can change without the db_string changing.
+
+            :param db_string: The db_string identifying the cover.
+            :param size: The (width, height) the cover is scaled to.
+            :param keep_ratio: Whether the cover keeps its aspect ratio
+                    when scaled.
+            :returns: the path, or None if the cover isn't cached
+        """
+        if not db_string.startswith('cache:'):
+            return None
+        name = '%s-%dx%d%s.png' % (self.__get_thumbnail_prefix(db_string),
+                                   size[0], size[1],
+                                   '' if keep_ratio else '-fill')
+        return os.path.join(self.__thumbnail_dir, name)
+
+    @staticmethod
+    def __get_thumbnail_prefix(db_string):
+        if isinstance(db_string, unicode):
+            db_string = db_string.encode('utf-8')
+        return hashlib.sha1(db_string).hexdigest()
+
+    def __forget(self, db_string):
+        """
+            Drops the cached data and thumbnails of a cover
+        """
+        self.__memory.remove(db_string)
+        pattern = os.path.join(self.__thumbnail_dir, '%s-*.png' %
+                               self.__get_thumbnail_prefix(db_string))
+        for path in glob.glob(pattern):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __prune_thumbnails(self):
+        """
+            Removes the thumbnails of covers that aren't in the db
+        """
+        prefixes = set(self.__get_thumbnail_prefix(db_string)
+                       for db_string in self.db.itervalues()
+                       if db_string.startswith('cache:'))
+        try:
+            names = os.listdir(self.__thumbnail_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.split('-', 1)[0] not in prefixes:
+                try:
+                    os.remove(os.path.join(self.__thumbnail_dir, name))
+                except OSError:
+                    pass
+
     def get_default_cover(self):
         """
             Get the raw image data for the cover to show if there is no
@@ -369,6 +666,7 @@ class CoverManager(providers.ProviderHandler):
                 break
         if data:
             self.db = data
+        self.__prune_thumbnails()
 
     @common.glib_wait_seconds(60)
     def timeout_save(self):
@@ -381,7 +679,8 @@ class CoverManager(providers.ProviderHandler):
         path = os.path.join(self.location, 'covers.db')
         try:
             with open(path + ".new", 'wb') as f:
-                pickle.dump(self.db, f, common.PICKLE_PROTOCOL)
+                # a copy, as fetch_covers may be adding covers
+                pickle.dump(dict(self.db), f, common.PICKLE_PROTOCOL)
         except IOError:
             return
         try:
@@ -437,6 +736,12 @@ class CoverSearchMethod(object):
     #: Priority for fixed-position backends. Lower is earlier, non-fixed
     #  backends will always be 50.
     fixed_priority = 50
+    #: How many lookups :meth:`CoverManager.fetch_covers` may make from
+    #  the backend at once, None for no limit
+    concurrency = None
+    #: Minimum time in seconds between the start of two lookups made
+    #  by :meth:`CoverManager.fetch_covers`
+    min_interval = 0
 
     def find_covers(self, track, limit=-1):
         """
@@ -57,6 +57,9 @@ class Nothing(object):
 
 _NONE = Nothing()  # used by event for a safe None replacement
 
+#: How long batch callbacks collect events for by default, in milliseconds
+BATCH_DELAY = 250
+
 # Assumes that this module was imported on main thread
 _UiThread = threading.current_thread()
 
@@ -138,6 +141,43 @@ def add_ui_callback(function, evty=None, obj=None, *args, **kwargs):
     return EVENT_MANAGER.add_callback(function, evty, obj, args, kwargs, ui=True)
 
 
+def add_batch_callback(function, evty, obj=None, *args, **kwargs):
+    """
+        Adds a callback that receives the events of a type in batches.
+
+        Instead of being called once per event, the callback is called
+        at most once every `batch_delay` milliseconds (default
+        :data:`BATCH_DELAY`), with an :class:`EventBatch` of the events
+        emitted since the last call as its data, and `obj` (possibly None)
+        as the object. Use this for events that can be emitted many times
+        in a row, such as `track_tags_changed` during a rescan.
+
+        The callback is called from a timer thread. Other parameters are
+        the same as for :func:`add_callback`, and it is removed with
+        :func:`remove_callback`.
+
+        :param batch_delay: (keyword arg only) how long to collect events
+                            for, in milliseconds
+    """
+    global EVENT_MANAGER
+    return EVENT_MANAGER.add_callback(function, evty, obj, args, kwargs,
+                                      batch=True)
+
+
+def add_ui_batch_callback(function, evty, obj=None, *args, **kwargs):
+    """
+        Same as :func:`add_batch_callback`, but the callback is always
+        called on the UI thread.
+
+        Events are collected on the thread that emits them, so a batch
+        costs the main loop a single call no matter how many events it
+        holds.
+    """
+    global EVENT_MANAGER
+    return EVENT_MANAGER.add_callback(function, evty, obj, args, kwargs,
+                                      ui=True, batch=True)
+
+
 def remove_callback(function, evty=None, obj=None):
     """
         Removes a callback. Can remove both ui and non-ui callbacks.
@@ -166,12 +206,37 @@ class Event(object):
         self.data = data
 
 
+class EventBatch(list):
+    """
+        The events passed to a batch callback, in the order they were
+        emitted
+    """
+
+    def get_objects(self):
+        """
+            Returns the set of objects that sent the events
+        """
+        return {e.object for e in self}
+
+    def get_data_union(self):
+        """
+            Returns the union of the data of the events, for events whose
+            data is a set or list, such as the tags in
+            `track_tags_changed`
+        """
+        result = set()
+        for e in self:
+            if e.data is not None:
+                result.update(e.data)
+        return result
+
+
 class Callback(object):
     """
         Represents a callback
     """
 
-    __slots__ = ['wfunction', 'time', 'args', 'kwargs']
+    __slots__ = ['wfunction', 'time', 'args', 'kwargs', 'batch']
 
     def __init__(self, function, time, args, kwargs):
         """
@@ -182,11 +247,68 @@ class Callback(object):
         self.time = time
         self.args = args
         self.kwargs = kwargs
+        # the _EventBatcher that collects the events, for batch callbacks
+        self.batch = None
 
     def __repr__(self):
         return '<Callback %s>' % self.wfunction()
 
 
+class _EventBatcher(object):
+    """
+        Collects the events for a batch callback and calls it with them
+        after a delay
+    """
+
+    def __init__(self, manager, callback, obj, delay, ui):
+        self.manager = manager
+        self.callback = callback
+        self.obj = obj
+        self.delay = delay
+        self.ui = ui
+        self.events = EventBatch()
+        self.scheduled = False
+        self.lock = threading.Lock()
+
+    def add(self, event):
+        with self.lock:
+            self.events.append(event)
+            if self.scheduled:
+                return
+            self.scheduled = True
+
+        if self.ui:
+            GLib.timeout_add(self.delay, self.flush)
+        else:
+            timer = threading.Timer(self.delay / 1000.0, self.flush)
+            timer.daemon = True
+            timer.start()
+
+    def clear(self):
+        with self.lock:
+            self.events = EventBatch()
+
+    def flush(self):
+        with self.lock:
+            events = self.events
+            self.events = EventBatch()
+            self.scheduled = False
+
+        cb = self.callback
+        fn = cb.wfunction()
+        if events and fn is not None:
+            stats = self.manager.stats
+            if stats is not None:
+                start = time.time()
+            try:
+                fn(events[0].type, self.obj, events, *cb.args, **cb.kwargs)
+            except Exception:
+                logger.exception("Event callback exception caught!")
+            if stats is not None:
+                stats.add_call(events[0].type, fn, time.time() - start)
+        return False
+
+
 class _WeakMethod(object):
     """Represent a weak bound method, i.e. a method doesn't keep alive the
     object that it is bound to. It uses WeakRef which, used on its own,
@@ -254,6 +376,84 @@ def _getWeakRef(obj, notifyDead=None):
         return createRef(obj, notifyDead)
 
 
+def _get_callback_name(function):
+    """
+        Returns a readable name for a callback function
+    """
+    if ismethod(function):
+        cls = function.im_class
+        return '%s.%s.%s' % (cls.__module__, cls.__name__,
+                             function.im_func.__name__)
+    return '%s.%s' % (getattr(function, '__module__', None),
+                      getattr(function, '__name__', function))
+
+
+class EventStats(object):
+    """
+        Counts the events emitted per type, and the calls and time spent
+        per callback. See :meth:`EventManager.set_stats_enabled`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # event type -> number of emissions
+        self.emits = {}
+        # (event type, callback name) -> [calls, seconds]
+        self.calls = {}
+
+    def add_emit(self, evty):
+        with self.lock:
+            self.emits[evty] = self.emits.get(evty, 0) + 1
+
+    def add_call(self, evty, function, seconds):
+        key = (evty, _get_callback_name(function))
+        with self.lock:
+            entry = self.calls.get(key)
+            if entry is None:
+                self.calls[key] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def clear(self):
+        with self.lock:
+            self.emits = {}
+            self.calls = {}
+
+    def get_emit_counts(self):
+        """
+            Returns a dict of event type to number of emissions
+        """
+        with self.lock:
+            return self.emits.copy()
+
+    def get_callback_times(self):
+        """
+            Returns a list of (seconds, calls, event type, callback name),
+            the slowest callbacks first
+        """
+        with self.lock:
+            result = [(seconds, calls, evty, name)
+                      for (evty, name), (calls, seconds)
+                      in self.calls.iteritems()]
+        result.sort(reverse=True)
+        return result
+
+    def log(self, limit=20):
+        """
+            Writes the busiest events and the slowest callbacks to the log
+        """
+        emits = sorted(self.get_emit_counts().iteritems(),
+                       key=lambda item: item[1], reverse=True)
+        logger.info("Event emissions (top %d of %d types):", limit, len(emits))
+        for evty, count in emits[:limit]:
+            logger.info("  %8d %s", count, evty)
+        times = self.get_callback_times()
+        logger.info("Event callback times (top %d of %d):", limit, len(times))
+        for seconds, calls, evty, name in times[:limit]:
+            logger.info("  %9.3fs %8d %s <- %s", seconds, calls, name, evty)
+
+
 class EventManager(object):
     """
         Manages all Events
@@ -275,6 +475,31 @@ class EventManager(object):
         self.pending_ui = []
         self.pending_ui_lock = threading.Lock()
 
+        # id of a callbacks dict -> {event type: (callbacks for any object,
+        # per-object dicts to look in)}, filled in by _get_dispatch and
+        # replaced whenever a callback is added or removed
+        self.dispatch = {}
+
+        # an EventStats, when enabled
+        self.stats = None
+
+    def set_stats_enabled(self, enabled):
+        """
+            Starts or stops counting the events emitted and timing the
+            callbacks they call, see get_stats
+        """
+        if enabled:
+            if self.stats is None:
+                self.stats = EventStats()
+        else:
+            self.stats = None
+
+    def get_stats(self):
+        """
+            Returns the EventStats being collected, or None
+        """
+        return self.stats
+
     def emit(self, event):
         """
             Emits an Event, calling any registered callbacks.
@@ -292,16 +517,26 @@ class EventManager(object):
         # note: a majority of the calls to emit are made on the
         #       UI thread
 
+        stats = self.stats
+        if stats is not None:
+            stats.add_emit(event.type)
+
         if is_ui_thread:
             self._emit(event, self.all_callbacks, emit_logmsg, emit_verbose)
         else:
-            # Don't issue the log message twice
-            with self.pending_ui_lock:
-                do_emit = not self.pending_ui
-                self.pending_ui.append((event, self.ui_callbacks, emit_logmsg, emit_verbose))
-
-            if do_emit:
-                GLib.idle_add(self._emit_pending)
+            # only bother the UI thread if someone there is listening,
+            # or if it has to log the event
+            general, specific = self._get_dispatch(self.ui_callbacks,
+                                                   event.type)
+            if general or specific or emit_logmsg:
+                # Don't issue the log message twice
+                with self.pending_ui_lock:
+                    do_emit = not self.pending_ui
+                    self.pending_ui.append((event, self.ui_callbacks,
+                                            emit_logmsg, emit_verbose))
+
+                if do_emit:
+                    GLib.idle_add(self._emit_pending)
             self._emit(event, self.callbacks, False, emit_verbose)
 
     def _emit_pending(self):
@@ -313,24 +548,66 @@ class EventManager(object):
         for event in events:
             self._emit(*event)
 
-    def _emit(self, event, exc_callbacks, emit_logmsg, emit_verbose):
-
-        # Accumulate in this set to ensure callbacks only get called once
-        callbacks = set()
+    def _get_dispatch(self, exc_callbacks, evty):
+        """
+            Returns the callbacks in exc_callbacks for events of type
+            evty from any object, and the dicts of object -> callbacks to
+            look in for the callbacks of specific objects
+        """
+        table = self.dispatch.get(id(exc_callbacks))
+        if table is not None:
+            entry = table.get(evty)
+            if entry is not None:
+                return entry
 
         with self.lock:
-            for tcall in [_NONE, event.type]:
+            table = self.dispatch.setdefault(id(exc_callbacks), {})
+            general = []
+            specific = []
+            for tcall in (_NONE, evty):
                 tcb = exc_callbacks.get(tcall)
-                if tcb is not None:
-                    for ocall in [_NONE, event.object]:
-                        ocb = tcb.get(ocall)
-                        if ocb is not None:
-                            callbacks.update(ocb)
+                if tcb is None:
+                    continue
+                for cb in tcb.get(_NONE, ()):
+                    if cb not in general:
+                        general.append(cb)
+                if len(tcb) > (_NONE in tcb):
+                    specific.append(tcb)
+            entry = table[evty] = (tuple(general), tuple(specific))
+            return entry
+
+    def _invalidate_dispatch(self):
+        """
+            Forgets the dispatch tables, must be called with the lock held
+            whenever callbacks are added or removed
+        """
+        # replaced rather than cleared, so emits that are looking at the
+        # old tables never see a partly rebuilt one
+        self.dispatch = {}
+
+    def _emit(self, event, exc_callbacks, emit_logmsg, emit_verbose):
+
+        callbacks, specific = self._get_dispatch(exc_callbacks, event.type)
+
+        if specific:
+            # Accumulate to ensure callbacks only get called once
+            callbacks = list(callbacks)
+            with self.lock:
+                for tcb in specific:
+                    try:
+                        ocb = tcb.get(event.object)
+                    except TypeError:  # can't be weakly referenced
+                        continue
+                    if ocb is not None:
+                        callbacks.extend(cb for cb in ocb
+                                         if cb not in callbacks)
 
         # However, do not actually call the callbacks from within the lock
         # -> Otherwise non-ui threads could accidentally block the UI if
         #    they decide to run for too long
 
+        stats = self.stats
+
         for cb in callbacks:
             try:
                 fn = cb.wfunction()
@@ -339,10 +616,11 @@ class EventManager(object):
                     # really, should be using remove_callback to clean up after
                     # your event handler
                     with self.lock:
-                        try:
-                            exc_callbacks[event.type][event.object].remove(cb)
-                        except (KeyError, ValueError):
-                            pass
+                        for tcb in exc_callbacks.itervalues():
+                            for ocb in tcb.values():
+                                if cb in ocb:
+                                    ocb.remove(cb)
+                        self._invalidate_dispatch()
                 else:
                     if emit_verbose:
                         logger.debug("Attempting to call "
@@ -350,8 +628,19 @@ class EventManager(object):
                                      "to %(event)s." % {
                                          'function': fn,
                                          'event': event.type})
-                    fn.__call__(event.type, event.object,
-                                event.data, *cb.args, **cb.kwargs)
+                    if cb.batch is not None:
+                        cb.batch.add(event)
+                    elif stats is not None:
+                        start = time.time()
+                        try:
+                            fn.__call__(event.type, event.object,
+                                        event.data, *cb.args, **cb.kwargs)
+                        finally:
+                            stats.add_call(event.type, fn,
+                                           time.time() - start)
+                    else:
+                        fn.__call__(event.type, event.object,
+                                    event.data, *cb.args, **cb.kwargs)
                 fn = None
             except Exception:
                 # something went wrong inside the function we're calling
@@ -367,7 +656,8 @@ class EventManager(object):
         """
         GLib.idle_add(self.emit, event)
 
-    def add_callback(self, function, evty, obj, args, kwargs, ui=False):
+    def add_callback(self, function, evty, obj, args, kwargs, ui=False,
+                     batch=False):
         """
             Registers a callback.
             You should always specify at least one of event type or object.
@@ -377,17 +667,25 @@ class EventManager(object):
                 to any. [string]
             @param obj: The object to listen to events from. Defaults
                 to any. [string]
+            @param batch: Whether to call the function with batches of
+                events, see add_batch_callback. [bool]
 
             Returns a convenience function that you can call to
             remove the callback.
         """
 
-        if ui:
+        if ui and not batch:
             all_cbs = [self.ui_callbacks, self.all_callbacks]
         else:
+            # batch callbacks collect events on the emitting thread, and
+            # leave it to their _EventBatcher to get to the UI thread
             all_cbs = [self.callbacks, self.all_callbacks]
 
         destroy_with = kwargs.pop('destroy_with', None)
+        batch_delay = kwargs.pop('batch_delay', BATCH_DELAY)
+
+        if batch and evty is None:
+            raise ValueError("Batch callbacks need an event type")
 
         if evty is None:
             evty = _NONE
@@ -396,6 +694,10 @@ class EventManager(object):
 
         with self.lock:
             cb = Callback(function, time.time(), args, kwargs)
+            if batch:
+                cb.batch = _EventBatcher(self, cb,
+                                         None if obj is _NONE else obj,
+                                         batch_delay, ui)
 
             # add the specified categories if needed.
             for cbs in all_cbs:
@@ -409,6 +711,8 @@ class EventManager(object):
                 # add the actual callback
                 callbacks.append(cb)
 
+            self._invalidate_dispatch()
+
         if self.use_logger:
             if not self.logger_filter or evty is _NONE or re.search(self.logger_filter, evty):
                 logger.debug("Added callback %s for [%s, %s]" %
@@ -446,12 +750,16 @@ class EventManager(object):
 
                 for cb in remove:
                     callbacks.remove(cb)
+                    if cb.batch is not None:
+                        cb.batch.clear()
 
                 if len(callbacks) == 0:
                     del cbs[evty][obj]
                     if len(cbs[evty]) == 0:
                         del cbs[evty]
 
+            self._invalidate_dispatch()
+
         if self.use_logger:
             if not self.logger_filter or evty is _NONE or re.search(self.logger_filter, evty):
                 logger.debug("Removed callback %s for [%s, %s]" %
@@ -208,6 +208,10 @@ def create_argument_parser():
     group.add_argument("--eventdebug-full", dest="DebugEventFull",
                        action="store_true", default=False, help=_("Enable full debugging of"
                                                                   " xl.event. Generates LOTS of output"))
+    group.add_argument("--eventstats", dest="EventStats",
+                       action="store_true", default=False, help=_("Log how often"
+                                                                  " each event is sent and how long its callbacks take,"
+                                                                  " on exit"))
     group.add_argument("--threaddebug", dest="DebugThreads",
                        action="store_true", default=False, help=_("Add thread name to logging"
                                                                   " messages."))
@@ -323,6 +327,9 @@ class Exaile(object):
             if self.options.DebugEventFull:
                 event.EVENT_MANAGER.use_verbose_logger = True
 
+            if self.options.EventStats:
+                event.EVENT_MANAGER.set_stats_enabled(True)
+
             # initial mainloop setup. The actual loop is started later,
             # if necessary
             self.mainloop_init()
@@ -672,6 +679,10 @@ class Exaile(object):
         self.quitting = True
         logger.info("Exaile is shutting down...")
 
+        if self.options.EventStats:
+            from xl import event
+            event.EVENT_MANAGER.get_stats().log()
+
         logger.info("Tearing down plugins...")
         self.plugins.teardown(self)
 
@@ -691,7 +702,7 @@ class Exaile(object):
         from xl import covers
         covers.MANAGER.save()
 
-        self.collection.save_to_location()
+        self.collection.save_to_location(write_snapshot=True)
 
         # Save order of custom playlists
         self.playlists.save_order()
@@ -31,7 +31,7 @@ in playlists as well as methods to import and export from various file formats.
 
 from gi.repository import Gio
 
-import cgi
+from bisect import bisect_right
 from collections import deque, namedtuple
 from datetime import datetime, timedelta
 import logging
@@ -871,6 +871,229 @@ class XSPFConverter(FormatConverter):
 providers.register('playlist-format-converter', XSPFConverter())
 
 
+def _album_key(track):
+    album = track.get_tag_raw('album')
+    if album is None:
+        return None
+    return tuple(album)
+
+
+class _ShuffleState(object):
+    """
+        The entries of a playlist that shuffling can still pick, and its
+        entries grouped by album, so that picking the next track doesn't
+        visit the whole playlist.
+
+        It is built from the shuffle history kept in the metadata of
+        the entries, and has to be thrown away when entries move.
+    """
+
+    def __init__(self, tracks):
+        """
+            :param tracks: the entries of the playlist
+            :type tracks: :class:`xl.common.MetadataList`
+        """
+        self.tracks = tracks
+        # positions that weren't played, and position -> index in pool
+        self.pool = []
+        self.slots = {}
+        # album key -> ascending positions
+        self.albums = {}
+        # album key -> number of positions not played, and the albums
+        # with a name that still have some, like pool and slots
+        self.unplayed = {}
+        self.album_pool = []
+        self.album_slots = {}
+        self.add(0)
+
+    @staticmethod
+    def __pool_add(pool, slots, item):
+        slots[item] = len(pool)
+        pool.append(item)
+
+    @staticmethod
+    def __pool_remove(pool, slots, item):
+        idx = slots.pop(item)
+        last = pool.pop()
+        if last != item:
+            pool[idx] = last
+            slots[last] = idx
+
+    def add(self, start):
+        """
+            Adds the entries from start on, which were appended
+        """
+        for idx in xrange(start, len(self.tracks)):
+            key = _album_key(self.tracks[idx])
+            self.albums.setdefault(key, []).append(idx)
+            self.unplayed.setdefault(key, 0)
+            if not self.tracks.get_meta_key(idx, 'playlist_shuffle_history'):
+                self.set_played(idx, False)
+
+    def set_played(self, position, played):
+        """
+            Records that the entry at position was added to or removed
+            from the shuffle history
+        """
+        if (position in self.slots) != played:
+            return
+        key = _album_key(self.tracks[position])
+        if played:
+            self.__pool_remove(self.pool, self.slots, position)
+            self.unplayed[key] -= 1
+            if key and not self.unplayed[key]:
+                self.__pool_remove(self.album_pool, self.album_slots, key)
+        else:
+            self.__pool_add(self.pool, self.slots, position)
+            self.unplayed[key] += 1
+            if key and self.unplayed[key] == 1:
+                self.__pool_add(self.album_pool, self.album_slots, key)
+
+    def pick_track(self):
+        """
+            Returns a random position that wasn't played, or -1
+        """
+        if not self.pool:
+            return -1
+        return random.choice(self.pool)
+
+    def pick_album(self):
+        """
+            Returns the positions of a random album that has entries
+            which weren't played, or None
+        """
+        if not self.album_pool:
+            return None
+        return self.albums[random.choice(self.album_pool)]
+
+    def get_album_after(self, position):
+        """
+            Returns the positions after position that are on the same
+            album as the entry at position
+        """
+        positions = self.albums.get(_album_key(self.tracks[position]), [])
+        return positions[bisect_right(positions, position):]
+
+
+class _DurationIndex(object):
+    """
+        The lengths of the entries of a playlist as a Fenwick tree, so
+        that the length of any run of entries is summed in O(log n).
+
+        Entries can be appended, removed from the end and replaced one
+        at a time; after other changes it has to be built again.
+    """
+
+    def __init__(self, tracks):
+        """
+            :param tracks: the entries of the playlist
+            :type tracks: list of :class:`xl.trax.Track`
+        """
+        # 1-based trees of the known lengths and of the number of
+        # entries without a length
+        self.lengths = [0.0]
+        self.unknown = [0]
+        for track in tracks:
+            length, unknown = self.__get_length(track)
+            self.lengths.append(length)
+            self.unknown.append(unknown)
+        size = len(self.lengths)
+        for tree in (self.lengths, self.unknown):
+            for i in xrange(1, size):
+                parent = i + (i & -i)
+                if parent < size:
+                    tree[parent] += tree[i]
+
+    def __len__(self):
+        return len(self.lengths) - 1
+
+    @staticmethod
+    def __get_length(track):
+        """
+            Returns the length of a track and 0, or 0 and 1 if the
+            length isn't known
+        """
+        try:
+            return (float(track.get_tag_raw('__length')), 0)
+        except (TypeError, ValueError):
+            return (0.0, 1)
+
+    @staticmethod
+    def __prefix(tree, end):
+        total = 0
+        while end > 0:
+            total += tree[end]
+            end &= end - 1
+        return total
+
+    @staticmethod
+    def __add(tree, position, delta):
+        position += 1
+        while position < len(tree):
+            tree[position] += delta
+            position += position & -position
+
+    def append(self, track):
+        """
+            Adds an entry at the end
+        """
+        length, unknown = self.__get_length(track)
+        # node i holds the sum of the entries after i - (i & -i) up to i
+        i = len(self.lengths)
+        first = i - (i & -i)
+        for tree, value in ((self.lengths, length), (self.unknown, unknown)):
+            tree.append(value + self.__prefix(tree, i - 1) -
+                        self.__prefix(tree, first))
+
+    def truncate(self, size):
+        """
+            Removes the entries from size on
+        """
+        del self.lengths[size + 1:]
+        del self.unknown[size + 1:]
+
+    def update(self, position, track):
+        """
+            Takes the length of the entry at position from track
+        """
+        length, unknown = self.__get_length(track)
+        old_length, old_unknown = self.get(position, position + 1)
+        self.__add(self.lengths, position, length - old_length)
+        self.__add(self.unknown, position, unknown - old_unknown)
+
+    def replace(self, start, end, step, tracks):
+        """
+            Follows the replacement of the entries at start:end:step
+            by the entries at start:start + len(added) in tracks.
+
+            :returns: False if the index has to be built again
+        """
+        if step != 1:
+            return False
+        size = len(self)
+        end = max(start, end)
+        if start == end == size:
+            for track in tracks[start:]:
+                self.append(track)
+        elif end == size and len(tracks) == start:
+            self.truncate(start)
+        elif end == start + 1 and len(tracks) == size:
+            self.update(start, tracks[start])
+        else:
+            return False
+        return True
+
+    def get(self, start, end):
+        """
+            Returns the summed length of the entries from start up to
+            end, and how many of them don't have a length
+        """
+        return (self.__prefix(self.lengths, end) -
+                self.__prefix(self.lengths, start),
+                self.__prefix(self.unknown, end) -
+                self.__prefix(self.unknown, start))
+
+
 class Playlist(object):
     # TODO: how do we document events in sphinx?
     """
@@ -903,7 +1126,7 @@ class Playlist(object):
     dynamic_mode_names = [_('Dynamic _Off'), _('Dynamic by Similar _Artists')]
     save_attrs = ['shuffle_mode', 'repeat_mode', 'dynamic_mode',
                   'current_position', 'name']
-    __playlist_format_version = [2, 0]
+    __playlist_format_version = [2, 1]
 
     def __init__(self, name, initial_tracks=[]):
         """
@@ -928,10 +1151,17 @@ class Playlist(object):
         #   Determines when the 'unsaved' indicator is shown to the user.
         self.__dirty = False
         self.__needs_save = False
+        # where the playlist was last loaded from or saved to
+        self.__saved_location = None
         self.__name = name
         self.__next_data = None
         self.__current_position = -1
         self.__spat_position = -1
+        # _ShuffleState, built when shuffling needs it
+        self.__shuffle_state = None
+        # _DurationIndex, built when a duration is asked for
+        self.__duration_index = None
+        self.__watching_lengths = False
         self.__shuffle_history_counter = 1  # start positive so we can
         # just do an if directly on the value
         event.add_callback(self.on_playback_track_start,
@@ -1011,9 +1241,10 @@ class Playlist(object):
         """
         self.__next_data = None
         oldposition = self.spat_position
-        self.__tracks.set_meta_key(position, "playlist_spat_position", True)
+        if position != -1:
+            self.__tracks.set_meta_key(position, "playlist_spat_position", True)
         self.__spat_position = position
-        if oldposition != -1:
+        if oldposition != -1 and oldposition != position:
             try:
                 self.__tracks.del_meta_key(oldposition, "playlist_spat_position")
             except KeyError:
@@ -1058,6 +1289,65 @@ class Playlist(object):
                 self.__tracks.del_meta_key(i, "playlist_shuffle_history")
             except Exception:
                 pass
+        self.__shuffle_state = None
+
+    def __get_shuffle_state(self):
+        if self.__shuffle_state is None:
+            self.__shuffle_state = _ShuffleState(self.__tracks)
+        return self.__shuffle_state
+
+    def __get_duration_index(self):
+        if self.__duration_index is None:
+            if not self.__watching_lengths:
+                event.add_callback(self.on_track_tags_changed,
+                                   "track_tags_changed")
+                self.__watching_lengths = True
+            self.__duration_index = _DurationIndex(self.__tracks)
+        return self.__duration_index
+
+    def get_duration(self, start=0, end=None):
+        """
+            Retrieves the summed length of the tracks
+            from start up to (not including) end
+
+            :param start: the first position
+            :type start: int
+            :param end: the position to stop at, defaults
+                to the end of the playlist
+            :type end: int
+            :returns: the duration in seconds, or None if
+                the length of one of the tracks is unknown
+            :rtype: float or None
+        """
+        start, end, step = slice(start, end).indices(len(self))
+        if end <= start:
+            return 0
+        duration, unknown = self.__get_duration_index().get(start, end)
+        if unknown:
+            return None
+        return duration
+
+    def get_total_duration(self):
+        """
+            Retrieves the summed length of all tracks,
+            ignoring tracks with an unknown length
+
+            :returns: the duration in seconds
+            :rtype: float
+        """
+        return self.__get_duration_index().get(0, len(self))[0]
+
+    def get_remaining_duration(self):
+        """
+            Retrieves the summed length of the tracks from the
+            current position on, including the current track
+            and ignoring tracks with an unknown length
+
+            :returns: the duration in seconds
+            :rtype: float
+        """
+        start = max(0, self.current_position)
+        return self.__get_duration_index().get(start, len(self))[0]
 
     @common.threaded
     def __fetch_dynamic_tracks(self):
@@ -1068,6 +1358,7 @@ class Playlist(object):
             Returns a valid next track if shuffle is activated based
             on random_mode
         """
+        state = self.__get_shuffle_state()
         if mode == "album":
             # TODO: we really need proper album-level operations in
             # xl.trax for this
@@ -1079,35 +1370,23 @@ class Playlist(object):
                 # randomly from its first track
                 if current_position == -1:
                     raise IndexError
-                curr = self[current_position]
-                t = [x for i, x in enumerate(self)
-                     if x.get_tag_raw('album') == curr.get_tag_raw('album')
-                     and i > current_position]
+                t = [self.__tracks[i]
+                     for i in state.get_album_after(current_position)]
                 t = trax.sort_tracks(['discnumber', 'tracknumber'], t)
                 return self.__tracks.index(t[0]), t[0]
 
             except IndexError:  # Pick a new album
-                hist = set(self.get_shuffle_history())
-                albums = set()
-                for i, x in enumerate(self):
-                    if (i, x) in hist:
-                        continue
-                    alb = x.get_tag_raw('album')
-                    if alb:
-                        albums.add(tuple(alb))
-                if not albums:
+                positions = state.pick_album()
+                if positions is None:
                     return -1, None
-                album = list(random.choice(list(albums)))
-                t = [x for x in self if x.get_tag_raw('album') == album]
+                t = [self.__tracks[i] for i in positions]
                 t = trax.sort_tracks(['tracknumber'], t)
                 return self.__tracks.index(t[0]), t[0]
         else:
-            hist = {i for i, tr in self.get_shuffle_history()}
-            try:
-                return random.choice([(i, self.__tracks[i]) for i, tr in enumerate(self.__tracks)
-                                      if i not in hist])
-            except IndexError:  # no more tracks
+            i = state.pick_track()
+            if i == -1:  # no more tracks
                 return -1, None
+            return i, self.__tracks[i]
 
     def __get_next(self, current_position):
 
@@ -1132,6 +1411,8 @@ class Playlist(object):
                 self.__tracks.set_meta_key(current_position,
                                            "playlist_shuffle_history", self.__shuffle_history_counter)
                 self.__shuffle_history_counter += 1
+                if self.__shuffle_state is not None:
+                    self.__shuffle_state.set_played(current_position, True)
             next_index, next = self.__next_random_track(current_position, shuffle_mode)
             if next is not None:
                 self.__next_data = (None, next_index)
@@ -1217,6 +1498,8 @@ class Playlist(object):
             if shuffle_hist:
                 self.current_position = prev_index
                 self.__tracks.del_meta_key(prev_index, 'playlist_shuffle_history')
+                if self.__shuffle_state is not None:
+                    self.__shuffle_state.set_played(prev_index, False)
         else:
             position = self.current_position - 1
             if position < 0:
@@ -1378,36 +1661,45 @@ class Playlist(object):
 
     def save_to_location(self, location):
         """
-            Writes the content of the playlist to a given location
+            Writes the content of the playlist to a given location,
+            unless it was loaded from or saved there and hasn't
+            changed since
 
             :param location: the location to save to
             :type location: string
         """
-        if os.path.exists(location):
-            f = open(location + ".new", "w")
-        else:
-            f = open(location, "w")
+        if not self.__dirty and location == self.__saved_location and \
+                os.path.exists(location):
+            return
+
+        lines = []
         for track in self.__tracks:
-            buffer = track.get_loc_for_io()
-            # write track metadata
-            meta = {}
-            items = ('artist', 'album', 'tracknumber',
-                     'title', 'genre', 'date')
-            for item in items:
-                value = track.get_tag_raw(item)
-                if value is not None:
-                    # FIXME: This should join multiple values.
-                    v = value[0]
-                    if isinstance(v, unicode):
-                        v = v.encode('utf-8')
-                    meta[item] = v
-            buffer += '\t%s\n' % urllib.urlencode(meta)
+            loc = track.get_loc_for_io()
+            if loc.startswith('file://'):
+                # local tracks get their tags from the file on loading
+                line = loc + '\n'
+            else:
+                # write track metadata
+                meta = {}
+                items = ('artist', 'album', 'tracknumber',
+                         'title', 'genre', 'date')
+                for item in items:
+                    value = track.get_tag_raw(item)
+                    if value is not None:
+                        # FIXME: This should join multiple values.
+                        v = value[0]
+                        if isinstance(v, unicode):
+                            v = v.encode('utf-8')
+                        meta[item] = v
+                line = '%s\t%s\n' % (loc, urllib.urlencode(meta))
             try:
-                f.write(buffer.encode('utf-8'))
+                lines.append(line.encode('utf-8'))
             except UnicodeDecodeError:
                 continue
 
-        f.write("EOF\n")
+        lines.append("EOF\n")
+        lines.append("__playlist_format_version=%s\n" %
+                     settings.MANAGER._val_to_str(self.__playlist_format_version))
         for item in self.save_attrs:
             val = getattr(self, item)
             try:
@@ -1415,46 +1707,54 @@ class Playlist(object):
             except ValueError:
                 strn = ""
 
-            f.write("%s=%s\n" % (item, strn))
-        f.close()
+            lines.append("%s=%s\n" % (item, strn))
+
+        if os.path.exists(location):
+            f = open(location + ".new", "w")
+        else:
+            f = open(location, "w")
+        try:
+            f.write(''.join(lines))
+        finally:
+            f.close()
         if os.path.exists(location + ".new"):
             os.remove(location)
             os.rename(location + ".new", location)
         self.__needs_save = self.__dirty = False
+        self.__saved_location = location
 
-    def load_from_location(self, location):
+    @classmethod
+    def _read_location(cls, location):
         """
-            Loads the content of the playlist from a given location
+            Reads a playlist file written by :meth:`save_to_location`
+            without creating its tracks
 
             :param location: the location to load from
             :type location: string
+            :returns: the lines describing the tracks and a dict of
+                the saved attributes, or None if there is no file
+            :raises IOError: if the file is in an unknown format
         """
-        # note - this is not guaranteed to fire events when it sets
-        # attributes. It is intended ONLY for initial setup, not for
-        # reloading a playlist inline.
-        f = None
+        data = None
         for loc in [location, location + ".new"]:
             try:
-                f = open(loc, 'r')
+                with open(loc, 'r') as f:
+                    data = f.read()
                 break
             except Exception:
                 pass
-        if not f:
-            return
-        locs = []
-        while True:
-            line = f.readline()
-            if line == "EOF\n" or line == "":
-                break
-            locs.append(line.strip())
-        items = {}
-        while True:
-            line = f.readline()
-            if line == "":
-                break
+        if data is None:
+            return None
 
+        lines = data.split('\n')
+        try:
+            end = lines.index('EOF')
+        except ValueError:
+            end = len(lines)
+        items = {}
+        for line in lines[end + 1:]:
             try:
-                item, strn = line[:-1].split("=", 1)
+                item, strn = line.split("=", 1)
             except ValueError:
                 continue  # Skip erroneous lines
 
@@ -1465,35 +1765,56 @@ class Playlist(object):
         if ver[0] == 1:
             if items.get("repeat_mode") == "playlist":
                 items['repeat_mode'] = "all"
-        elif ver[0] > self.__playlist_format_version[0]:
+        elif ver[0] > cls.__playlist_format_version[0]:
             raise IOError("Cannot load playlist, unknown format")
-        elif ver > self.__playlist_format_version:
+        elif ver > cls.__playlist_format_version:
             logger.warning("Playlist created on a newer Exaile version, some attributes may not be handled.")
-        f.close()
+
+        return ([line.strip() for line in lines[:end]], items)
+
+    def load_from_location(self, location):
+        """
+            Loads the content of the playlist from a given location
+
+            :param location: the location to load from
+            :type location: string
+        """
+        # note - this is not guaranteed to fire events when it sets
+        # attributes. It is intended ONLY for initial setup, not for
+        # reloading a playlist inline.
+        content = self._read_location(location)
+        if content is None:
+            return
+        lines, items = content
 
         trs = []
 
-        for loc in locs:
+        for line in lines:
+            if not line:
+                continue
             meta = None
-            if loc.find('\t') > -1:
-                splitted = loc.split('\t')
-                loc = "\t".join(splitted[:-1])
-                meta = splitted[-1]
+            if line.find('\t') > -1:
+                loc, meta = line.rsplit('\t', 1)
+            else:
+                loc = line
 
-            track = None
-            track = trax.Track(uri=loc)
+            # saved locations are normalized already, so known tracks
+            # don't need another trip through Gio
+            track = trax.Track._lookup(loc)
+            if track is None:
+                track = trax.Track(uri=loc)
 
             # readd meta
-            if not track:
-                continue
-            if not track.is_local() and meta is not None:
-                meta = cgi.parse_qs(meta)
+            if meta is not None and not track.is_local():
+                meta = urlparse.parse_qs(meta)
                 for k, v in meta.iteritems():
                     track.set_tag_raw(k, v[0].decode('utf-8'), notify_changed=False)
 
             trs.append(track)
 
         self.__tracks[:] = trs
+        self.__shuffle_state = None
+        self.__duration_index = None
 
         for item, val in items.iteritems():
             if item in self.save_attrs:
@@ -1502,6 +1823,10 @@ class Playlist(object):
                 except TypeError:  # don't bail if we try to set an invalid mode
                     logger.debug("Got a TypeError when trying to set attribute %s to %s during playlist restore.", item, val)
 
+        self.__needs_save = self.__dirty = False
+        if os.path.exists(location):
+            self.__saved_location = location
+
     def reverse(self):
         # reverses current view
         pass
@@ -1560,6 +1885,7 @@ class Playlist(object):
                 if len(value) != len(oldtracks):
                     raise ValueError("Extended slice assignment must match sizes.")
             self.__tracks.__setitem__(i, value)
+            self.__update_positions(start, end, step, metadata)
             removed = MetadataList(zip(range(start, end, step), oldtracks),
                                    oldtracks.metadata)
             if step == 1:
@@ -1569,12 +1895,13 @@ class Playlist(object):
         else:
             if not isinstance(value, trax.Track):
                 raise ValueError("Need trax.Track object, got %r" % type(value))
+            if i < 0:
+                i += len(self)
             self.__tracks[i] = value
+            self.__update_positions(i, i + 1, 1, [None])
             removed = [(i, oldtracks)]
             added = [(i, value)]
 
-        self.on_tracks_changed()
-
         if removed:
             event.log_event('playlist_tracks_removed', self, removed)
         if added:
@@ -1592,12 +1919,15 @@ class Playlist(object):
         removed = MetadataList()
 
         if isinstance(i, slice):
+            self.__update_positions(start, end, step, [])
             removed = MetadataList(zip(xrange(start, end, step), oldtracks),
                                    oldtracks.metadata)
         else:
+            if i < 0:
+                i += len(self) + 1
+            self.__update_positions(i, i + 1, 1, [])
             removed = [(i, oldtracks)]
 
-        self.on_tracks_changed()
         event.log_event('playlist_tracks_removed', self, removed)
         self.__adjust_current_pos(oldpos, removed, [])
         self.__needs_save = self.__dirty = True
@@ -1658,19 +1988,86 @@ class Playlist(object):
             if self.dynamic_mode != 'disabled':
                 self.__fetch_dynamic_tracks()
 
-    def on_tracks_changed(self, *args):
-        for idx in xrange(len(self.__tracks)):
-            if self.__tracks.get_meta_key(idx, "playlist_current_position"):
-                self.__current_position = idx
-                break
-        else:
-            self.__current_position = -1
-        for idx in xrange(len(self.__tracks)):
-            if self.__tracks.get_meta_key(idx, "playlist_spat_position"):
-                self.__spat_position = idx
-                break
-        else:
-            self.__spat_position = -1
+    def on_track_tags_changed(self, event_type, track, tags):
+        """
+            Keeps the duration index current
+        """
+        index = self.__duration_index
+        if index is None or '__length' not in tags or \
+                track not in self.__tracks:
+            return
+        position = -1
+        for i in xrange(self.__tracks.count(track)):
+            position = self.__tracks.index(track, position + 1)
+            index.update(position, track)
+
+    def __update_positions(self, start, end, step, metadata):
+        """
+            Moves the current and SPAT positions along after the entries
+            at start:end:step were replaced by entries with the given
+            metadata. Only the new entries are looked at, so appending
+            to a long playlist doesn't scan it.
+
+            The shuffle state is extended by appended entries and thrown
+            away on other changes, and so is the duration index unless
+            it can follow the change.
+        """
+        if self.__duration_index is not None and \
+                not self.__duration_index.replace(start, end, step,
+                                                  self.__tracks):
+            self.__duration_index = None
+        if self.__shuffle_state is not None:
+            if step == 1 and end <= start and \
+                    start + len(metadata) == len(self.__tracks):
+                self.__shuffle_state.add(start)
+            else:
+                self.__shuffle_state = None
+        self.__current_position = self.__moved_position(
+            self.__current_position, "playlist_current_position",
+            start, end, step, metadata)
+        self.__spat_position = self.__moved_position(
+            self.__spat_position, "playlist_spat_position",
+            start, end, step, metadata)
+
+    @staticmethod
+    def __moved_position(position, key, start, end, step, metadata):
+        """
+            Returns the position of the entry marked with the meta key
+            after replacing start:end:step, or -1 if it is gone. The
+            marker can come back with the new entries, for example when
+            tracks are moved or sorted.
+        """
+        newposition = -1
+        if position != -1:
+            if step == 1:
+                removed = max(0, end - start)
+                if position < start:
+                    newposition = position
+                elif position >= start + removed:
+                    newposition = position + len(metadata) - removed
+            else:
+                # the replaced entries are lowest, lowest + stride, ...
+                count = len(xrange(start, end, step))
+                if step > 0:
+                    (lowest, stride) = (start, step)
+                else:
+                    (lowest, stride) = (start + (count - 1) * step, -step)
+                replaced = lowest <= position < lowest + count * stride \
+                    and (position - lowest) % stride == 0
+                if replaced:
+                    newposition = -1
+                elif metadata:
+                    # assigning to an extended slice keeps the length
+                    newposition = position
+                else:
+                    before = (position - lowest + stride - 1) // stride
+                    newposition = position - min(count, max(0, before))
+        for idx, meta in enumerate(metadata):
+            if meta and meta.get(key):
+                added = start + idx * step
+                if newposition == -1 or added < newposition:
+                    newposition = added
+        return newposition
 
 
 class SmartPlaylist(object):
@@ -2069,14 +2466,13 @@ class PlaylistManager(object):
             # check against hidden files since some editors put
             # temporary stuff in the same dir.
             if f != os.path.basename(self.order_file) and not f.startswith("."):
-                pl = self._create_playlist(f)
                 path = os.path.join(self.playlist_dir, f)
                 try:
-                    pl.load_from_location(path)
+                    name = self._load_name(path, f)
                 except Exception:
                     logger.exception("Failed loading playlist: %r", path)
                 else:
-                    existing.append(pl.name)
+                    existing.append(name)
 
         # if order_file exists then use it
         if os.path.isfile(self.order_file):
@@ -2085,6 +2481,17 @@ class PlaylistManager(object):
         else:
             self.playlists = existing
 
+    def _load_name(self, path, filename):
+        """
+            Returns the name of the playlist saved at path, without
+            loading its tracks
+        """
+        name = filename
+        content = self.playlist_class._read_location(path)
+        if content is not None:
+            name = content[1].get('name', name)
+        return name
+
     def get_playlist(self, name):
         """
             Gets a playlist by name
@@ -2190,4 +2597,10 @@ class SmartPlaylistManager(PlaylistManager):
         # set a default collection so that get_playlist() always works
         return self.playlist_class(name=name, collection=self.collection)
 
+    def _load_name(self, path, filename):
+        # smart playlists are small, just load them
+        pl = self._create_playlist(filename)
+        pl.load_from_location(path)
+        return pl.name
+
 # vim: et sts=4 sw=4
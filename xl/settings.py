@@ -28,6 +28,7 @@
     Central storage of application and user settings
 """
 
+from ast import literal_eval
 from ConfigParser import (
     RawConfigParser,
     NoSectionError,
@@ -36,6 +37,7 @@ from ConfigParser import (
 import logging
 import os
 import sys
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +57,21 @@ TYPE_MAPPING = {
 
 MANAGER = None
 
+# cached for options that aren't set, so that the default is used
+_MISSING = object()
+
+
+def _copy_value(value):
+    """
+        Copies the lists and dicts in a decoded value, so that callers
+        can't change the cached one
+    """
+    if isinstance(value, list):
+        return [_copy_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _copy_value(v) for k, v in value.iteritems()}
+    return value
+
 
 class SettingsManager(RawConfigParser):
     """
@@ -81,6 +98,14 @@ class SettingsManager(RawConfigParser):
         self._saving = False
         self._dirty = False
 
+        # option path -> decoded value, or _MISSING
+        self._cache = {}
+        # held while filling in or invalidating the cache, so that a
+        # value being decoded can't outlive a set_option
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
         if default_location is not None:
             try:
                 self.read(default_location)
@@ -145,11 +170,13 @@ class SettingsManager(RawConfigParser):
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        try:
-            self.set(section, key, value)
-        except NoSectionError:
-            self.add_section(section)
-            self.set(section, key, value)
+        with self._cache_lock:
+            try:
+                self.set(section, key, value)
+            except NoSectionError:
+                self.add_section(section)
+                self.set(section, key, value)
+            self._cache.pop(option, None)
 
         self._dirty = True
 
@@ -173,19 +200,48 @@ class SettingsManager(RawConfigParser):
             :returns: the option value or *default*
             :rtype: any
         """
+        try:
+            value = self._cache[option]
+            self._cache_hits += 1
+        except KeyError:
+            value = self.__load_option(option)
+
+        if value is _MISSING:
+            return default
+        if isinstance(value, (list, dict)):
+            return _copy_value(value)
+        return value
+
+    def __load_option(self, option):
+        """
+            Decodes the value of an option and caches it
+        """
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        try:
-            value = self.get(section, key)
-            value = self._str_to_val(value)
-        except NoSectionError:
-            value = default
-        except NoOptionError:
-            value = default
+        with self._cache_lock:
+            self._cache_misses += 1
+            try:
+                value = self._str_to_val(self.get(section, key))
+            except (NoSectionError, NoOptionError):
+                value = _MISSING
+            except ValueError:
+                logger.exception("Ignoring invalid value of option %s", option)
+                value = _MISSING
+            self._cache[option] = value
 
         return value
 
+    def get_cache_stats(self):
+        """
+            Returns how many get_option calls were answered from the
+            cache of decoded values, and how many had to decode one
+
+            :returns: (hits, misses)
+            :rtype: tuple
+        """
+        return self._cache_hits, self._cache_misses
+
     def has_option(self, option):
         """
             Returns information about the existence
@@ -212,7 +268,9 @@ class SettingsManager(RawConfigParser):
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        RawConfigParser.remove_option(self, section, key)
+        with self._cache_lock:
+            RawConfigParser.remove_option(self, section, key)
+            self._cache.pop(option, None)
 
     def _set_direct(self, option, value):
         """
@@ -227,11 +285,13 @@ class SettingsManager(RawConfigParser):
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        try:
-            self.set(section, key, value)
-        except NoSectionError:
-            self.add_section(section)
-            self.set(section, key, value)
+        with self._cache_lock:
+            try:
+                self.set(section, key, value)
+            except NoSectionError:
+                self.add_section(section)
+                self.set(section, key, value)
+            self._cache.pop(option, None)
 
         event.log_event('option_set', self, option)
 
@@ -263,7 +323,10 @@ class SettingsManager(RawConfigParser):
 
         # Lists and dictionaries are special case
         if kind in ('L', 'D'):
-            return eval(value)
+            try:
+                return literal_eval(value)
+            except (SyntaxError, ValueError):
+                raise ValueError("Invalid %s setting: %r" % (kind, value))
 
         if kind in TYPE_MAPPING.keys():
             if kind == 'B':
@@ -31,7 +31,7 @@
 Provides the base for creating and managing Track objects.
 """
 
-from xl.trax.track import Track
+from xl.trax.track import Track, get_modified_time, read_file_tags
 from xl.trax.trackdb import TrackDB
 from xl.trax.search import (
     SearchResultTrack,
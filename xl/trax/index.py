@@ -0,0 +1,353 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+"""
+Indexes used by :class:`xl.trax.TrackDB` to answer searches without
+visiting every track.
+"""
+
+from bisect import bisect_left, bisect_right
+import threading
+
+__all__ = ['TagIndex', 'NUMERIC_TAGS']
+
+# Tags that get_tag_search reports from a different tag
+_TAG_ALIASES = {
+    'albumartist': 'artist',
+}
+
+# Tags whose search value is computed rather than stored verbatim
+_UNINDEXABLE_TAGS = frozenset(('tracknumber', 'discnumber'))
+
+#: Tags that are compared as numbers and kept in sorted order
+NUMERIC_TAGS = frozenset(('__rating', '__playcount', '__date_added',
+                          '__last_played', '__length', 'bpm'))
+
+# Tolerance used by _ExactMatcher when comparing numbers
+_EPSILON = 0.0001
+
+
+def _search_values(track, tag):
+    """
+        Returns the values of a tag as the matchers see them, or None
+        if the track doesn't have the tag.
+    """
+    values = track.get_tag_search(tag, format=False)
+    if values == '__null__':
+        return None
+    if not isinstance(values, list):
+        values = [values]
+    return values
+
+
+class _TextTagIndex(object):
+    """
+        Maps the search values of a single tag to tracks
+    """
+
+    def __init__(self, tag):
+        self.tag = tag
+        # value -> set of tracks
+        self.values = {}
+        # tracks without a value for the tag
+        self.nulls = set()
+        # track -> values it was indexed under
+        self.indexed = {}
+
+    def add(self, track):
+        values = _search_values(track, self.tag)
+        if values is None:
+            self.nulls.add(track)
+            return
+        for value in values:
+            self.values.setdefault(value, set()).add(track)
+        self.indexed[track] = values
+
+    def remove(self, track):
+        self.nulls.discard(track)
+        for value in self.indexed.pop(track, ()):
+            tracks = self.values.get(value)
+            if tracks is None:
+                continue
+            tracks.discard(track)
+            if not tracks:
+                del self.values[value]
+
+    def find(self, test, lower):
+        result = set()
+        for value, tracks in self.values.iteritems():
+            try:
+                found = test(lower(value))
+            except (AttributeError, TypeError):
+                # let the matcher decide on values we can't compare
+                found = True
+            if found:
+                result.update(tracks)
+        return result
+
+
+class _NumericTagIndex(object):
+    """
+        Keeps the numeric values of a single tag in sorted order so
+        that range queries only touch the matching values.
+    """
+
+    def __init__(self, tag):
+        self.tag = tag
+        # sorted distinct numbers, and number -> set of tracks
+        self.keys = []
+        self.values = {}
+        # tracks without a value for the tag
+        self.nulls = set()
+        # track -> numbers it was indexed under
+        self.indexed = {}
+
+    def add(self, track):
+        values = _search_values(track, self.tag)
+        if values is None:
+            self.nulls.add(track)
+            return
+        numbers = []
+        for value in values:
+            try:
+                numbers.append(float(value))
+            except (TypeError, ValueError):
+                continue
+        for number in numbers:
+            tracks = self.values.get(number)
+            if tracks is None:
+                tracks = self.values[number] = set()
+                self.keys.insert(bisect_left(self.keys, number), number)
+            tracks.add(track)
+        self.indexed[track] = numbers
+
+    def remove(self, track):
+        self.nulls.discard(track)
+        for number in self.indexed.pop(track, ()):
+            tracks = self.values.get(number)
+            if tracks is None:
+                continue
+            tracks.discard(track)
+            if not tracks:
+                del self.values[number]
+                del self.keys[bisect_left(self.keys, number)]
+
+    def slice(self, start, end):
+        """
+            Returns the tracks with a value in keys[start:end]
+        """
+        result = set()
+        for number in self.keys[start:end]:
+            result.update(self.values[number])
+        return result
+
+    def greater(self, number):
+        return self.slice(bisect_right(self.keys, number), None)
+
+    def less(self, number):
+        return self.slice(None, bisect_left(self.keys, number))
+
+    def near(self, number):
+        return self.slice(bisect_right(self.keys, number - _EPSILON),
+                          bisect_left(self.keys, number + _EPSILON))
+
+
+class TagIndex(object):
+    """
+        Inverted index from search values to the tracks carrying them.
+
+        Values are taken from :meth:`Track.get_tag_search` (with
+        ``format=False``), so a lookup always gives a superset of what
+        the matchers in :mod:`xl.trax.search` would accept. Tags in
+        :data:`NUMERIC_TAGS` are kept as sorted numbers so that ``>``,
+        ``<`` and ``==`` resolve to a slice of the values.
+
+        A tag is only indexed the first time it is looked up; after that
+        it is kept current by :meth:`add_tracks`, :meth:`remove_tracks`
+        and :meth:`update_track`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tracks = set()
+        # tag -> _TextTagIndex or _NumericTagIndex
+        self._tags = {}
+
+    def __len__(self):
+        return len(self._tracks)
+
+    @staticmethod
+    def is_indexable(tag):
+        """
+            Returns whether lookups on the given tag can be answered
+            from the index.
+        """
+        if tag in NUMERIC_TAGS:
+            return True
+        return not tag.startswith('__') and tag not in _UNINDEXABLE_TAGS
+
+    def clear(self):
+        """
+            Forgets all tracks and indexed tags
+        """
+        with self._lock:
+            self._tracks = set()
+            self._tags = {}
+
+    def add_tracks(self, tracks):
+        """
+            Adds tracks to the index
+
+            :param tracks: an iterable of :class:`xl.trax.Track`
+        """
+        with self._lock:
+            for track in tracks:
+                if track in self._tracks:
+                    continue
+                self._tracks.add(track)
+                for tagindex in self._tags.itervalues():
+                    tagindex.add(track)
+
+    def remove_tracks(self, tracks):
+        """
+            Removes tracks from the index
+
+            :param tracks: an iterable of :class:`xl.trax.Track`
+        """
+        with self._lock:
+            for track in tracks:
+                if track not in self._tracks:
+                    continue
+                self._tracks.discard(track)
+                for tagindex in self._tags.itervalues():
+                    tagindex.remove(track)
+
+    def update_track(self, track, tags):
+        """
+            Reindexes the given tags of a track
+
+            :param track: the :class:`xl.trax.Track` that changed
+            :param tags: the names of the tags that changed
+        """
+        with self._lock:
+            if track not in self._tracks:
+                return
+            for tag in tags:
+                tagindex = self._tags.get(tag)
+                if tagindex is not None:
+                    tagindex.remove(track)
+                    tagindex.add(track)
+
+    def exact(self, tag, content, lower):
+        """
+            Finds the tracks that might have a value equal to content
+
+            :param tag: the tag to look in
+            :param content: the value to look for, or None to look
+                for tracks without the tag
+            :param lower: the function the matcher applies to values
+            :returns: a set of tracks, or None if the tag cannot be
+                answered from the index
+        """
+        with self._lock:
+            tagindex = self.__get(tag)
+            if tagindex is None:
+                return None
+            if content is None:
+                return set(tagindex.nulls)
+            if isinstance(tagindex, _NumericTagIndex):
+                try:
+                    return tagindex.near(float(content))
+                except (TypeError, ValueError):
+                    return None
+            return tagindex.find(lambda value: value == content, lower)
+
+    def contains(self, tag, content, lower):
+        """
+            Finds the tracks that might have a value containing content
+
+            :param tag: the tag to look in
+            :param content: the substring to look for
+            :param lower: the function the matcher applies to values
+            :returns: a set of tracks, or None if the tag cannot be
+                answered from the index
+        """
+        if not isinstance(content, basestring):
+            return None
+        with self._lock:
+            tagindex = self.__get(tag)
+            if not isinstance(tagindex, _TextTagIndex):
+                return None
+            return tagindex.find(lambda value: content in value, lower)
+
+    def greater(self, tag, number):
+        """
+            Finds the tracks that have a value greater than number
+
+            :returns: a set of tracks, or None if the tag cannot be
+                answered from the index
+        """
+        with self._lock:
+            tagindex = self.__get(tag)
+            if not isinstance(tagindex, _NumericTagIndex):
+                return None
+            return tagindex.greater(number)
+
+    def less(self, tag, number):
+        """
+            Finds the tracks that have a value less than number. Tracks
+            without the tag count as 0.
+
+            :returns: a set of tracks, or None if the tag cannot be
+                answered from the index
+        """
+        with self._lock:
+            tagindex = self.__get(tag)
+            if not isinstance(tagindex, _NumericTagIndex):
+                return None
+            result = tagindex.less(number)
+            if number > 0:
+                result |= tagindex.nulls
+            return result
+
+    def __get(self, tag):
+        """
+            Returns the index for a tag, building it if needed, or None
+            if the tag can't be indexed.
+        """
+        if not self.is_indexable(tag):
+            return None
+        tag = _TAG_ALIASES.get(tag, tag)
+        tagindex = self._tags.get(tag)
+        if tagindex is None:
+            if tag in NUMERIC_TAGS:
+                tagindex = _NumericTagIndex(tag)
+            else:
+                tagindex = _TextTagIndex(tag)
+            for track in self._tracks:
+                tagindex.add(track)
+            self._tags[tag] = tagindex
+        return tagindex
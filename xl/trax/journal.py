@@ -0,0 +1,173 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+
+"""
+Append-only change journal kept next to the shelf of a
+:class:`xl.trax.TrackDB`, so that changes are on disk as soon as they
+happen and a save only has to write the tracks that changed.
+"""
+
+import cPickle as pickle
+import logging
+import os
+import threading
+
+from xl import common
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['TrackDBJournal']
+
+# Record types
+ADD = 'add'
+TAGS = 'tags'
+REMOVE = 'remove'
+
+
+class TrackDBJournal(object):
+    """
+        Appends track additions, tag changes and removals to a file.
+
+        Records are tuples of the record type and the key of the
+        :class:`xl.trax.trackdb.TrackHolder` they apply to:
+
+        * ``(ADD, key, pickles, attrs)`` for a new track
+        * ``(TAGS, key, {tag: value})`` for changed tags
+        * ``(REMOVE, key)`` for a removed track
+
+        Saving the shelf takes two steps: :meth:`rotate` sets the
+        current records aside before the changed tracks are written, and
+        :meth:`commit` drops them once the shelf is synced. Changes made
+        in the meantime go to a fresh journal.
+
+        :param location: the location of the journal file
+    """
+
+    def __init__(self, location):
+        self.location = location
+        self.rotated_location = location + '.old'
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __write(self, record):
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.location, 'ab')
+                pickle.dump(record, self._file, common.PICKLE_PROTOCOL)
+                # hand the record to the OS, so that it survives a crash
+                # of Exaile if not of the machine
+                self._file.flush()
+            except (IOError, OSError):
+                logger.exception("Could not write to %s", self.location)
+
+    def add(self, key, pickles, attrs):
+        self.__write((ADD, key, pickles, attrs))
+
+    def set_tags(self, key, tags):
+        self.__write((TAGS, key, tags))
+
+    def remove(self, key):
+        self.__write((REMOVE, key))
+
+    def read(self):
+        """
+            Yields the records in the journal, oldest first, including
+            any that were set aside by a save that didn't complete
+        """
+        for location in (self.rotated_location, self.location):
+            for record in self.__read(location):
+                yield record
+
+    def __read(self, location):
+        try:
+            f = open(location, 'rb')
+        except IOError:
+            return
+        with f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+                except Exception:
+                    # a record cut short by a crash ends the journal
+                    logger.warning("Ignoring incomplete record at the end "
+                                   "of %s", location)
+                    return
+
+    def rotate(self):
+        """
+            Sets the current records aside, before saving the shelf
+        """
+        with self._lock:
+            self.__close()
+            if not os.path.exists(self.location):
+                return
+            try:
+                if os.path.exists(self.rotated_location):
+                    # an earlier save didn't complete, keep its records
+                    with open(self.rotated_location, 'ab') as old:
+                        with open(self.location, 'rb') as new:
+                            old.write(new.read())
+                    os.remove(self.location)
+                else:
+                    os.rename(self.location, self.rotated_location)
+            except (IOError, OSError):
+                logger.exception("Could not rotate %s", self.location)
+
+    def commit(self):
+        """
+            Drops the records set aside by :meth:`rotate`, once the shelf
+            has been saved
+        """
+        with self._lock:
+            try:
+                os.remove(self.rotated_location)
+            except OSError:
+                pass
+
+    def clear(self):
+        """
+            Drops all records
+        """
+        with self._lock:
+            self.__close()
+            for location in (self.rotated_location, self.location):
+                try:
+                    os.remove(location)
+                except OSError:
+                    pass
+
+    def close(self):
+        with self._lock:
+            self.__close()
+
+    def __close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
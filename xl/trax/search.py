@@ -76,12 +76,22 @@ class _Matcher(object):
     def _matches(self, value):
         raise NotImplementedError
 
+    def candidates(self, index):
+        """
+            Returns a superset of the tracks in the index that this
+            condition matches, or None if the index can't tell.
+        """
+        return None
+
 
 class _ExactMatcher(_Matcher):
     """
         Condition for exact matches
     """
 
+    def candidates(self, index):
+        return index.exact(self.tag, self.content, self.lower)
+
     def _matches(self, value):
         if self.tag.startswith("__"):
             try:
@@ -102,6 +112,11 @@ class _InMatcher(_Matcher):
         Condition for inexact (ie. containing) matches
     """
 
+    def candidates(self, index):
+        if not self.content:
+            return None
+        return index.contains(self.tag, self.content, self.lower)
+
     def _matches(self, value):
         if not value:
             return False
@@ -129,35 +144,62 @@ class _RegexMatcher(_Matcher):
             return False
 
 
-class _GtMatcher(_Matcher):
+class _NumericMatcher(_Matcher):
+    """
+        Base class for numeric comparisons. The content is only
+        converted to a number once.
+    """
+    __slots__ = ['number']
+
+    def __init__(self, tag, content, lower):
+        _Matcher.__init__(self, tag, content, lower)
+        try:
+            self.number = float(self.content)
+        except (TypeError, ValueError):
+            self.number = None
+
+
+class _GtMatcher(_NumericMatcher):
     """
         Condition for greater than matches.
     """
 
     def _matches(self, value):
+        if self.number is None:
+            return False
         try:
             value = float(value)
-            content = float(self.content)  # kinda inefficient
         except (TypeError, ValueError):
             return False
-        return value > content
+        return value > self.number
 
+    def candidates(self, index):
+        if self.number is None:
+            return set()
+        return index.greater(self.tag, self.number)
 
-class _LtMatcher(_Matcher):
+
+class _LtMatcher(_NumericMatcher):
     """
         Condition for less than matches.
     """
 
     def _matches(self, value):
+        if self.number is None:
+            return False
         try:
             if value is None:
                 value = 0
             else:
                 value = float(value)
-            content = float(self.content)  # kinda inefficient
         except (TypeError, ValueError):
             return False
-        return value < content
+        return value < self.number
+
+    def candidates(self, index):
+        if self.number is None:
+            return set()
+        return index.less(self.tag, self.number)
 
 
 class _NotMetaMatcher(object):
@@ -173,6 +215,9 @@ class _NotMetaMatcher(object):
     def match(self, srtrack):
         return not self.matcher.match(srtrack)
 
+    def candidates(self, index):
+        return None
+
 
 class _OrMetaMatcher(object):
     """
@@ -187,6 +232,9 @@ class _OrMetaMatcher(object):
     def match(self, srtrack):
         return self.left.match(srtrack) or self.right.match(srtrack)
 
+    def candidates(self, index):
+        return _union_candidates([self.left, self.right], index)
+
 
 class _MultiMetaMatcher(object):
     """
@@ -204,6 +252,9 @@ class _MultiMetaMatcher(object):
                 return False
         return True
 
+    def candidates(self, index):
+        return _intersect_candidates(self.matchers, index)
+
 
 class _ManyMultiMetaMatcher(object):
     """
@@ -233,13 +284,16 @@ class _ManyMultiMetaMatcher(object):
                     self.tags.update(ma.tags)
         return matched
 
+    def candidates(self, index):
+        return _union_candidates(self.matchers, index)
+
 
 class TracksMatcher(object):
     """
         Holds criteria and determines whether
         a given track matches those criteria.
     """
-    __slots__ = ['matchers', 'case_sensitive', 'keyword_tags']
+    __slots__ = ['matchers', 'case_sensitive', 'keyword_tags', '_program']
 
     def __init__(self, search_string, case_sensitive=True, keyword_tags=None):
         """
@@ -256,6 +310,7 @@ class TracksMatcher(object):
         tokens = self.__red(tokens)
         tokens = self.__optimize_tokens(tokens)
         self.matchers = self.__tokens_to_matchers(tokens)
+        self._program = None
 
     def append_matcher(self, matcher, or_match=False):
         '''Here so you can use playlist matchers. Probably needs better impl'''
@@ -263,6 +318,7 @@ class TracksMatcher(object):
             self.matchers.append(matcher)
         else:
             self.matchers[-1] = _OrMetaMatcher(self.matchers[-1], matcher)
+        self._program = None
 
     def prepend_matcher(self, matcher, or_match=False):
         '''Here so you can use playlist matchers. Probably needs better impl'''
@@ -270,12 +326,31 @@ class TracksMatcher(object):
             self.matchers.insert(0, matcher)
         else:
             self.matchers[0] = _OrMetaMatcher(matcher, self.matchers[0])
+        self._program = None
 
     def match(self, srtrack):
         """
             Determine whether a given SearchResultTrack's internal
             Track object matches this search condition.
         """
+        program = self._program
+        if program is None:
+            program = self._program = compile_matchers(
+                self.matchers, self.case_sensitive)
+        tags = program(srtrack)
+        if tags is None:
+            return False
+        on_tags = srtrack.on_tags
+        for tag in tags:
+            if tag not in on_tags:
+                on_tags.append(tag)
+        return True
+
+    def match_tree(self, srtrack):
+        """
+            Same as :meth:`match`, but walks the matcher objects
+            instead of running the compiled program.
+        """
         for ma in self.matchers:
             if not ma.match(srtrack):
                 break
@@ -290,6 +365,15 @@ class TracksMatcher(object):
             return True
         return False
 
+    def candidates(self, index):
+        """
+            Returns a superset of the tracks in the index that this
+            matcher accepts, or None if the index can't tell.
+
+            :param index: a :class:`xl.trax.index.TagIndex`
+        """
+        return _intersect_candidates(self.matchers, index)
+
     def __tokens_to_matchers(self, tokens, matchers=None):
         """
             Converts a token hierarchy to a list of matchers
@@ -488,6 +572,364 @@ class TracksMatcher(object):
         return tokens
 
 
+#
+# Query compiler
+#
+# The matcher objects above form a tree that is convenient to build and
+# inspect, but walking it costs several method calls, isinstance checks
+# and lowercasing per tag per track. compile_matchers() generates a
+# single flat function for the whole query instead: constants are
+# lowered and converted to numbers once, the values of each tag are
+# fetched at most once per track and shared by every term on that tag,
+# and the terms of an AND are ordered by how many tracks they are
+# expected to reject for what they cost to run.
+#
+
+
+def _exact_number(value, number, content):
+    try:
+        return abs(float(value) - number) < 0.0001
+    except (TypeError, ValueError):
+        return value == content
+
+
+def _greater(value, number):
+    try:
+        return float(value) > number
+    except (TypeError, ValueError):
+        return False
+
+
+def _less(value, number):
+    if value is None:
+        return 0 < number
+    try:
+        return float(value) < number
+    except (TypeError, ValueError):
+        return False
+
+
+# estimated fraction of tracks accepted by each kind of term. Nothing
+# is known about a pattern, short prefixes like ^a match a lot of tracks.
+_SELECTIVITY = {
+    _ExactMatcher: 0.01,
+    _InMatcher: 0.3,
+    _RegexMatcher: 0.5,
+    _GtMatcher: 0.5,
+    _LtMatcher: 0.5,
+}
+
+# terms are only moved ahead of terms written before them if their
+# rank is at most this fraction of those terms' ranks, the estimates
+# are too rough to reorder terms that are about the same
+_REORDER_RATIO = 0.8
+
+
+class _QueryCompiler(object):
+    """
+        Generates the source of a function deciding whether a
+        SearchResultTrack matches a list of matchers.
+    """
+
+    def __init__(self, case_sensitive):
+        self.case_sensitive = case_sensitive
+        self.lines = []
+        self.namespace = {
+            '_exact_number': _exact_number,
+            '_greater': _greater,
+            '_less': _less,
+        }
+        self.tags = {}
+        self.count = 0
+
+    def emit(self, depth, line):
+        self.lines.append('    ' * depth + line)
+
+    def name(self, prefix):
+        self.count += 1
+        return '%s%d' % (prefix, self.count)
+
+    def constant(self, value):
+        name = self.name('c')
+        self.namespace[name] = value
+        return name
+
+    def values(self, tag):
+        """
+            Returns the local variable holding the values of a tag
+        """
+        if tag not in self.tags:
+            self.tags[tag] = self.name('v')
+        return self.tags[tag]
+
+    def selectivity(self, ma):
+        cls = type(ma)
+        if cls in _SELECTIVITY:
+            selectivity = _SELECTIVITY[cls]
+            if cls is _InMatcher and ma.content:
+                # every character of a substring rejects more tracks
+                selectivity **= len(ma.content)
+            return selectivity
+        elif cls is _MultiMetaMatcher:
+            selectivity = 1.0
+            for m in ma.matchers:
+                selectivity *= self.selectivity(m)
+            return selectivity
+        elif cls is _OrMetaMatcher:
+            return min(1.0, self.selectivity(ma.left) +
+                       self.selectivity(ma.right))
+        elif cls is _NotMetaMatcher:
+            return 1.0 - self.selectivity(ma.matcher)
+        elif cls is _ManyMultiMetaMatcher:
+            return min(1.0, sum(self.selectivity(m) for m in ma.matchers))
+        return 0.5
+
+    def cost(self, ma):
+        """
+            Returns the number of tag tests needed to evaluate a matcher
+        """
+        cls = type(ma)
+        if cls in (_MultiMetaMatcher, _ManyMultiMetaMatcher):
+            return sum(self.cost(m) for m in ma.matchers)
+        elif cls is _OrMetaMatcher:
+            return self.cost(ma.left) + self.cost(ma.right)
+        elif cls is _NotMetaMatcher:
+            return self.cost(ma.matcher)
+        return 1
+
+    def rank(self, ma):
+        """
+            Returns the estimated cost of a matcher per rejected track,
+            the terms of an AND are cheapest to run by ascending rank.
+        """
+        return self.cost(ma) / max(1.0 - self.selectivity(ma), 0.01)
+
+    def order(self, items, key=lambda item: item):
+        """
+            Sorts items by the rank of key(item), leaving items with
+            similar ranks in the order they were written.
+        """
+        ordered = []
+        for item in items:
+            rank = self.rank(key(item))
+            position = len(ordered)
+            while position > 0 and rank <= _REORDER_RATIO * \
+                    self.rank(key(ordered[position - 1])):
+                position -= 1
+            ordered.insert(position, item)
+        return ordered
+
+    def fetch(self, values, tag, depth):
+        """
+            Emits statements setting the variable named values to the
+            lowered search values of a tag. This is done inline, it
+            runs for every track.
+        """
+        self.emit(depth, '%s = track.get_tag_search(%r, format=False)' %
+                  (values, tag))
+        self.emit(depth, 'if %s == "__null__":' % values)
+        self.emit(depth + 1, '%s = (None,)' % values)
+        if self.case_sensitive:
+            self.emit(depth, 'elif %s.__class__ is not list:' % values)
+            self.emit(depth + 1, '%s = (%s,)' % (values, values))
+        else:
+            self.emit(depth, 'elif %s.__class__ is list:' % values)
+            self.emit(depth + 1, '%s = [None if y is None else y.lower() '
+                      'for y in %s]' % (values, values))
+            self.emit(depth, 'else:')
+            self.emit(depth + 1, '%s = (%s.lower(),)' % (values, values))
+
+    def test(self, ma):
+        """
+            Returns an expression testing a single value x, or None
+            if no value can match.
+        """
+        cls = type(ma)
+        content = ma.content
+        if cls is _ExactMatcher:
+            if ma.tag.startswith('__'):
+                try:
+                    number = float(content)
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    return '_exact_number(x, %s, %s)' % (
+                        self.constant(number), self.constant(content))
+            return 'x == %s' % self.constant(content)
+        elif cls is _InMatcher:
+            if not isinstance(content, basestring):
+                return None
+            return 'x and %s in x' % self.constant(content)
+        elif cls is _RegexMatcher:
+            return 'x and %s(x) is not None' % self.constant(ma._re.search)
+        elif cls in (_GtMatcher, _LtMatcher):
+            if ma.number is None:
+                return None
+            function = '_greater' if cls is _GtMatcher else '_less'
+            return '%s(x, %s)' % (function, self.constant(ma.number))
+
+    def node(self, ma, result, depth):
+        """
+            Emits statements setting the variable named result to
+            whether the matcher matches.
+        """
+        cls = type(ma)
+        if cls in _SELECTIVITY:
+            test = self.test(ma)
+            if test is None:
+                self.emit(depth, '%s = False' % result)
+                return
+            values = self.values(ma.tag)
+            self.emit(depth, 'if %s is None:' % values)
+            self.fetch(values, ma.tag, depth + 1)
+            self.emit(depth, '%s = False' % result)
+            self.emit(depth, 'for x in %s:' % values)
+            self.emit(depth + 1, 'if %s:' % test)
+            self.emit(depth + 2, '%s = True' % result)
+            self.emit(depth + 2, 'break')
+        elif cls is _MultiMetaMatcher:
+            self.emit(depth, '%s = True' % result)
+            for m in self.order(ma.matchers):
+                inner = self.name('r')
+                self.node(m, inner, depth)
+                self.emit(depth, 'if not %s:' % inner)
+                self.emit(depth + 1, '%s = False' % result)
+                self.emit(depth, 'else:')
+                depth += 1
+            self.emit(depth, 'pass')
+        elif cls is _OrMetaMatcher:
+            # try the side most likely to succeed first
+            first, second = ma.left, ma.right
+            if self.selectivity(first) <= \
+                    _REORDER_RATIO * self.selectivity(second):
+                first, second = second, first
+            self.node(first, result, depth)
+            self.emit(depth, 'if not %s:' % result)
+            self.node(second, result, depth + 1)
+        elif cls is _NotMetaMatcher:
+            inner = self.name('r')
+            self.node(ma.matcher, inner, depth)
+            self.emit(depth, '%s = not %s' % (result, inner))
+        elif cls is _ManyMultiMetaMatcher:
+            # inside of a group the matched tags aren't reported, so
+            # this is a plain OR
+            self.emit(depth, '%s = False' % result)
+            for m in ma.matchers:
+                self.node(m, result, depth)
+                self.emit(depth, 'if not %s:' % result)
+                depth += 1
+            self.emit(depth, 'pass')
+        else:
+            self.emit(depth, '%s = %s(srtrack)' %
+                      (result, self.constant(ma.match)))
+
+    def keywords(self, ma, tags, depth):
+        """
+            Emits statements collecting the tags matched by a keyword
+            term into the variable named tags. Every tag is checked so
+            that all matching tags can be reported.
+        """
+        self.emit(depth, '%s = []' % tags)
+        for m in ma.matchers:
+            inner = self.name('r')
+            if type(m) in _SELECTIVITY:
+                self.node(m, inner, depth)
+                self.emit(depth, 'if %s:' % inner)
+                self.emit(depth + 1, '%s.append(%r)' % (tags, m.tag))
+
+    def program(self, matchers):
+        """
+            Returns the source of the function for the given
+            top level matchers.
+        """
+        self.emit(0, 'def program(srtrack):')
+        self.emit(1, 'track = srtrack.track')
+        body = len(self.lines)
+
+        reported = []
+        ordered = self.order(enumerate(matchers), key=lambda item: item[1])
+        for position, ma in ordered:
+            cls = type(ma)
+            if cls is _ManyMultiMetaMatcher:
+                tags = self.name('t')
+                self.keywords(ma, tags, 1)
+                self.emit(1, 'if not %s:' % tags)
+                self.emit(2, 'return None')
+                reported.append((position, tags))
+                continue
+
+            result = self.name('r')
+            self.node(ma, result, 1)
+            self.emit(1, 'if not %s:' % result)
+            self.emit(2, 'return None')
+            if cls in _SELECTIVITY:
+                reported.append((position, '[%r]' % ma.tag))
+            elif cls not in (_MultiMetaMatcher, _OrMetaMatcher,
+                             _NotMetaMatcher):
+                reported.append((position, '_tags_of(%s)' %
+                                 self.constant(ma)))
+
+        # matched tags are reported in the order of the matchers
+        reported.sort()
+        if reported:
+            self.emit(1, 'return ' + ' + '.join(tags for _p, tags in reported))
+        else:
+            self.emit(1, 'return []')
+
+        # start every tag off as not fetched yet
+        self.lines[body:body] = ['    %s = None' % values
+                                 for values in self.tags.itervalues()]
+        self.namespace['_tags_of'] = _tags_of
+        return '\n'.join(self.lines) + '\n'
+
+
+def _tags_of(ma):
+    if ma.tag is not None:
+        return [ma.tag]
+    return list(getattr(ma, 'tags', ()))
+
+
+def compile_matchers(matchers, case_sensitive=True):
+    """
+        Compiles the top level matchers of a :class:`TracksMatcher`
+        into a single function.
+
+        :returns: a function taking a :class:`SearchResultTrack`, and
+            returning None if it does not match or the list of tags
+            it matched on
+    """
+    compiler = _QueryCompiler(case_sensitive)
+    source = compiler.program(matchers)
+    namespace = compiler.namespace
+    exec(compile(source, '<query>', 'exec'), namespace)
+    return namespace['program']
+
+
+def _union_candidates(matchers, index):
+    result = set()
+    for ma in matchers:
+        found = getattr(ma, 'candidates', lambda index: None)(index)
+        if found is None:
+            return None
+        result |= found
+    return result
+
+
+def _intersect_candidates(matchers, index):
+    result = None
+    for ma in matchers:
+        found = getattr(ma, 'candidates', lambda index: None)(index)
+        if found is None:
+            continue
+        if result is None:
+            result = found
+        else:
+            result &= found
+        if not result:
+            break
+    return result
+
+
 class TracksInList(object):
     '''
         Matches tracks contained in a list/dict/set. Copies the list.
@@ -515,14 +957,33 @@ class TracksNotInList(TracksInList):
         return track.track not in self._tracks
 
 
-def search_tracks(trackiter, trackmatchers):
+def search_tracks(trackiter, trackmatchers, index=None):
     """
         Search a set of tracks for those that match specified conditions.
 
         :param trackiter: An iterable object returning Track objects
         :param trackmatchers: A list of TrackMatcher objects
+        :param index: A :class:`xl.trax.index.TagIndex` covering the
+            tracks in trackiter, used to skip tracks that cannot match.
+            Defaults to the index of trackiter if it is a TrackDB.
     """
+    if index is None and hasattr(trackiter, 'get_index'):
+        index = trackiter.get_index()
+
+    candidates = None
+    if index is not None:
+        candidates = _intersect_candidates(trackmatchers, index)
+        # A TrackDB has no meaningful order, so only visit the candidates
+        if candidates is not None and hasattr(trackiter, 'get_index'):
+            trackiter = list(candidates)
+
     for srtr in trackiter:
+        if candidates is not None:
+            if isinstance(srtr, SearchResultTrack):
+                if srtr.track not in candidates:
+                    continue
+            elif srtr not in candidates:
+                continue
         if not isinstance(srtr, SearchResultTrack):
             srtr = SearchResultTrack(srtr)
         for tma in trackmatchers:
@@ -541,7 +1002,8 @@ def search_tracks(trackiter, trackmatchers):
 
 
 def search_tracks_from_string(trackiter, search_string,
-                              case_sensitive=True, keyword_tags=None):
+                              case_sensitive=True, keyword_tags=None,
+                              index=None):
     """
         Convenience wrapper around search_tracks that builds matchers
         automatically from the search string.
@@ -551,7 +1013,7 @@ def search_tracks_from_string(trackiter, search_string,
     """
     matchers = [TracksMatcher(search_string, case_sensitive=case_sensitive,
                               keyword_tags=keyword_tags)]
-    return search_tracks(trackiter, matchers)
+    return search_tracks(trackiter, matchers, index=index)
 
 
 def match_track_from_string(track, search_string,
@@ -0,0 +1,160 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+
+"""
+Compact snapshot of the tracks of a :class:`xl.trax.TrackDB`, which can
+be loaded in a single read at startup instead of unpickling every track
+from the shelf.
+
+The snapshot is a single :mod:`marshal` blob. Tag names and string
+values are stored once in tables, and tag values are stored by tag
+(column) rather than by track, with strings replaced by their position
+in the table.
+"""
+
+import logging
+import marshal
+import os
+
+from xl import common
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['read_snapshot', 'write_snapshot']
+
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(location, stamp, records):
+    """
+        Writes a snapshot of tracks
+
+        :param location: the file to write to
+        :param stamp: identifies the state of the shelf the snapshot
+            matches, see :func:`read_snapshot`
+        :param records: an iterable of (key, attrs, tags) tuples, one
+            for each :class:`xl.trax.trackdb.TrackHolder`
+        :returns: whether the snapshot was written
+    """
+    keys = []
+    attrs = []
+    tagnames = []
+    tagidx = {}
+    strings = []
+    stridx = {}
+    # tag index -> rows and values of strings, lists of strings and
+    # anything else
+    columns = {}
+
+    def string(value):
+        i = stridx.get(value)
+        if i is None:
+            i = stridx[value] = len(strings)
+            strings.append(value)
+        return i
+
+    for row, (key, tattrs, tags) in enumerate(records):
+        keys.append(key)
+        attrs.append(tattrs)
+        for tag, value in tags.iteritems():
+            i = tagidx.get(tag)
+            if i is None:
+                i = tagidx[tag] = len(tagnames)
+                tagnames.append(tag)
+                columns[i] = ([], [], [], [], [], [])
+            column = columns[i]
+            if isinstance(value, unicode):
+                column[0].append(row)
+                column[1].append(string(value))
+            elif isinstance(value, list) and value and \
+                    all(isinstance(v, unicode) for v in value):
+                column[2].append(row)
+                column[3].append(tuple(string(v) for v in value))
+            else:
+                column[4].append(row)
+                column[5].append(value)
+
+    data = (SNAPSHOT_VERSION, stamp, keys, attrs, tagnames, strings,
+            [(tagno,) + col for tagno, col in columns.iteritems()])
+
+    tmp = location + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            marshal.dump(data, f, 2)
+        common.replace_file(tmp, location)
+    except (IOError, OSError, ValueError):
+        # ValueError: a tag value marshal doesn't support
+        logger.exception("Could not write snapshot %s", location)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def read_snapshot(location, stamp):
+    """
+        Reads a snapshot written by :func:`write_snapshot`
+
+        :param location: the file to read from
+        :param stamp: identifies the current state of the shelf
+        :returns: a list of (key, attrs, tags) tuples, or None if there
+            is no usable snapshot for this state of the shelf
+    """
+    try:
+        with open(location, 'rb') as f:
+            data = marshal.loads(f.read())
+    except IOError:
+        return None
+    except (EOFError, ValueError, TypeError):
+        logger.warning("Ignoring unreadable snapshot %s", location)
+        return None
+
+    if not isinstance(data, tuple) or len(data) != 7 or \
+            data[0] != SNAPSHOT_VERSION:
+        logger.info("Ignoring snapshot %s of another version", location)
+        return None
+
+    version, snapstamp, keys, attrs, tagnames, strings, columns = data
+    if snapstamp != stamp:
+        logger.info("Ignoring outdated snapshot %s", location)
+        return None
+
+    tags = [{} for key in keys]
+    for i, srows, svalues, lrows, lvalues, rrows, rvalues in columns:
+        tag = tagnames[i]
+        if isinstance(tag, str):
+            tag = intern(tag)
+        for row, value in zip(srows, svalues):
+            tags[row][tag] = strings[value]
+        for row, value in zip(lrows, lvalues):
+            tags[row][tag] = [strings[v] for v in value]
+        for row, value in zip(rrows, rvalues):
+            tags[row][tag] = value
+
+    return zip(keys, attrs, tags)
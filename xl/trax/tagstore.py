@@ -0,0 +1,193 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+
+"""
+Compact storage for the tags of a :class:`xl.trax.Track`, used instead
+of a dict when the collection/compact_track_storage option is set.
+"""
+
+from copy import deepcopy
+from itertools import izip
+
+__all__ = ['CompactTags', 'POOLED_TAGS']
+
+#: Tags whose values are shared between all tracks having them
+POOLED_TAGS = frozenset(('artist', 'albumartist', 'album', 'genre', 'date',
+                         'composer', 'performer', 'arranger', 'conductor',
+                         'lyricist', 'originaldate', 'label', 'organization',
+                         'version', 'discnumber', 'artistsort',
+                         'albumartistsort', 'albumsort', '__basedir'))
+
+# (type, value) -> the shared value, for POOLED_TAGS
+_pool = {}
+
+
+class _Values(tuple):
+    """
+        A list value, stored as a tuple
+    """
+    __slots__ = ()
+
+
+class _Shape(object):
+    """
+        The tag names of a CompactTags, shared by all the ones having the
+        same tags in the same order
+    """
+    __slots__ = ['keys', 'index', 'added']
+
+    def __init__(self, keys):
+        self.keys = keys
+        # tag -> position in CompactTags._values
+        self.index = {key: i for i, key in enumerate(keys)}
+        # tag -> shape with the tag appended
+        self.added = {}
+
+
+# tag names -> _Shape
+_shapes = {}
+
+
+def _get_shape(keys):
+    shape = _shapes.get(keys)
+    if shape is None:
+        shape = _shapes.setdefault(keys, _Shape(keys))
+    return shape
+
+
+_EMPTY_SHAPE = _get_shape(())
+
+
+def _store(tag, value):
+    """
+        Returns the form a value is stored in
+    """
+    if isinstance(value, list):
+        value = _Values(value)
+    if tag in POOLED_TAGS and isinstance(value, (_Values, basestring)):
+        try:
+            value = _pool.setdefault((type(value), value), value)
+        except TypeError:  # unhashable values
+            pass
+    return value
+
+
+def _load(value):
+    """
+        Returns a stored value in the form Track expects
+    """
+    if type(value) is _Values:
+        return list(value)
+    return value
+
+
+class CompactTags(object):
+    """
+        A mapping of tag names to values, which stores the tag names once
+        for all tracks having the same tags, and list values as tuples
+        which are shared between tracks for :data:`POOLED_TAGS`.
+
+        List values are returned as fresh lists, so callers see the same
+        values as with a dict. A deep copy is a plain dict.
+
+        :param tags: a dict of initial tags
+    """
+    __slots__ = ['_shape', '_values']
+
+    def __init__(self, tags=None):
+        if tags:
+            keys = tuple(tags)
+            self._shape = _get_shape(keys)
+            self._values = [_store(key, tags[key]) for key in keys]
+        else:
+            self._shape = _EMPTY_SHAPE
+            self._values = []
+
+    def __len__(self):
+        return len(self._shape.keys)
+
+    def __contains__(self, tag):
+        return tag in self._shape.index
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __getitem__(self, tag):
+        return _load(self._values[self._shape.index[tag]])
+
+    def get(self, tag, default=None):
+        i = self._shape.index.get(tag)
+        if i is None:
+            return default
+        return _load(self._values[i])
+
+    def __setitem__(self, tag, value):
+        value = _store(tag, value)
+        shape = self._shape
+        i = shape.index.get(tag)
+        if i is not None:
+            self._values[i] = value
+            return
+        added = shape.added.get(tag)
+        if added is None:
+            added = shape.added.setdefault(
+                tag, _get_shape(shape.keys + (tag,)))
+        # append first, so that readers never see the new shape
+        # without its value
+        self._values.append(value)
+        self._shape = added
+
+    def pop(self, tag, *default):
+        shape = self._shape
+        i = shape.index.get(tag)
+        if i is None:
+            if default:
+                return default[0]
+            raise KeyError(tag)
+        value = self._values[i]
+        self._values = self._values[:i] + self._values[i + 1:]
+        self._shape = _get_shape(shape.keys[:i] + shape.keys[i + 1:])
+        return _load(value)
+
+    def keys(self):
+        return list(self._shape.keys)
+
+    def iteritems(self):
+        for key, value in izip(self._shape.keys, self._values):
+            yield key, _load(value)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def __deepcopy__(self, memo):
+        return {key: deepcopy(value, memo)
+                for key, value in self.iteritems()}
+
+    def __repr__(self):
+        return 'CompactTags(%r)' % dict(self.iteritems())
+
+# vim: et sts=4 sw=4
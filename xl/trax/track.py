@@ -26,6 +26,7 @@
 # from your version.
 
 from copy import deepcopy
+from functools import wraps
 from gi.repository import Gio
 from gi.repository import GLib
 import logging
@@ -42,6 +43,7 @@ from xl import (
 )
 from xl.metadata.tags import disk_tags
 from xl.nls import gettext as _
+from xl.trax.tagstore import CompactTags
 from xl.unicode import shave_marks
 
 logger = logging.getLogger(__name__)
@@ -73,6 +75,137 @@ _no_set_raw = {'__basename', '__loc'} | disk_tags
 
 _unset = object()
 
+# Maximum number of derived values (see _derived) kept per track
+_DERIVED_CACHE_SIZE = 16
+
+# Bumped whenever every cached derived value becomes invalid, e.g. when
+# the strip list used for sorting changes
+_derived_generation = 0
+
+# Tags that the derived values of 'albumartist' are computed from
+_ALBUMARTIST_SOURCES = frozenset(('artist', 'albumartist', 'albumartistsort',
+                                  '__compilation'))
+
+
+def _derived(kind):
+    """
+        Decorator caching the result of a Track method deriving a value
+        from a single tag, such as get_tag_sort. The cache is keyed by
+        the tag and the method's arguments, and is cleared for a tag by
+        set_tags.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, tag, *args, **kwargs):
+            cache = self._derived
+            if cache is None or cache[None] != _derived_generation:
+                cache = self._derived = {None: _derived_generation}
+            if kwargs:
+                key = (tag, kind, args, tuple(sorted(kwargs.iteritems())))
+            else:
+                key = (tag, kind, args)
+            try:
+                value = cache[key]
+            except KeyError:
+                value = func(self, tag, *args, **kwargs)
+                if isinstance(value, list):
+                    value = tuple(value)
+                if len(cache) > _DERIVED_CACHE_SIZE:
+                    cache = self._derived = {None: _derived_generation}
+                cache[key] = value
+            if isinstance(value, tuple):
+                return list(value)
+            return value
+        return wrapper
+    return decorator
+
+
+def _derived_tags(changed):
+    """
+        Returns the tags whose derived values depend on the given tags,
+        or None if all of them do.
+    """
+    if '__loc' in changed:
+        return None
+    affected = set(changed)
+    for tag in changed:
+        if tag.endswith('sort'):
+            affected.add(tag[:-4])
+        if tag in _ALBUMARTIST_SOURCES:
+            affected.add('albumartist')
+    return affected
+
+
+def get_modified_time(fileinfo):
+    """
+        Returns the modification time of a file as stored in '__modified'
+
+        :param fileinfo: a :class:`Gio.FileInfo` with the time::modified
+            attribute
+    """
+    mtime = fileinfo.get_modification_time()
+    return mtime.tv_sec + (mtime.tv_usec / 100000.0)
+
+
+def _get_modified(gloc):
+    return get_modified_time(gloc.query_info("time::modified", Gio.FileQueryInfoFlags.NONE, None))
+
+
+def _read_format_tags(f, gloc, mtime):
+    """
+        Reads all tags from a Format object, along with the tags
+        Exaile derives from the file itself.
+
+        :returns: a tuple of the tags, and the names of the tags the
+            format supports or None if it supports any tag
+    """
+    ntags = f.read_all()
+    ntags['__modified'] = mtime
+
+    # TODO: this probably breaks on non-local files
+    ntags['__basedir'] = gloc.get_parent().get_path()
+
+    if f.others:
+        return ntags, None
+    return ntags, frozenset(f.tag_mapping.keys())
+
+
+def read_file_tags(loc, modified=0, mtime=None):
+    """
+        Reads the tags of the file at loc without a Track, like
+        :meth:`Track.read_tags` does. Only plain values go in and out,
+        so this can be run in another process; the result is handed
+        to :meth:`Track.set_scanned_tags`.
+
+        :param loc: the location of the file, as a URI
+        :param modified: the '__modified' value of the tags already
+            known for the file; it is only read if it is newer
+        :param mtime: the modification time of the file, if already
+            known (see :func:`get_modified_time`)
+        :returns: None if the file hasn't been modified, False if it
+            could not be read, and otherwise a tuple of the tags read
+            and the names of the tags the format supports (None if it
+            supports any tag)
+    """
+    try:
+        # check the modification time first, so that unchanged files
+        # aren't opened at all
+        gloc = Gio.File.new_for_uri(loc)
+        if mtime is None:
+            mtime = _get_modified(gloc)
+        if modified >= mtime:
+            return None
+
+        f = metadata.get_format(loc)
+        if f is None:
+            return False  # not a supported type
+
+        return _read_format_tags(f, gloc, mtime)
+    except Exception:
+        logger.exception("Error reading tags for %s", loc)
+        return False
+
+
 class _MetadataCacher(object):
     """
         Cache metadata Format objects to speed up get_tag_disk
@@ -138,12 +271,18 @@ class Track(object):
     """
     # save a little memory this way
     __slots__ = ["__tags", "_scan_valid",
-                 "_dirty", "__weakref__", "_init"]
+                 "_dirty", "__weakref__", "_init", "_derived"]
     # this is used to enforce the one-track-per-uri rule
     __tracksdict = weakref.WeakValueDictionary()
+    # told about every tag change, see _watch_tags
+    __tag_watchers = weakref.WeakSet()
     # store a copy of the settings values here - much faster (0.25 cpu
     # seconds) (see _the_cuts_cb)
     __the_cuts = settings.get_option('collection/strip_list', [])
+    # whether tags are kept in a CompactTags rather than a dict, only
+    # read at startup
+    __compact_storage = settings.get_option(
+        'collection/compact_track_storage', False)
 
     def __new__(cls, *args, **kwargs):
         """
@@ -227,8 +366,9 @@ class Track(object):
         if self._init is False:
             return
 
-        self.__tags = {}
+        self.__tags = self.__new_tags({})
         self._scan_valid = None  # whether our last tag read attempt worked
+        self._derived = None  # cached derived values, see _derived
 
         # This is not used by write_tags, this is used by the collection to
         # indicate that the tags haven't been written to the collection
@@ -272,6 +412,7 @@ class Track(object):
         gloc = Gio.File.new_for_commandline_arg(loc)
         self.__tags['__loc'] = gloc.get_uri()
         self.__register()
+        self._derived = None
         if notify_changed:
             event.log_event('track_tags_changed', self, {'__loc'})
 
@@ -378,56 +519,66 @@ class Track(object):
             :param force: If not True, then only read the tags if the file has
                           be modified.
 
-            Returns False if unsuccessful, and a Format object from
-            `xl.metadata` otherwise.
+            Returns False if unsuccessful, True if the file wasn't
+            read because it hasn't been modified, and a Format object
+            from `xl.metadata` otherwise.
         """
         loc = self.get_loc_for_io()
         try:
+            # check the modification time first, so that unchanged files
+            # aren't opened at all
+            gloc = Gio.File.new_for_uri(loc)
+            mtime = _get_modified(gloc)
+
+            if not force and self.__tags.get('__modified', 0) >= mtime:
+                return True
+
             f = metadata.get_format(loc)
             if f is None:
                 self._scan_valid = False
                 return False  # not a supported type
-            
-            # Retrieve file specific metadata
-            gloc = Gio.File.new_for_uri(loc)
-            mtime = gloc.query_info("time::modified", Gio.FileQueryInfoFlags.NONE, None).get_modification_time()
-            mtime = mtime.tv_sec + (mtime.tv_usec / 100000.0)
-            
-            if not force and self.__tags.get('__modified', 0) >= mtime:
-                return f
-            
+
             # Read the tags
-            ntags = f.read_all()
-            ntags['__modified'] = mtime
-            
-            # TODO: this probably breaks on non-local files
-            ntags['__basedir'] = gloc.get_parent().get_path()
+            ntags, supported = _read_format_tags(f, gloc, mtime)
+            self.set_scanned_tags(ntags, supported,
+                                  notify_changed=notify_changed)
+            return f
+        except Exception:
+            self._scan_valid = False
+            logger.exception("Error reading tags for %s", loc)
+            return False
 
-            # remove tags that could be in the file, but are in fact not
-            # in the file. Retain tags in the DB that aren't supported by
-            # the file format.
+    def set_scanned_tags(self, ntags, supported=None, notify_changed=True):
+        """
+            Replaces the tags of this Track with tags read from its file,
+            e.g. by :func:`read_file_tags`.
 
-            nkeys = set(ntags.keys())
-            ekeys = {k for k in self.__tags.keys() if not k.startswith('__')}
+            :param ntags: the tags read from the file
+            :param supported: the names of the tags the file format
+                supports, or None if it supports any tag
+        """
+        ntags = dict(ntags)
 
-            # delete anything that wasn't in the new tags
-            to_del = ekeys - nkeys
+        # remove tags that could be in the file, but are in fact not
+        # in the file. Retain tags in the DB that aren't supported by
+        # the file format.
 
-            # but if not others set, only delete supported tags
-            if not f.others:
-                to_del &= set(f.tag_mapping.keys())
+        nkeys = set(ntags.keys())
+        ekeys = {k for k in self.__tags.keys() if not k.startswith('__')}
 
-            for tag in to_del:
-                ntags[tag] = None
+        # delete anything that wasn't in the new tags
+        to_del = ekeys - nkeys
 
-            self.set_tags(notify_changed=notify_changed, **ntags)
+        # but if not others set, only delete supported tags
+        if supported is not None:
+            to_del &= supported
 
-            self._scan_valid = True
-            return f
-        except Exception:
-            self._scan_valid = False
-            logger.exception("Error reading tags for %s", loc)
-            return False
+        for tag in to_del:
+            ntags[tag] = None
+
+        self.set_tags(notify_changed=notify_changed, **ntags)
+
+        self._scan_valid = True
 
     def is_local(self):
         """
@@ -470,7 +621,12 @@ class Track(object):
 
             internal use only please
         """
-        self.__tags = deepcopy(pickle_obj)
+        if self.__compact_storage:
+            # CompactTags copies the values it stores
+            self.__tags = CompactTags(pickle_obj)
+        else:
+            self.__tags = deepcopy(pickle_obj)
+        self._derived = None
 
     def list_tags(self):
         """
@@ -554,9 +710,29 @@ class Track(object):
 
         if changed:
             self._dirty = True
+            self.__forget_derived(changed)
+            if self.__tag_watchers:
+                for watcher in list(self.__tag_watchers):
+                    watcher._on_track_tags_set(self, changed)
             if notify_changed:
                 event.log_event("track_tags_changed", self, changed)
 
+    def __forget_derived(self, changed):
+        """
+            Drops the cached derived values of the changed tags
+        """
+        cache = self._derived
+        if cache is None:
+            return
+        affected = _derived_tags(changed)
+        if affected is None:
+            self._derived = None
+            return
+        # replace rather than modify the cache, so that a value computed
+        # from the old tags on another thread can't end up in it
+        self._derived = {key: value for key, value in cache.iteritems()
+                         if key is None or key[0] not in affected}
+
     def get_tag_raw(self, tag, join=False):
         """
             Get the raw value of a tag.  For non-internal tags, the
@@ -580,6 +756,7 @@ class Track(object):
 
         return value
 
+    @_derived('sort')
     def get_tag_sort(self, tag, join=True, artist_compilations=False,
                      extend_title=True):
         """
@@ -649,6 +826,7 @@ class Track(object):
 
         return value
 
+    @_derived('display')
     def get_tag_display(self, tag, join=True, artist_compilations=False,
                         extend_title=True):
         """
@@ -711,6 +889,7 @@ class Track(object):
 
         return value
 
+    @_derived('search')
     def get_tag_search(self, tag, format=True, artist_compilations=False,
                        extend_title=True):
         """
@@ -1014,8 +1193,10 @@ class Track(object):
 
             update the cached the_cutter values
         """
+        global _derived_generation
         if data == "collection/strip_list":
             cls._Track__the_cuts = settings.get_option('collection/strip_list', [])
+            _derived_generation += 1
 
     ### Utility method intended for TrackDB ###
 
@@ -1024,4 +1205,50 @@ class Track(object):
         '''Internal API, returns number of track objects we have'''
         return len(cls._Track__tracksdict)
 
+    @classmethod
+    def __new_tags(cls, tags):
+        '''
+            Returns the storage for the given tags, taking ownership of
+            them
+        '''
+        if cls.__compact_storage:
+            return CompactTags(tags)
+        return tags
+
+    @classmethod
+    def _restore(cls, tags):
+        '''
+            Internal API, like Track(_unpickles=tags) but takes ownership
+            of tags rather than copying them, and trusts their '__loc'
+            to be a normalized URI already.
+        '''
+        if tags['__loc'] in cls._Track__tracksdict:
+            return cls(_unpickles=tags)
+        tr = object.__new__(cls)
+        tr._init = True
+        tr.__tags = cls.__new_tags(tags)
+        tr._scan_valid = None
+        tr._derived = None
+        tr._dirty = False
+        tr.__register()
+        return tr
+
+    @classmethod
+    def _lookup(cls, uri):
+        '''
+            Internal API, returns the existing Track whose location is
+            uri, or None. Unlike Track(uri) this doesn't normalize uri,
+            so it only finds tracks by a URI they were saved with.
+        '''
+        return cls._Track__tracksdict.get(uri)
+
+    @classmethod
+    def _watch_tags(cls, watcher):
+        '''
+            Internal API, calls watcher._on_track_tags_set(track, tags)
+            whenever set_tags changes a track, even if notify_changed is
+            False. Only a weak reference to watcher is kept.
+        '''
+        cls._Track__tag_watchers.add(watcher)
+
 event.add_callback(Track._the_cuts_cb, 'collection_option_set')
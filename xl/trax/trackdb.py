@@ -27,12 +27,16 @@
 from __future__ import absolute_import
 
 import logging
+import os
 
 from copy import deepcopy
 
 from xl import common, event
 from xl.nls import gettext as _
 
+from xl.trax import journal
+from xl.trax import snapshot
+from xl.trax.index import TagIndex
 from xl.trax.track import Track
 from xl.trax.util import sort_tracks
 from xl.trax.search import search_tracks_from_string
@@ -107,10 +111,22 @@ class TrackDB(object):
         self._dbversion = 2.0
         self._dbminorversion = 0
         self._deleted_keys = []
+        self._index = TagIndex()
+        # holders of the tracks changed since the last save
+        self._dirty_tracks = set()
+        self._journal = None
+        self._replaying = False
+        # bumped on every save, see _shelf_stamp
+        self._save_serial = 0
+        self._snapshot_stamp = None
+        Track._watch_tags(self)
         if location:
+            self._journal = journal.TrackDBJournal(location + '.journal')
             self.load_from_location()
             self._timeout_save()
 
+        event.add_callback(self._on_track_tags_changed, 'track_tags_changed')
+
     def __iter__(self):
         """
             Provide the ability to iterate over a TrackDB.
@@ -128,10 +144,42 @@ class TrackDB(object):
         """
         return len(self.tracks)
 
+    def get_index(self):
+        """
+            Gets the search index covering the tracks in this
+            :class:`TrackDB`
+
+            :rtype: :class:`xl.trax.index.TagIndex`
+        """
+        return self._index
+
+    def _on_track_tags_changed(self, type, track, tags):
+        """
+            Keeps the search index current
+        """
+        holder = self.tracks.get(track.get_loc_for_io())
+        if holder is not None and holder._track is track:
+            self._index.update_track(track, tags)
+
+    @common.synchronized
+    def _on_track_tags_set(self, track, tags):
+        """
+            Records tag changes of tracks in this TrackDB, see
+            Track._watch_tags
+        """
+        holder = self.tracks.get(track.get_loc_for_io())
+        if holder is None or holder._track is not track:
+            return
+        self._dirty_tracks.add(holder)
+        if self._journal is not None and not self._replaying:
+            self._journal.set_tags(holder._key, {tag: track.get_tag_raw(tag)
+                                                 for tag in tags})
+
     @common.glib_wait_seconds(300)
     def _timeout_save(self):
         """
-            Callback for auto-saving.
+            Callback for auto-saving. This also compacts the journal
+            into the shelf.
         """
         self.save_to_location()
         return True
@@ -162,6 +210,10 @@ class TrackDB(object):
             :param location: the location to save to
         """
         self.location = location
+        if location:
+            self._journal = journal.TrackDBJournal(location + '.journal')
+        else:
+            self._journal = None
         self._dirty = True
 
     @common.synchronized
@@ -180,6 +232,7 @@ class TrackDB(object):
                 _("You did not specify a location to load the db from"))
 
         logger.debug("Loading %s DB from %s.", self.name, location)
+        start = time()
 
         pdata = common.open_shelf(location)
 
@@ -195,9 +248,22 @@ class TrackDB(object):
                 dbmig.handle_migration(self, pdata, pdata['_dbversion'],
                                        self._dbversion)
 
+        serial = pdata.get('_save_serial', 0)
+        stamp = self._shelf_stamp(location, serial)
+        records = None
+        if location == self.location and stamp is not None:
+            records = snapshot.read_snapshot(location + '.snapshot', stamp)
+
         for attr in self.pickle_attrs:
             try:
-                if 'tracks' == attr:
+                if 'tracks' == attr and records is not None:
+                    data = {}
+                    for key, attrs, tags in records:
+                        tr = Track._restore(tags)
+                        data[tr.get_loc_for_io()] = TrackHolder(tr, key,
+                                                                **attrs)
+                    setattr(self, attr, data)
+                elif 'tracks' == attr:
                     data = {}
                     for k in (x for x in pdata.keys()
                               if x.startswith("tracks-")):
@@ -221,24 +287,120 @@ class TrackDB(object):
 
         pdata.close()
 
+        self._save_serial = serial
+        if records is not None:
+            self._snapshot_stamp = stamp
+
+        logger.debug("Loaded %d tracks from the %s in %.3f seconds",
+                     len(self.tracks),
+                     "snapshot" if records is not None else "shelf",
+                     time() - start)
+
+        replayed = 0
+        if location == self.location and self._journal is not None:
+            replayed = self.__replay_journal()
+
+        self._index.clear()
+        self._index.add_tracks(h._track for h in self.tracks.itervalues())
+
         self._dirty = False
 
+        if replayed:
+            # Exaile didn't get to save these changes last time
+            logger.info("Recovered %d changes from the journal", replayed)
+            self._dirty = True
+            self.save_to_location()
+
+        if location == self.location:
+            # make the next start fast
+            self.__write_snapshot()
+
+    def _shelf_stamp(self, location, serial):
+        """
+            Identifies the state of the shelf at location, so that a
+            snapshot is only used with the shelf it was written from.
+            The file's size and mtime catch writes by older versions,
+            which don't bump the serial.
+        """
+        try:
+            st = os.stat(location)
+        except OSError:
+            return None
+        return (serial, st.st_size, st.st_mtime)
+
+    def __write_snapshot(self):
+        """
+            Writes a snapshot of the tracks matching the shelf, unless
+            the current one already does
+        """
+        stamp = self._shelf_stamp(self.location, self._save_serial)
+        if stamp is None or stamp == self._snapshot_stamp:
+            return
+        start = time()
+        records = ((h._key, h._attrs, h._track._pickles())
+                   for h in self.tracks.itervalues())
+        if snapshot.write_snapshot(self.location + '.snapshot', stamp,
+                                   records):
+            self._snapshot_stamp = stamp
+            logger.debug("Wrote snapshot of %d tracks in %.3f seconds",
+                         len(self.tracks), time() - start)
+
+    def __replay_journal(self):
+        """
+            Applies the changes recorded in the journal since the last
+            save to the loaded tracks.
+
+            :returns: the number of records applied
+        """
+        holders = {h._key: h for h in self.tracks.itervalues()}
+        count = 0
+        self._replaying = True
+        try:
+            for record in self._journal.read():
+                count += 1
+                kind, key = record[0], record[1]
+                if kind == journal.ADD:
+                    tr = Track(_unpickles=record[2])
+                    loc = tr.get_loc_for_io()
+                    if loc in self.tracks:
+                        continue
+                    holder = TrackHolder(tr, key, **record[3])
+                    self.tracks[loc] = holders[key] = holder
+                    self._key = max(self._key, key + 1)
+                    self._dirty_tracks.add(holder)
+                elif kind == journal.TAGS:
+                    holder = holders.get(key)
+                    if holder is not None:
+                        holder._track.set_tags(notify_changed=False,
+                                               **record[2])
+                elif kind == journal.REMOVE:
+                    holder = holders.pop(key, None)
+                    if holder is not None:
+                        del self.tracks[holder._track.get_loc_for_io()]
+                        self._dirty_tracks.discard(holder)
+                        self._deleted_keys.append(key)
+        except Exception:
+            logger.exception("Exception occurred while replaying %s",
+                             self._journal.location)
+        finally:
+            self._replaying = False
+        return count
+
     @common.synchronized
-    def save_to_location(self, location=None):
+    def save_to_location(self, location=None, write_snapshot=False):
         """
             Saves a pickled representation of this :class:`TrackDB` to the
             specified location.
 
             :param location: the location to save the data to
             :type location: string
+            :param write_snapshot: whether to also write the snapshot
+                loaded at startup. This writes every track, so it is
+                meant for when Exaile quits rather than periodic saves.
         """
-        if not self._dirty:
-            for track in self.tracks.itervalues():
-                if track._track._dirty:
-                    self._dirty = True
-                    break
-
-        if not self._dirty:
+        if not self._dirty and not self._dirty_tracks:
+            if write_snapshot and not location:
+                self.__write_snapshot()
             return
 
         if not location:
@@ -259,23 +421,38 @@ class TrackDB(object):
                 raise common.VersionError("DB was created on a newer Exaile.")
         except Exception:
             logger.exception("Failed to open music DB for writing.")
+            self._saving = False
             return
 
+        # the shelf at our own location already has every track that
+        # isn't in the journal, so only the changed ones are written
+        own_journal = None
+        if location == self.location and '_dbversion' in pdata:
+            own_journal = self._journal
+        if own_journal is not None:
+            own_journal.rotate()
+            holders = self._dirty_tracks
+        else:
+            holders = self.tracks.values()
+        self._dirty_tracks = set()
+
         for attr in self.pickle_attrs:
             # bad hack to allow saving of lists/dicts of Tracks
             if 'tracks' == attr:
-                for k, track in self.tracks.iteritems():
+                for track in holders:
                     key = "tracks-%s" % track._key
-                    if track._track._dirty or key not in pdata:
-                        pdata[key] = (
-                            track._track._pickles(),
-                            track._key,
-                            deepcopy(track._attrs)
-                        )
+                    pdata[key] = (
+                        track._track._pickles(),
+                        track._key,
+                        deepcopy(track._attrs)
+                    )
+                    track._track._dirty = False
             else:
                 pdata[attr] = deepcopy(getattr(self, attr))
 
         pdata['_dbversion'] = self._dbversion
+        serial = pdata.get('_save_serial', 0) + 1
+        pdata['_save_serial'] = serial
 
         for key in self._deleted_keys:
             key = "tracks-%s" % key
@@ -285,12 +462,22 @@ class TrackDB(object):
         pdata.sync()
         pdata.close()
 
-        for track in self.tracks.itervalues():
-            track._track._dirty = False
+        if location == self.location:
+            self._deleted_keys = []
+            self._save_serial = serial
+            if self._journal is not None:
+                if own_journal is None:
+                    # the whole DB was written, older records are moot
+                    self._journal.clear()
+                else:
+                    self._journal.commit()
 
         self._dirty = False
         self._saving = False
 
+        if write_snapshot and location == self.location:
+            self.__write_snapshot()
+
     def get_track_by_loc(self, loc, raw=False):
         """
             returns the track having the given loc. if no such track exists,
@@ -336,6 +523,7 @@ class TrackDB(object):
             Like add(), but takes a list of :class:`xl.trax.Track`
         """
         locations = []
+        added = []
         now = time()
         for tr in tracks:
             if not tr.get_tag_raw('__date_added'):
@@ -345,9 +533,16 @@ class TrackDB(object):
             if location in self.tracks:
                 continue
             locations += [location]
-            self.tracks[location] = TrackHolder(tr, self._key)
+            added.append(tr)
+            holder = TrackHolder(tr, self._key)
+            self.tracks[location] = holder
+            self._dirty_tracks.add(holder)
+            if self._journal is not None:
+                self._journal.add(holder._key, tr._pickles(), {})
             self._key += 1
 
+        self._index.add_tracks(added)
+
         if locations:
             event.log_event('tracks_added', self, locations)
             self._dirty = True
@@ -366,12 +561,19 @@ class TrackDB(object):
             Like remove(), but takes a list of :class:`xl.trax.Track`
         """
         locations = []
+        removed = []
 
         for tr in tracks:
             location = tr.get_loc_for_io()
             locations += [location]
-            self._deleted_keys.append(self.tracks[location]._key)
-            del self.tracks[location]
+            removed.append(tr)
+            holder = self.tracks.pop(location)
+            self._deleted_keys.append(holder._key)
+            self._dirty_tracks.discard(holder)
+            if self._journal is not None:
+                self._journal.remove(holder._key)
+
+        self._index.remove_tracks(removed)
 
         event.log_event('tracks_removed', self, locations)
 
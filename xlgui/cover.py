@@ -198,8 +198,8 @@ class CoverManager(GObject.GObject):
 
         outstanding = []
         # Speed up the following loop
-        get_cover = COVER_MANAGER.get_cover
-        pixbuf_from_data = icons.MANAGER.pixbuf_from_data
+        get_db_string = COVER_MANAGER.get_db_string
+        pixbuf_from_cover = icons.MANAGER.pixbuf_from_cover
         default_cover_pixbuf = self.default_cover_pixbuf
         cover_size = self.cover_size
 
@@ -209,13 +209,13 @@ class CoverManager(GObject.GObject):
             if self.stopper.is_set():
                 return
 
-            cover_data = get_cover(self.album_tracks[album][0], set_only=True)
-            cover_pixbuf = pixbuf_from_data(cover_data) if cover_data else None
+            db_string = get_db_string(self.album_tracks[album][0])
+            thumbnail_pixbuf = None
+            if db_string:
+                thumbnail_pixbuf = pixbuf_from_cover(db_string, cover_size,
+                                                     keep_ratio=False)
 
-            try:
-                thumbnail_pixbuf = cover_pixbuf.scale_simple(*cover_size,
-                                                             interp_type=GdkPixbuf.InterpType.BILINEAR)
-            except AttributeError:  # cover_pixbuf is None
+            if thumbnail_pixbuf is None:
                 thumbnail_pixbuf = default_cover_pixbuf
                 outstanding.append(album)
 
@@ -235,16 +235,17 @@ class CoverManager(GObject.GObject):
         self.emit('fetch-started', len(self.outstanding))
 
         # Speed up the following loop
-        get_cover = COVER_MANAGER.get_cover
         save = COVER_MANAGER.save
         pixbuf_from_data = icons.MANAGER.pixbuf_from_data
 
-        for i, album in enumerate(self.outstanding[:]):
-            if self.stopper.is_set():
-                # Allow for "fetch-completed" signal to be emitted
-                break
+        albums = self.outstanding[:]
+        tracks = [self.album_tracks[album][0] for album in albums]
+        # stops by itself when the stopper is set, allowing for the
+        # "fetch-completed" signal to be emitted
+        results = COVER_MANAGER.fetch_covers(tracks, self.stopper)
 
-            cover_data = get_cover(self.album_tracks[album][0], save_cover=True)
+        for i, (index, cover_data) in enumerate(results):
+            album = albums[index]
             cover_pixbuf = pixbuf_from_data(cover_data) if cover_data else None
 
             self.emit('fetch-progress', i + 1)
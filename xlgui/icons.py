@@ -39,6 +39,7 @@ import os
 
 from xl import (
     common,
+    covers,
     settings,
 )
 
@@ -664,6 +665,48 @@ class IconManager(object):
 
         return pixbuf
 
+    def pixbuf_from_cover(self, db_string, size, keep_ratio=True):
+        """
+            Generates a pixbuf of a cover scaled to the given size,
+            keeping the scaled copy of cached covers on disk so that
+            the full image doesn't have to be decoded the next time
+
+            :param db_string: The db_string identifying the cover, see
+                :meth:`xl.covers.CoverManager.get_db_string`
+            :type db_string: string
+            :param size: Size to scale to
+            :type size: tuple of int
+            :param keep_ratio: Whether to keep the original
+                image ratio, else the image fills the size
+            :type keep_ratio: bool
+
+            :returns: the generated pixbuf
+            :rtype: :class:`GdkPixbuf.Pixbuf` or None
+        """
+        path = covers.MANAGER.get_thumbnail_path(db_string, size, keep_ratio)
+        if path is not None and os.path.exists(path):
+            try:
+                return GdkPixbuf.Pixbuf.new_from_file(path)
+            except GLib.GError:
+                pass
+
+        data = covers.MANAGER.get_cover_data(db_string)
+        if keep_ratio:
+            pixbuf = self.pixbuf_from_data(data, size)
+        else:
+            pixbuf = self.pixbuf_from_data(data, size, keep_ratio=False,
+                                           upscale=True)
+
+        if pixbuf is not None and path is not None:
+            try:
+                pixbuf.savev(path, 'png', [], [])
+            except GLib.GError as e:
+                logger.warning('Failed to save cover thumbnail: {error}'.format(
+                    error=e.message
+                ))
+
+        return pixbuf
+
     @common.cached(limit=settings.get_option('rating/maximum', 5) * 3)
     def pixbuf_from_rating(self, rating, size_ratio=1):
         """
@@ -153,6 +153,269 @@ DEFAULT_ORDERS = [
 ]
 
 
+class CollectionNode(object):
+    """
+        A row of the collection tree, along with the tracks below it.
+
+        The child rows are grouped from the tracks the first time they
+        are needed, so expanding a row costs as much as the number of
+        tracks below it rather than the size of the collection.
+    """
+    __slots__ = ['parent', 'depth', 'display', 'match_query', 'sort_key',
+                 'tracks', 'keys', 'expand', 'children', 'by_key']
+
+    def __init__(self, parent, depth, display, match_query, sort_key,
+                 tracks):
+        self.parent = parent
+        self.depth = depth
+        self.display = display
+        self.match_query = match_query
+        # sort values of the tracks in this row, at depth
+        self.sort_key = sort_key
+        # SearchResultTracks below this row
+        self.tracks = tracks
+        # SearchResultTrack -> the key tracks are ordered by, if they
+        # are sorted by the tags of the next level; otherwise tracks
+        # are in the order of the parent
+        self.keys = None
+        # whether a keyword matched a tag further down the tree
+        self.expand = False
+        # child rows and (match_query, display) -> child, or None if
+        # they haven't been grouped yet
+        self.children = None
+        self.by_key = None
+
+
+class CollectionGroups(object):
+    """
+        Groups the tracks shown in a collection panel by the levels
+        of an :class:`Order`.
+
+        The tracks of every row are kept sorted by a key remembered
+        when they were added, so that a track whose tags changed can
+        be found again with a bisection.
+
+        :param order: the :class:`Order` to group by
+        :param srtracks: the SearchResultTracks to show, preferably
+            sorted by the tags of the first level
+        :param matcher: the keyword :class:`xl.trax.TracksMatcher` the
+            tracks were filtered with, or None
+    """
+
+    def __init__(self, order, srtracks, matcher=None):
+        self.order = order
+        self.matcher = matcher
+        # numbers tracks in the order they were added, to tell apart
+        # tracks with the same sort values
+        self.__serial = itertools.count()
+        self.__serials = {srtr: next(self.__serial) for srtr in srtracks}
+        self.root = CollectionNode(None, -1, None, '', None, srtracks)
+        self.__sort(self.root)
+        self.__srtracks = {srtr.track: srtr for srtr in srtracks}
+        # track -> rows below the root containing it
+        self.__nodes = {}
+
+    def __len__(self):
+        return len(self.__srtracks)
+
+    def sort_key(self, level, track):
+        return [track.get_tag_sort(tag)
+                for tag in self.order.get_sort_tags(level)]
+
+    def __sort(self, node):
+        """
+            Sorts the tracks of node by the tags of the next level
+        """
+        level = node.depth + 1
+        serials = self.__serials
+        node.keys = {srtr: (self.sort_key(level, srtr.track), serials[srtr])
+                     for srtr in node.tracks}
+        node.tracks.sort(key=node.keys.__getitem__)
+
+    def get_children(self, node):
+        """
+            Returns the child rows of a node, grouping them if needed
+        """
+        if node.children is None:
+            level = node.depth + 1
+            node.children = []
+            node.by_key = {}
+            if level < len(self.order):
+                if node.keys is None:
+                    self.__sort(node)
+                self.__group(node, level)
+        return node.children
+
+    def get_tracks(self, node):
+        """
+            Returns the tracks below a node
+        """
+        return [srtr.track for srtr in node.tracks]
+
+    def __group(self, node, level):
+        bottom = level == len(self.order) - 1
+        deeper = self.__deeper_tags(level)
+        last_sortval = None
+        child = None
+        for srtr in node.tracks:
+            # tracks sharing sort values always end up in the same row,
+            # so only work out the row when the sort values change
+            sortval = node.keys[srtr][0]
+            if bottom or child is None or sortval != last_sortval:
+                child = self.__child_for(node, level, srtr.track, sortval,
+                                         bottom)
+                last_sortval = sortval
+            self.__add_to_child(child, srtr, deeper)
+
+    def __deeper_tags(self, level):
+        deeper = set()
+        for i in range(level + 1, len(self.order)):
+            deeper.update(self.order.get_sort_tags(i))
+        return deeper
+
+    def __child_for(self, node, level, track, sortval, bottom,
+                    position=None):
+        """
+            Returns the child row of node that track belongs in,
+            creating it if needed.
+        """
+        tags = self.order.get_sort_tags(level)
+        match_query = " ".join([
+            track.get_tag_search(tag, format=True) for tag in tags])
+        if bottom:
+            match_query += " " + track.get_tag_search("__loc", format=True)
+        display = self.order.format_track(level, track)
+
+        key = (match_query, display)
+        child = node.by_key.get(key)
+        if child is None:
+            child = CollectionNode(node, level, display, match_query,
+                                   sortval, [])
+            node.by_key[key] = child
+            if position is None:
+                node.children.append(child)
+            else:
+                node.children.insert(position, child)
+        return child
+
+    def __add_to_child(self, child, srtr, deeper):
+        child.tracks.append(srtr)
+        self.__nodes.setdefault(srtr.track, []).append(child)
+        if not child.expand:
+            for tag in srtr.on_tags:
+                if tag in deeper:
+                    child.expand = True
+                    break
+
+    def update_track(self, track):
+        """
+            Moves a track whose tags changed to where it now belongs,
+            or adds it if it isn't shown yet. Rows that haven't been
+            grouped yet are left alone.
+        """
+        self.remove_track(track)
+        srtr = trax.SearchResultTrack(track)
+        if self.matcher is not None and not self.matcher.match(srtr):
+            return
+        self.__srtracks[track] = srtr
+        self.__serials[srtr] = next(self.__serial)
+        self.__insert(self.root, srtr)
+
+    def remove_track(self, track):
+        """
+            Removes a track from every row it is shown in
+        """
+        srtr = self.__srtracks.pop(track, None)
+        if srtr is None:
+            return
+        nodes = [self.root] + self.__nodes.pop(track, [])
+        for node in nodes:
+            keys = node.keys if node.keys is not None else node.parent.keys
+            self.__remove(node.tracks, srtr, keys[srtr], keys.__getitem__)
+            if not node.tracks and node.parent is not None:
+                # rows without tracks are dropped along with their children
+                parent = node.parent
+                self.__remove(parent.children, node, node.sort_key,
+                              lambda child: child.sort_key)
+                del parent.by_key[(node.match_query, node.display)]
+        # the keys are only dropped now, as rows that aren't sorted
+        # yet are found by the keys of their parent
+        for node in nodes:
+            if node.keys is not None:
+                del node.keys[srtr]
+        del self.__serials[srtr]
+
+    def __remove(self, items, item, key, keyfunc):
+        """
+            Removes item, found by its key, from items sorted by keyfunc
+        """
+        index = self.__bisect_left(items, key, keyfunc)
+        while index < len(items) and keyfunc(items[index]) == key:
+            if items[index] is item:
+                del items[index]
+                return
+            index += 1
+        # not where it should be, e.g. if a row was grouped while the
+        # tags of its tracks were changing
+        items.remove(item)
+
+    @staticmethod
+    def __bisect_left(items, key, keyfunc):
+        """
+            Like bisect.bisect_left, with keys computed on demand
+        """
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keyfunc(items[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def __bisect(items, key, keyfunc):
+        """
+            Like bisect.bisect_right, with keys computed on demand
+        """
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key < keyfunc(items[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def __insert(self, node, srtr):
+        level = node.depth + 1
+        if node.keys is not None:
+            key = (self.sort_key(level, srtr.track), self.__serials[srtr])
+            node.keys[srtr] = key
+            keys = node.keys
+        else:
+            # in the order of the parent, which was given a key for
+            # srtr just before
+            key = node.parent.keys[srtr]
+            keys = node.parent.keys
+        position = self.__bisect(node.tracks, key, keys.__getitem__)
+        node.tracks.insert(position, srtr)
+
+        if node.children is None or level >= len(self.order):
+            return
+
+        bottom = level == len(self.order) - 1
+        sortval = node.keys[srtr][0]
+        position = self.__bisect(node.children, sortval,
+                                 lambda child: child.sort_key)
+        child = self.__child_for(node, level, srtr.track, sortval, bottom,
+                                 position)
+        self.__add_to_child(child, srtr, self.__deeper_tags(level))
+        # __add_to_child appended the track, put it where it belongs
+        child.tracks.pop()
+        self.__insert(child, srtr)
+
+
 class CollectionPanel(panel.Panel):
     """
         The collection panel
@@ -197,6 +460,11 @@ class CollectionPanel(panel.Panel):
         self.order = None
         self.tracks = []
         self.sorted_tracks = []
+        self.groups = None
+        # tracks whose tags changed since the tree was last drawn, or
+        # None if the whole tree needs to be searched again
+        self._changed_tracks = set()
+        self._resort_needed = False
 
         event.add_ui_callback(self._check_collection_empty, 'libraries_modified',
                               collection)
@@ -252,11 +520,12 @@ class CollectionPanel(panel.Panel):
             'on_add_music_button_clicked': self.on_add_music_button_clicked
         })
         self.tree.connect('key-release-event', self.on_key_released)
-        event.add_ui_callback(self.refresh_tags_in_tree, 'track_tags_changed')
-        event.add_ui_callback(self.refresh_tracks_in_tree,
-                              'tracks_added', self.collection)
-        event.add_ui_callback(self.refresh_tracks_in_tree,
-                              'tracks_removed', self.collection)
+        event.add_ui_batch_callback(self.refresh_tags_in_tree,
+                                    'track_tags_changed')
+        event.add_ui_batch_callback(self.refresh_tracks_in_tree,
+                                    'tracks_added', self.collection)
+        event.add_ui_batch_callback(self.refresh_tracks_in_tree,
+                                    'tracks_removed', self.collection)
 
     def on_refresh_button_press_event(self, button, event):
         """
@@ -395,7 +664,8 @@ class CollectionPanel(panel.Panel):
         self.tree.set_row_separator_func(
             (lambda m, i, d: m.get_value(i, 1) is None), None)
 
-        self.model = Gtk.TreeStore(GdkPixbuf.Pixbuf, str, object)
+        # icon, display, match query, CollectionNode
+        self.model = Gtk.TreeStore(GdkPixbuf.Pixbuf, str, object, object)
 
         self.tree.connect("row-expanded", self.on_expanded)
 
@@ -403,11 +673,10 @@ class CollectionPanel(panel.Panel):
         """
             finds tracks matching a given iter.
         """
-        self.load_subtree(iter)
-        search = self.get_node_search_terms(iter)
-        matcher = trax.TracksMatcher(search)
-        srtrs = trax.search_tracks(self.tracks, [matcher])
-        return [x.track for x in srtrs]
+        node = self.model.get_value(iter, 3)
+        if node is None:
+            return []
+        return self.groups.get_tracks(node)
 
     def append_to_playlist(self, item=None, event=None, replace=False):
         """
@@ -461,28 +730,20 @@ class CollectionPanel(panel.Panel):
         """
         self.load_subtree(iter)
 
-    def get_node_search_terms(self, node):
-        """
-            Finds all the related search terms for a particular node
-            @param node: the node you wish to create search terms
-        """
-        if not node:
-            return ""
-
-        queries = []
-        while node:
-            queries.append(self.model.get_value(node, 2))
-            node = self.model.iter_parent(node)
-
-        return " ".join(queries)
-
-    def refresh_tags_in_tree(self, type, track, tags):
-        if settings.get_option('gui/sync_on_tag_change', True) and \
-                bool(tags & self.order.all_sort_tags()) and \
-                self.collection.loc_is_member(track.get_loc_for_io()):
+    def refresh_tags_in_tree(self, type, obj, batch):
+        if not settings.get_option('gui/sync_on_tag_change', True):
+            return
+        sort_tags = self.order.all_sort_tags()
+        changed = {e.object for e in batch if e.data & sort_tags}
+        changed = {track for track in changed
+                   if self.collection.loc_is_member(track.get_loc_for_io())}
+        if changed:
+            if self._changed_tracks is not None:
+                self._changed_tracks.update(changed)
             self._refresh_tags_in_tree()
 
-    def refresh_tracks_in_tree(self, type, obj, loc):
+    def refresh_tracks_in_tree(self, type, obj, batch):
+        self._changed_tracks = None
         self._refresh_tags_in_tree()
 
     @common.glib_wait(500)
@@ -495,8 +756,18 @@ class CollectionPanel(panel.Panel):
         # so we delay it until we're done scanning.
         if self.collection._scanning:
             return True
-        self.resort_tracks()
-        self.load_tree()
+        changed = self._changed_tracks
+        self._changed_tracks = set()
+        if changed is None or self.groups is None:
+            self.resort_tracks()
+            self.load_tree()
+        else:
+            # only tags changed, so move the tracks within the groups
+            # we already have instead of sorting and searching again
+            for track in changed:
+                self.groups.update_track(track)
+            self._resort_needed = True
+            self._draw_tree()
         return False
 
     def resort_tracks(self):
@@ -504,6 +775,7 @@ class CollectionPanel(panel.Panel):
         # print("sorting...", time.clock())
         self.sorted_tracks = trax.sort_tracks(self.order.get_sort_tags(0),
                                               self.collection.get_tracks())
+        self._resort_needed = False
         # print("sorted.", time.clock())
 
     def load_tree(self):
@@ -515,14 +787,12 @@ class CollectionPanel(panel.Panel):
         """
         logger.debug("Reloading collection tree")
         self.current_start_count = self.start_count
-        self.tree.set_model(None)
-        self.model.clear()
 
         self.root = None
         oldorder = self.order
         self.order = self.orders[self.choice.get_active()]
 
-        if not oldorder or oldorder != self.order:
+        if not oldorder or oldorder != self.order or self._resort_needed:
             self.resort_tracks()
 
         # save the active view setting
@@ -535,9 +805,21 @@ class CollectionPanel(panel.Panel):
         tags += self.order.all_search_tags()
         tags = list(set(tags))  # uniquify list to speed up search
 
+        matcher = trax.TracksMatcher(keyword, case_sensitive=False,
+                                     keyword_tags=tags)
         self.tracks = list(
-            trax.search_tracks_from_string(self.sorted_tracks,
-                                           keyword, case_sensitive=False, keyword_tags=tags))
+            trax.search_tracks(self.sorted_tracks, [matcher],
+                               index=self.collection.get_index()))
+        self.groups = CollectionGroups(self.order, self.tracks, matcher)
+
+        self._draw_tree()
+
+    def _draw_tree(self):
+        """
+            Fills the Gtk.TreeView from the current groups
+        """
+        self.tree.set_model(None)
+        self.model.clear()
 
         self.load_subtree(None)
 
@@ -598,16 +880,13 @@ class CollectionPanel(panel.Panel):
         if previously_loaded:
             return
 
-        search = self.get_node_search_terms(parent)
+        if parent is None:
+            node = self.groups.root
+        else:
+            node = self.model.get_value(parent, 3)
 
         try:
             tags = self.order.get_sort_tags(depth)
-            matchers = [trax.TracksMatcher(search)]
-            srtrs = trax.search_tracks(self.tracks, matchers)
-            # sort only if we are not on top level, because tracks are
-            # already sorted by fist order
-            if depth > 0:
-                srtrs = trax.sort_result_tracks(tags, srtrs)
         except IndexError:
             return  # at the bottom of the tree
         try:
@@ -621,81 +900,36 @@ class CollectionPanel(panel.Panel):
         display_counts = settings.get_option('gui/display_track_counts', True)
         draw_seps = settings.get_option('gui/draw_separators', True)
         last_char = ''
-        last_val = ''
-        last_dval = ''
-        last_matchq = ''
-        count = 0
         first = True
-        path = None
-        expanded = False
         to_expand = []
 
-        for srtr in srtrs:
-            stagvals = [unicode(srtr.track.get_tag_sort(x)) for x in tags]
-            stagval = " ".join(stagvals)
-            if (last_val != stagval or bottom):
-                tagval = self.order.format_track(depth, srtr.track)
-                match_query = " ".join([
-                    srtr.track.get_tag_search(t, format=True) for t in tags])
-                if bottom:
-                    match_query += " " + \
-                        srtr.track.get_tag_search("__loc", format=True)
-
-                # Different *sort tags can cause stagval to not match
-                # but the below code will produce identical entries in
-                # the displayed tree.  This condition checks to ensure
-                # that new entries are added if and only if they will
-                # display different results, avoiding that problem.
-                if match_query != last_matchq or tagval != last_dval or bottom:
-                    if display_counts and path and not bottom:
-                        iter = self.model.get_iter(path)
-                        val = self.model.get_value(iter, 1)
-                        val = "%s (%s)" % (val, count)
-                        self.model.set_value(iter, 1, val)
-                        count = 0
-
-                    last_val = stagval
-                    last_dval = tagval
-                    if depth == 0 and draw_seps:
-                        val = srtr.track.get_tag_sort(tags[0])
-                        char = first_meaningful_char(val)
-                        if first:
-                            last_char = char
-                        else:
-                            if char != last_char and last_char != '':
-                                self.model.append(parent, [None, None, None])
-                            last_char = char
-                    first = False
-
-                    last_matchq = match_query
-                    iter = self.model.append(parent,
-                                             [image, tagval, match_query])
-                    path = self.model.get_path(iter)
-                    expanded = False
-                    if not bottom:
-                        self.model.append(iter, [None, None, None])
-            count += 1
-            if not expanded:
-                alltags = []
-                for i in range(depth + 1, len(self.order)):
-                    alltags.extend(self.order.get_sort_tags(i))
-                for t in alltags:
-                    if t in srtr.on_tags:
-                        # keep original path intact for following block
-                        newpath = path
-                        if depth > 0:
-                            # for some reason, nested iters are always
-                            # off by one in the terminal entry.
-                            newpath = Gtk.TreePath.new_from_indices(newpath[:-1] + [newpath[-1] - 1])
-                        to_expand.append(newpath)
-                        expanded = True
-
-        if display_counts and path and not bottom:
-            iter = self.model.get_iter(path)
-            val = self.model.get_value(iter, 1)
-            val = "%s (%s)" % (val, count)
-            self.model.set_value(iter, 1, val)
-            count = 0
+        for child in self.groups.get_children(node):
+            if depth == 0 and draw_seps:
+                val = child.tracks[0].track.get_tag_sort(tags[0])
+                char = first_meaningful_char(val)
+                if first:
+                    last_char = char
+                else:
+                    if char != last_char and last_char != '':
+                        self.model.append(parent, [None, None, None, None])
+                    last_char = char
+            first = False
+
+            tagval = child.display
+            if display_counts and not bottom:
+                tagval = "%s (%s)" % (tagval, len(child.tracks))
+            iter = self.model.append(parent,
+                                     [image, tagval, child.match_query, child])
+            if not bottom:
+                self.model.append(iter, [None, None, None, None])
+            if child.expand:
+                path = self.model.get_path(iter)
+                if depth > 0:
+                    # for some reason, nested iters are always
+                    # off by one in the terminal entry.
+                    path = Gtk.TreePath.new_from_indices(
+                        path[:-1] + [path[-1] - 1])
+                to_expand.append(path)
 
         if settings.get_option("gui/expand_enabled", True) and \
                 len(to_expand) < \
@@ -437,7 +437,8 @@ class PlaylistsPanel(panel.Panel, BasePlaylistPanelMixin):
         self._load_playlists()
 
     def _connect_events(self):
-        event.add_ui_callback(self.refresh_playlists, 'track_tags_changed')
+        event.add_ui_batch_callback(self.refresh_playlists,
+                                    'track_tags_changed')
         event.add_ui_callback(self._on_playlist_added, 'playlist_added', self.playlist_manager)
 
         self.tree.connect('key-release-event', self.on_key_released)
@@ -447,13 +448,13 @@ class PlaylistsPanel(panel.Panel, BasePlaylistPanelMixin):
         if isinstance(pl, xl_playlist.SmartPlaylist):
             self.edit_selected_smart_playlist()
 
-    def refresh_playlists(self, type, track, tags):
+    def refresh_playlists(self, type, obj, batch):
         """
             wrapper so that multiple events dont cause multiple
             reloads in quick succession
         """
         if settings.get_option('gui/sync_on_tag_change', True) and \
-                tags & {'title', 'artist'}:
+                batch.get_data_union() & {'title', 'artist'}:
             self._refresh_playlists()
 
     @common.glib_wait(500)
@@ -96,3 +96,8 @@ class CoverOrderPreference(widgets.OrderListPreference):
 class AutomaticCoverFetching(widgets.CheckPreference):
     default = True
     name = 'covers/automatic_fetching'
+
+
+class MemoryCacheSizePreference(widgets.SpinPreference):
+    default = 16
+    name = 'covers/memory_cache_size'
@@ -294,10 +294,15 @@ class DragTreeView(AutoScrollTreeView):
             for track in tracks:
                 album = track.get_tag_raw('album', join=True)
                 if album not in albums:
-                    image_data = cover_manager.get_cover(track,
-                                                         set_only=True, use_default=True)
-                    pixbuf = icons.MANAGER.pixbuf_from_data(
-                        image_data, (width, height))
+                    db_string = cover_manager.get_db_string(track)
+                    if db_string:
+                        pixbuf = icons.MANAGER.pixbuf_from_cover(
+                            db_string, (width, height))
+                    else:
+                        pixbuf = None
+                    if pixbuf is None:
+                        pixbuf = icons.MANAGER.pixbuf_from_data(
+                            cover_manager.get_default_cover(), (width, height))
 
                     if first_pixbuf is None:
                         first_pixbuf = pixbuf
@@ -479,9 +479,7 @@ class StatusbarTextFormatter(formatter.Formatter):
         if not isinstance(page, playlist.PlaylistPage):
             return ''
 
-        playlist_duration = sum([t.get_tag_raw('__length')
-                                 for t in page.playlist
-                                 if t.get_tag_raw('__length')])
+        playlist_duration = page.playlist.get_total_duration()
         selection_tracks = page.view.get_selected_tracks()
         selection_count = len(selection_tracks)
         selection_duration = sum([t.get_tag_raw('__length')
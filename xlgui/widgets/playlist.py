@@ -1430,8 +1430,10 @@ class PlaylistModel(Gtk.ListStore):
         self.data_loading = False
         self.data_load_queue = []
 
-        self._redraw_timer = None
-        self._redraw_queue = []
+        # track -> iters of the rows showing it. ListStore iters stay
+        # valid as long as their row exists, so tag changes can go
+        # straight to the rows of a track.
+        self._track_rows = {}
 
         event.add_ui_callback(self.on_tracks_added,
                               "playlist_tracks_added", playlist,
@@ -1457,9 +1459,9 @@ class PlaylistModel(Gtk.ListStore):
         event.add_ui_callback(self.on_playback_state_change,
                               "playback_player_resume", self.player,
                               destroy_with=parent)
-        event.add_ui_callback(self.on_track_tags_changed,
-                              "track_tags_changed",
-                              destroy_with=parent)
+        event.add_ui_batch_callback(self.on_track_tags_changed,
+                                    "track_tags_changed",
+                                    destroy_with=parent)
 
         event.add_ui_callback(self.on_option_set, "gui_option_set",
                               destroy_with=parent)
@@ -1578,6 +1580,14 @@ class PlaylistModel(Gtk.ListStore):
     def on_tracks_removed(self, event_type, playlist, tracks):
         tracks.reverse()
         for position, track in tracks:
+            rows = self._track_rows.get(track)
+            if rows is not None:
+                for i, itr in enumerate(rows):
+                    if self.get_path(itr)[0] == position:
+                        del rows[i]
+                        break
+                if not rows:
+                    del self._track_rows[track]
             self.remove(self.iter_nth_child(None, position))
 
     def on_current_position_changed(self, event_type, playlist, positions):
@@ -1606,29 +1616,20 @@ class PlaylistModel(Gtk.ListStore):
             return
         self.update_row_params(position)
 
-    def on_track_tags_changed(self, type, track, tags):
-        if not track or not \
-                settings.get_option('gui/sync_on_tag_change', True) or\
-                not (tags & self.column_names):
+    def on_track_tags_changed(self, type, obj, batch):
+        if not settings.get_option('gui/sync_on_tag_change', True):
             return
 
-        if self._redraw_timer:
-            GLib.source_remove(self._redraw_timer)
-        self._redraw_queue.append(track)
-        self._redraw_timer = GLib.timeout_add(100, self._on_track_tags_changed)
-
-    def _on_track_tags_changed(self):
-        self._redraw_timer = None
-        redraw_queue = set(self._redraw_queue)
-        self._redraw_queue = []
+        redraw = {e.object for e in batch
+                  if e.object and e.data & self.column_names}
 
-        COL_TRACK = self.COL_TRACK
         COL_CACHE = self.COL_CACHE
+        track_rows = self._track_rows
 
-        for row in self:
-            if row[COL_TRACK] in redraw_queue:
-                row[COL_CACHE].clear()
-                self.row_changed(row.path, row.iter)
+        for track in redraw:
+            for itr in track_rows.get(track, ()):
+                self.get_value(itr, COL_CACHE).clear()
+                self.row_changed(self.get_path(itr), itr)
             
     #
     # Loading data into the playlist:
@@ -1673,8 +1674,10 @@ class PlaylistModel(Gtk.ListStore):
         ]
 
     def _load_data_done(self, render_data):
+        track_rows = self._track_rows
         for args in render_data:
-            self.insert_with_valuesv(*args)
+            itr = self.insert_with_valuesv(*args)
+            track_rows.setdefault(args[2][0], []).append(itr)
 
         self.data_loading = False
         self.emit('data-loading', False)
@@ -383,22 +383,20 @@ class ScheduleTimeColumn(Column):
            playlist is self.player.queue.current_playlist and \
            playlist.shuffle_mode == 'disabled' and \
            playlist.repeat_mode != 'track':
-            track = model.get_value(iter, 0)
-            position = playlist.index(track)
+            path = model.get_path(iter)
+            if isinstance(model, Gtk.TreeModelFilter):
+                path = model.convert_path_to_child_path(path)
+            position = path[0]
             current_position = playlist.current_position
 
             # 5) this track is after the currently played one
             if position > current_position:
                 # The delay is the accumulated length of all tracks
-                # between the currently playing and this one
-                try:
-                    delay = sum([t.get_tag_raw('__length')
-                                 for t in playlist[current_position:position]])
-                except TypeError:
-                    # on tracks with length == None, we cannot determine
-                    # when later tracks will play
-                    pass
-                else:
+                # between the currently playing and this one; on
+                # tracks with length == None, we cannot determine
+                # when later tracks will play
+                delay = playlist.get_duration(current_position, position)
+                if delay is not None:
                     # Subtract the time which already has passed
                     delay -= self.player.get_time()
                     # The schedule time is the current time plus delay